@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,14 +49,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "gamification.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "gamification.middleware.NoCacheMiddleware",
+    "gamification.middleware.CachePolicyMiddleware",
 ]
 
 ROOT_URLCONF = "GreenG.urls"
@@ -89,6 +93,96 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Leaderboards and other precomputed data live here. Point this at a shared
+# backend (Redis/Memcached) when running more than one worker process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "greeng",
+    },
+    # Login throttle counts must be shared by every worker process
+    # (gamification.throttle refuses a per-process cache unless DEBUG is on):
+    # Redis when REDIS_URL is set (pip install redis), else a database table
+    # made by `python manage.py createcachetable`.
+    "throttle": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.environ["REDIS_URL"]}
+        if os.environ.get("REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "login_throttle_cache"}
+    ),
+}
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_TTL = 300  # seconds before a cached leaderboard is rebuilt
+DAILY_LOGIN_POINTS = 1
+RECENT_ACTIVITY_DAYS = 7  # how far back the teacher dashboard's activity feed looks
+
+# Scores posted by the bundled games are buffered per process and written in
+# one bulk insert per batch. Clients keep each score until a later post reports
+# it saved, so a killed process loses at most a resend.
+GAME_ATTEMPT_BATCH_SIZE = 50
+GAME_ATTEMPT_FLUSH_SECONDS = 2
+GAME_ATTEMPT_MAX_PENDING = 5000
+
+QUIZ_CACHE_TTL = 60 * 60 * 24  # versioned, so this only bounds memory use
+
+TASK_APPROVAL_POINTS = 10  # EcoPoints for an approved real-world task
+ROLLUP_GAP_SECONDS = 60 * 60  # how long refresh_rollups waits for an uncommitted id below its watermark
+ANALYTICS_CACHE_TTL = 60 * 10  # teacher class analytics, per (institution, class, window)
+RECOMMENDATIONS_CACHE_TTL = 60 * 60 * 24  # per student; keyed by attempt count, so this only bounds memory use
+FRAGMENT_CACHE_TTL = 60 * 60 * 24  # student dashboard {% cache %} fragments, keyed by data versions
+
+# Background jobs (gamification.jobs) are stored in the database and run by
+# `python manage.py run_jobs`. Set BACKGROUND_JOBS_EAGER to run them in-process
+# right after commit instead, e.g. when no worker is running.
+BACKGROUND_JOBS_EAGER = False
+JOB_RETRY_BASE_SECONDS = 10
+JOB_HEARTBEAT_SECONDS = 30  # running jobs refresh heartbeat_at this often
+JOB_STALE_SECONDS = 5 * 60  # no heartbeat for this long: the worker died, requeue the job
+
+
+# Query budgets (gamification.middleware.QueryBudgetMiddleware)
+# Maximum SQL queries per request, keyed by URL name, counted with cold caches
+# (a dashboard's first request after a deploy). Going over budget logs a
+# warning; with QUERY_BUDGET_RAISE (GreenG/test_settings.py, and the budget
+# tests) it raises so the offending test fails.
+
+QUERY_BUDGETS = {
+    "student_dashboard": 22,  # including the catalog, games and registry version reads (versions.py)
+    "teacher_dashboard": 10,
+    "teacher_students": 6,
+    "teacher_content": 11,
+    "analytics_dashboard": 6,
+    "explore_subtopics": 4,
+    # A student's first login of the day writes the reward, calendar, rollups
+    # and their version; the throttle's database cache adds up to 20 (none on Redis).
+    # Measured: a first login of the day after failed attempts runs exactly this many.
+    "login": 39,
+    "signup": 8,
+    # change lists whose rows print related objects
+    "admin:gamification_ecopoint_changelist": 6,
+    "admin:gamification_gameattempt_changelist": 6,
+    "admin:gamification_tasksubmission_changelist": 6,
+    "admin:gamification_studentprofile_changelist": 6,
+    "admin:gamification_userbadge_changelist": 6,
+}
+QUERY_NPLUSONE_THRESHOLD = 5  # same SQL shape this many times in one request
+QUERY_BUDGET_RAISE = False
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "gamification.queries": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -108,6 +202,46 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (gamification.passwords)
+# "pbkdf2", or "argon2" once argon2-cffi is installed. Hashes made with the
+# other one, or with other costs, still work and are upgraded on next login.
+PASSWORD_HASHING = os.environ.get("PASSWORD_HASHING", "pbkdf2")
+PASSWORD_HASHERS = {
+    "pbkdf2": [
+        "gamification.passwords.TunedPBKDF2PasswordHasher",
+        "gamification.passwords.TunedArgon2PasswordHasher",
+    ],
+    "argon2": [
+        "gamification.passwords.TunedArgon2PasswordHasher",
+        "gamification.passwords.TunedPBKDF2PasswordHasher",
+    ],
+}[PASSWORD_HASHING]
+if PASSWORD_HASHING == "argon2":
+    # Fail at startup, not on the first login, when the optional package is missing.
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured("PASSWORD_HASHING=argon2 needs argon2-cffi: pip install argon2-cffi")
+PASSWORD_PBKDF2_ITERATIONS = 600_000  # OWASP's PBKDF2-HMAC-SHA256 minimum; Django's default is 1,000,000
+PASSWORD_ARGON2 = {"time_cost": 2, "memory_cost": 19 * 1024, "parallelism": 1}  # KiB; OWASP's argon2id baseline
+AUTHENTICATION_BACKENDS = ["gamification.backends.RoleModelBackend"]  # checks the login form's role before the password
+LOGIN_HASH_WORKERS = os.cpu_count() or 1  # logins hashing at once (manage.py bench_login)
+LOGIN_HASH_QUEUE = 32  # logins waiting for a hash before new ones get "try again"
+LOGIN_HASH_TIMEOUT = 10  # seconds
+
+# Login throttling (gamification.throttle): (attempts, window in seconds) per
+# client IP and per username, by the role of the account being logged in to
+# (the strictest of them for unknown usernames). LOGIN_THROTTLE_CACHE must be
+# shared by all workers; see CACHES above.
+LOGIN_THROTTLE_CACHE = "throttle"
+LOGIN_THROTTLE_RATES = {
+    "default": {"ip": (30, 60), "username": (10, 300)},
+    # A whole school may log in from one address at the start of a lesson.
+    "school_student": {"ip": (300, 60)},
+    "college_student": {"ip": (300, 60)},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -128,6 +262,31 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+STATIC_ROOT = BASE_DIR / "staticfiles"  # filled by collectstatic, served by gamification.assets.serve
+
+# collectstatic fingerprints file names (game folders as a whole) and writes
+# .br/.gz variants; {% static %} uses the hashed names when DEBUG is off.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "gamification.assets.GameStaticFilesStorage"},
+}
+STATIC_MAX_AGE = 60 * 60 * 24 * 365  # hashed files are immutable
+STATIC_BUNDLE_DIRS = ["games"]  # each sub-folder is one exported game, hashed as a unit
+
+# Uploads (Category.godot_game_file)
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+GAMES_STATIC_DIR = "games"  # scanned by gamification.registry (manage.py scan_games)
+
+# Signup institution autocomplete (gamification.institutions)
+INSTITUTION_SEARCH_PAGE_SIZE = 10
+INSTITUTION_DUPLICATE_SIMILARITY = 0.8  # trigram similarity at which a new school in the same city is the same one
+
+# Bulk roster import (manage.py import_roster, /api/roster/)
+ROSTER_BATCH_SIZE = 1000  # rows validated and written per transaction
+ROSTER_HASH_WORKERS = os.cpu_count() or 1  # processes hashing passwords
+ROSTER_UPLOAD_DIR = BASE_DIR / "private" / "rosters"  # uploaded rosters hold passwords: never under MEDIA_ROOT
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
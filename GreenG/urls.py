@@ -15,11 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from gamification import assets
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("gamification.urls")),  # include app urls
+    path(settings.STATIC_URL.lstrip("/") + "<path:path>", assets.serve, name="static_asset"),  # collected, precompressed static files
 
-]
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)  # uploaded game builds (DEBUG only)
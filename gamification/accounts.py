@@ -0,0 +1,106 @@
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from . import institutions
+from .forms import ORGANIZATION_ROLES, PROFILE_FORMS, STUDENT_ROLES, SignupForm
+from .models import Institution, Organization, StudentProfile, TeacherProfile, User
+
+
+# -------------------------------
+# Signup pipeline
+# -------------------------------
+# register() validates everything up front (forms.py, no queries), hashes the
+# password before opening the transaction so no lock is held during the slow
+# part, then writes the user and its profile (and a new institution, if one
+# was typed in) in one atomic block. A taken username is not looked up first:
+# the unique constraints on username and slug reject it and the whole signup
+# rolls back, so concurrent signups can never leave a half-created account.
+
+ORGANIZATION_TYPES = {"ngo": "NGO", "government": "Government"}
+
+
+class SignupError(ValueError):
+    def __init__(self, errors):
+        # {field: [messages]}, as form.errors
+        self.errors = errors
+        super().__init__("; ".join(self.messages()))
+
+    def messages(self):
+        return [message for messages in self.errors.values() for message in messages]
+
+
+def validate(data):
+    """(account, profile) cleaned data for a signup POST, or raise SignupError."""
+    account = SignupForm(data)
+    profile = PROFILE_FORMS.get(data.get("role"))
+    profile = profile(data) if profile else None
+    account_valid = account.is_valid()
+    if not (account_valid and profile is not None and profile.is_valid()):
+        errors = dict(account.errors)
+        if profile is not None:
+            errors.update(profile.errors)
+        raise SignupError(errors)
+    return account.cleaned_data, profile.cleaned_data
+
+
+def _institution(account, profile):
+    """An existing institution id, or an unsaved Institution to create with the user."""
+    if profile["institution"] != "other":
+        return profile["institution"]
+    name, city, state = profile["other_school_name"], profile["other_school_city"], profile["other_school_state"]
+    # Reuse the school if someone already added it under a near-identical name.
+    duplicate = institutions.find_duplicate(name, city, state)
+    if duplicate is not None:
+        return duplicate
+    return Institution(name=name, city=city, state=state, type="School" if account["role"].startswith("school") else "College")
+
+
+def register(data):
+    """Create an account from signup data and return the user; raise SignupError if it is not valid."""
+    account, profile = validate(data)
+    role = account["role"]
+    user = User(
+        username=account["username"],
+        slug=slugify(account["username"]),
+        email=account["email"],
+        first_name=account["first_name"],
+        last_name=account["last_name"],
+        contact_no=account["contact_no"],
+        dob=account["dob"],
+        address=account["address"],
+        role=role,
+        password=make_password(account["password1"]),
+    )
+    institution = None if role in ORGANIZATION_ROLES else _institution(account, profile)
+
+    try:
+        with transaction.atomic():
+            user.save(force_insert=True)
+            if role in ORGANIZATION_ROLES:
+                Organization.objects.create(
+                    name=profile["org_name"],
+                    type=ORGANIZATION_TYPES[role],
+                    contact_person=profile["contact_person"],
+                    email=account["email"],
+                    website=profile["website"],
+                    address=account["address"],
+                    city=profile["city"],
+                    state=profile["state"],
+                )
+                return user
+            if isinstance(institution, Institution):
+                institution.save(force_insert=True)
+                institution = institution.id
+            fields = {name: value for name, value in profile.items() if not name.startswith(("institution", "other_school_"))}
+            model = StudentProfile if role in STUDENT_ROLES else TeacherProfile
+            model.objects.create(user=user, institution_id=institution, **fields)
+    except IntegrityError:
+        # Only the failure path pays for working out which constraint it was.
+        if User.objects.filter(Q(username=user.username) | Q(slug=user.slug)).exists():
+            raise SignupError({"username": ["Username already taken"]})
+        if isinstance(institution, int) and not Institution.objects.filter(id=institution).exists():
+            raise SignupError({"institution": ["Pick your school/college from the list"]})
+        raise
+    return user
@@ -1,9 +1,12 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .badges import RuleError, parse_criteria
 from .models import (
     User, Institution, StudentProfile, TeacherProfile, Organization,
     GameTopic, Game, GameAttempt, TaskSubmission,
-    EcoPoint, Badge, UserBadge, LoginHistory,Category, SubTopic,QuizOption,QuizQuestion,PuzzleOption,Puzzle
+    EcoPoint, UserPointBalance, Badge, UserBadge, LoginHistory,Category, SubTopic,QuizOption,QuizQuestion,PuzzleOption,Puzzle,
+    BackgroundJob, GameAsset, LoginCalendar,
 )
 
 class QuizOptionInline(admin.TabularInline):
@@ -43,6 +46,51 @@ class SubTopicAdmin(admin.ModelAdmin):
     search_fields = ("name", "category__name")
 
 
+class BadgeForm(forms.ModelForm):
+    class Meta:
+        model = Badge
+        fields = "__all__"
+        help_texts = {
+            "unlock_criteria": "e.g. 'points >= 100', 'streak >= 7 and logins >= 30', 'attempts in topic Water >= 5'",
+        }
+
+    def clean_unlock_criteria(self):
+        criteria = self.cleaned_data["unlock_criteria"]
+        try:
+            parse_criteria(criteria)
+        except RuleError as exc:
+            raise forms.ValidationError(str(exc))
+        return criteria
+
+
+@admin.register(Badge)
+class BadgeAdmin(admin.ModelAdmin):
+    form = BadgeForm
+    list_display = ("name", "unlock_criteria", "created_at")
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_after", "created_at", "finished_at")
+    list_filter = ("status", "name")
+
+
+@admin.register(LoginCalendar)
+class LoginCalendarAdmin(admin.ModelAdmin):
+    list_display = ("user", "year", "active_days")
+    list_filter = ("year",)
+    search_fields = ("user__username",)
+    exclude = ("days",)
+
+
+@admin.register(GameAsset)
+class GameAssetAdmin(admin.ModelAdmin):
+    list_display = ("title", "entry", "source", "size", "game", "category", "scanned_at")
+    list_filter = ("source",)
+    search_fields = ("title", "entry")
+    readonly_fields = ("entry", "source", "size", "content_hash", "scanned_at")
+
+
 class UserAdmin(BaseUserAdmin):
     fieldsets = BaseUserAdmin.fieldsets + (
         ("Additional Info", {"fields": ("role", "contact_no", "dob", "address")}),
@@ -75,14 +123,57 @@ class CustomUserAdmin(UserAdmin):
 # -----------------------------
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Institution)
-admin.site.register(StudentProfile)
-admin.site.register(TeacherProfile)
 admin.site.register(Organization)
 admin.site.register(GameTopic)
 admin.site.register(Game)
-admin.site.register(GameAttempt)
-admin.site.register(TaskSubmission)
-admin.site.register(EcoPoint)
-admin.site.register(Badge)
-admin.site.register(UserBadge)
-admin.site.register(LoginHistory)
+
+
+# Change lists whose rows print related objects (their __str__ reads the
+# user, game or badge) join them in, instead of one query per row.
+@admin.register(StudentProfile)
+class StudentProfileAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "institution", "grade", "enrollment_no")
+    list_select_related = ("user", "institution")
+
+
+@admin.register(TeacherProfile)
+class TeacherProfileAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "institution", "designation")
+    list_select_related = ("user", "institution")
+
+
+@admin.register(GameAttempt)
+class GameAttemptAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "score", "accuracy", "attempt_date")
+    list_select_related = ("user", "game")
+
+
+@admin.register(TaskSubmission)
+class TaskSubmissionAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "game", "status", "submitted_at")
+    list_filter = ("status",)
+    list_select_related = ("user", "game")
+
+
+@admin.register(EcoPoint)
+class EcoPointAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "awarded_at")
+    list_select_related = ("user",)
+
+
+@admin.register(UserPointBalance)
+class UserPointBalanceAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "updated_at")
+    list_select_related = ("user",)
+
+
+@admin.register(UserBadge)
+class UserBadgeAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "awarded_at")
+    list_select_related = ("user", "badge")
+
+
+@admin.register(LoginHistory)
+class LoginHistoryAdmin(admin.ModelAdmin):
+    list_display = ("__str__",)
+    list_select_related = ("user",)
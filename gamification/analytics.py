@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.timezone import now
+
+from .classroom import class_field
+from .models import GameAttempt, GameTopic
+
+
+# -------------------------------
+# Class performance analytics
+# -------------------------------
+# Attempts for one institution (optionally one class) are read as numeric
+# values_list rows into one NumPy matrix. Every statistic below is then a
+# vectorised operation over its columns: no model instances and no
+# per-attempt Python arithmetic. Results are cached per
+# (institution, class, window).
+
+ANALYTICS_CACHE_TTL = getattr(settings, "ANALYTICS_CACHE_TTL", 10 * 60)
+ANALYTICS_WINDOWS = [7, 30, 90]
+PERCENTILES = [10, 25, 50, 75, 90]
+HISTOGRAM_BINS = 10
+COLUMNS = ("score", "accuracy", "time_taken", "week", "in_window", "topic", "user")
+
+
+def cache_key(institution_id, class_value, window):
+    return f"analytics:{institution_id}:{class_value if class_value is not None else 'all'}:{window}"
+
+
+def load_attempts(institution, class_value=None, window=30):
+    """
+    Column arrays (score, accuracy, time_taken, week, in_window, topic, user)
+    for the attempts of the last max(window, 14) days. ``week`` is 0 for the
+    last 7 days, 1 for the 7 before and so on. It is computed in SQL, so no
+    datetimes are shipped to Python.
+    """
+    moment = now()
+    days = max(window, 14)
+    queryset = GameAttempt.objects.filter(
+        user__studentprofile__institution=institution, attempt_date__gte=moment - timedelta(days=days)
+    )
+    if class_value is not None:
+        field = f"user__studentprofile__{class_field(institution)}"
+        queryset = queryset.filter(**({f"{field}__isnull": True} if class_value == "" else {field: int(class_value)}))
+    weeks = (days + 6) // 7
+    queryset = queryset.annotate(
+        week=Case(
+            *[When(attempt_date__gte=moment - timedelta(days=7 * (week + 1)), then=Value(week)) for week in range(weeks)],
+            default=Value(weeks), output_field=IntegerField(),
+        ),
+        in_window=Case(
+            When(attempt_date__gte=moment - timedelta(days=window), then=Value(1)),
+            default=Value(0), output_field=IntegerField(),
+        ),
+    )
+    sql, params = queryset.values_list(
+        "score", "accuracy", "time_taken", "week", "in_window", "game__topic_id", "user_id"
+    ).query.sql_with_params()
+    # Every column is numeric, so the rows go straight from the cursor into
+    # NumPy without Django's per-row value converters; NULLs become NaN.
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        matrix = np.array(cursor.fetchall(), dtype=float).reshape(-1, len(COLUMNS))
+    columns = dict(zip(COLUMNS, matrix.T))
+    columns["week"] = columns["week"].astype(np.int64)
+    columns["in_window"] = columns["in_window"].astype(bool)
+    columns["topic"] = np.nan_to_num(columns["topic"], nan=-1).astype(np.int64)
+    columns["user"] = columns["user"].astype(np.int64)
+    return columns
+
+
+def _number(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 2)
+
+
+def distribution(values):
+    """Percentiles, mean and a histogram of one metric, ignoring missing values."""
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {"count": 0, "mean": None, "percentiles": {}, "histogram": {"edges": [], "counts": []}}
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        "count": int(values.size),
+        "mean": _number(values.mean()),
+        "percentiles": dict(zip(map(str, PERCENTILES), map(_number, np.percentile(values, PERCENTILES)))),
+        "histogram": {"edges": [_number(edge) for edge in edges], "counts": counts.tolist()},
+    }
+
+
+def topic_heatmap(columns, window):
+    """
+    Mean accuracy (score where accuracy is missing) per topic per week of the
+    window, weakest topic first.
+    """
+    topic = columns["topic"]
+    known = topic >= 0
+    if not known.any():
+        return {"topics": [], "weeks": [], "values": [], "attempts": []}
+    value = np.where(np.isnan(columns["accuracy"]), columns["score"], columns["accuracy"])[known]
+    week = np.minimum(columns["week"][known], (window - 1) // 7)
+    topic_ids, topic_index = np.unique(topic[known], return_inverse=True)
+    weeks = int(week.max()) + 1 if week.size else 1
+
+    cell = topic_index * weeks + week
+    size = topic_ids.size * weeks
+    sums = np.bincount(cell, weights=value, minlength=size).reshape(topic_ids.size, weeks)
+    counts = np.bincount(cell, minlength=size).reshape(topic_ids.size, weeks)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        overall = sums.sum(axis=1) / counts.sum(axis=1)
+    order = np.argsort(overall)  # weakest first
+
+    names = dict(GameTopic.objects.filter(id__in=topic_ids.tolist()).values_list("id", "name"))
+    return {
+        "topics": [names.get(int(topic_ids[i]), "Unknown") for i in order],
+        # column 0 is the current week; show oldest -> newest
+        "weeks": [f"{weeks - 1 - i} wk ago" if i < weeks - 1 else "This week" for i in range(weeks)],
+        "values": [[_number(mean) for mean in means[i][::-1]] for i in order],
+        "attempts": [counts[i][::-1].tolist() for i in order],
+    }
+
+
+def week_over_week(columns):
+    """Class means for the last 7 days against the 7 before, and how many students improved."""
+    this_week, last_week = columns["week"] == 0, columns["week"] == 1
+    result = {}
+    for metric in ("score", "accuracy"):
+        current = columns[metric][this_week]
+        previous = columns[metric][last_week]
+        current_mean = np.nanmean(current) if np.any(~np.isnan(current)) else np.nan
+        previous_mean = np.nanmean(previous) if np.any(~np.isnan(previous)) else np.nan
+        result[metric] = {
+            "this_week": _number(current_mean),
+            "last_week": _number(previous_mean),
+            "change": _number(current_mean - previous_mean),
+        }
+
+    # Per-student mean score in each week, via bincount over a dense user index.
+    users, user_index = np.unique(columns["user"], return_inverse=True)
+    score = np.nan_to_num(columns["score"])
+
+    def per_user(mask):
+        total = np.bincount(user_index[mask], weights=score[mask], minlength=users.size)
+        played = np.bincount(user_index[mask], minlength=users.size)
+        return total, played
+
+    current_total, current_played = per_user(this_week)
+    previous_total, previous_played = per_user(last_week)
+    both = (current_played > 0) & (previous_played > 0)
+    change = current_total[both] / current_played[both] - previous_total[both] / previous_played[both]
+    result["students"] = {
+        "active_both_weeks": int(both.sum()),
+        "improved": int((change > 0).sum()),
+        "median_change": _number(np.median(change)) if change.size else None,
+    }
+    return result
+
+
+def class_statistics(institution, class_value=None, window=30):
+    key = cache_key(institution.id, class_value, window)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Week-over-week always needs the last 14 days, even for a 7-day window.
+    columns = load_attempts(institution, class_value, window)
+    in_window = columns["in_window"]
+    windowed = {name: column[in_window] for name, column in columns.items()}
+    result = {
+        "window": window,
+        "attempts": int(in_window.sum()),
+        "students": int(np.unique(windowed["user"]).size),
+        "score": distribution(windowed["score"]),
+        "accuracy": distribution(windowed["accuracy"]),
+        "time_taken": distribution(windowed["time_taken"]),
+        "topics": topic_heatmap(windowed, window),
+        "week_over_week": week_over_week(columns),
+    }
+    cache.set(key, result, ANALYTICS_CACHE_TTL)
+    return result
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+
+# -------------------------------
+# Static asset pipeline
+# -------------------------------
+# collectstatic writes every file under a content-hashed name. A game exported
+# as a folder (games/Trash_Catcher_v1/...) loads its .js/.pck/.wasm by
+# relative name, so its files are not renamed one by one: the whole folder
+# moves to games/Trash_Catcher_v1.<hash of the folder>/ and the relative
+# references keep working. Compressible files also get .br (if the brotli
+# package is installed) and .gz siblings.
+#
+# serve() hands those files out with the precompressed variant the browser
+# accepts. Hashed names never change content, so they are cached for a year
+# and marked immutable; original names are revalidated.
+
+STATIC_MAX_AGE = getattr(settings, "STATIC_MAX_AGE", 60 * 60 * 24 * 365)
+STATIC_BUNDLE_DIRS = getattr(settings, "STATIC_BUNDLE_DIRS", ["games"])
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".htm", ".html", ".js", ".json", ".map", ".md", ".mjs", ".pck", ".svg", ".txt", ".wasm", ".xml",
+}
+MIN_SAVING = 0.05  # keep a compressed variant only if it is at least 5% smaller
+
+# Godot web exports; unknown to most systems' mime tables.
+mimetypes.add_type("application/wasm", ".wasm")
+mimetypes.add_type("application/octet-stream", ".pck")
+
+
+def bundle_of(name):
+    """'games/Trash_Catcher_v1' for 'games/Trash_Catcher_v1/Trash Catcher.js', else None."""
+    parts = name.split("/")
+    if len(parts) > 2 and parts[0] in STATIC_BUNDLE_DIRS:
+        return "/".join(parts[:2])
+    return None
+
+
+class GameStaticFilesStorage(ManifestStaticFilesStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bundle_hashes = {}
+
+    def _bundle_files(self, path):
+        directories, files = self.listdir(path)
+        for filename in files:
+            yield posixpath.join(path, filename)
+        for directory in directories:
+            yield from self._bundle_files(posixpath.join(path, directory))
+
+    def bundle_hash(self, bundle):
+        if bundle not in self._bundle_hashes:
+            digest = hashlib.md5(usedforsecurity=False)
+            for name in sorted(self._bundle_files(bundle)):
+                digest.update(name.encode())
+                with self.open(name) as content:
+                    for chunk in content.chunks():
+                        digest.update(chunk)
+            self._bundle_hashes[bundle] = digest.hexdigest()[:12]
+        return self._bundle_hashes[bundle]
+
+    def hashed_name(self, name, content=None, filename=None):
+        clean_name = urlsplit(unquote(name)).path.strip()
+        bundle = bundle_of(clean_name)
+        if bundle is None:
+            return super().hashed_name(name, content, filename)
+        return f"{bundle}.{self.bundle_hash(bundle)}{clean_name[len(bundle):]}"
+
+    def post_process(self, paths, dry_run=False, **options):
+        self._bundle_hashes = {}
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as content:
+            data = content.read()
+        variants = [(".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.insert(0, (".br", lambda: brotli.compress(data, quality=11)))
+        for suffix, compressor in variants:
+            compressed = compressor()
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self._save(name + suffix, ContentFile(compressed))
+
+
+# Preferred first; the file on disk is "<name><suffix>".
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+_immutable = {"manifest": None, "names": frozenset()}
+
+
+def is_immutable(path):
+    """True for names written by collectstatic with a content hash in them."""
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None)
+    if not hashed_files:
+        return False
+    if _immutable["manifest"] is not hashed_files:
+        _immutable["manifest"], _immutable["names"] = hashed_files, frozenset(hashed_files.values())
+    return path in _immutable["names"]
+
+
+def _locate(path):
+    if settings.STATIC_ROOT:
+        try:
+            fullpath = safe_join(settings.STATIC_ROOT, path)
+        except ValueError:
+            raise Http404("Invalid path.")
+        if os.path.isfile(fullpath):
+            return fullpath
+    if settings.DEBUG:
+        # Before collectstatic has run, fall back to the app directories.
+        found = finders.find(path)
+        if found:
+            return found
+    raise Http404("No such static file.")
+
+
+def accepts(header, encoding):
+    """
+    Whether an Accept-Encoding header allows ``encoding``: listed by name (or
+    covered by ``*``) with a non-zero q-value. ``gzip;q=0`` refuses gzip.
+    """
+    wildcard = False
+    for token in header.split(","):
+        name, _, params = token.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == encoding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+@require_safe
+def serve(request, path):
+    path = posixpath.normpath(path).lstrip("/")
+    fullpath = _locate(path)
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    accepted = request.headers.get("Accept-Encoding", "")
+    served, encoding = fullpath, None
+    for name, suffix in ENCODINGS:
+        if accepts(accepted, name) and os.path.isfile(fullpath + suffix):
+            served, encoding = fullpath + suffix, name
+            break
+
+    stat = os.stat(fullpath)
+    response = FileResponse(open(served, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if is_immutable(path):
+        response["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = "public, no-cache"
+    return response
@@ -0,0 +1,41 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import passwords
+from .models import User
+
+
+class RoleModelBackend(ModelBackend):
+    """
+    ModelBackend that also takes the role picked on the login form: a user
+    who picked the wrong role is not logged in, and, as for an unknown
+    username, one hash is spent anyway so neither is faster than a wrong
+    password.
+    Passwords are checked on the hashing pool and upgraded in the background
+    when the hashing settings changed (see passwords.py).
+
+    passwords.HashingBusy is not caught here: it propagates out of
+    authenticate() (Django only swallows PermissionDenied) and login_view
+    answers it with a 503.
+    """
+
+    def authenticate(self, request, username=None, password=None, role=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # As ModelBackend: hash once so unknown usernames are not faster.
+            passwords.hash_once(password)
+            return None
+        if role is not None and user.role != role:
+            # Still spend the hash, or the response time tells which role an account has.
+            passwords.hash_once(password)
+            return None
+        correct, needs_rehash = passwords.verify(password, user.password)
+        if not (correct and self.user_can_authenticate(user)):
+            return None
+        if needs_rehash:
+            passwords.rehash(user, password)
+        return user
@@ -0,0 +1,170 @@
+import logging
+import re
+import threading
+
+from . import versions
+from .models import (
+    Badge, Game, GameTopic, UserActivityCounter, UserBadge, UserPointBalance, UserTopicCounter,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Rule language
+# -------------------------------
+# Badge.unlock_criteria holds one or more conditions joined by "and":
+#
+#   points >= 100
+#   streak >= 7 and logins >= 30
+#   attempts in topic Water Conservation >= 5
+#
+# Metrics: points, streak (current daily login streak), longest_streak,
+# logins (days with a login), attempts, tasks (approved real-world tasks),
+# and "attempts in topic <GameTopic name>". Operators: >=, >, =, ==.
+
+METRICS = {
+    "points": "points",
+    "streak": "current_streak",
+    "longest_streak": "longest_streak",
+    "logins": "login_days",
+    "attempts": "attempts",
+    "tasks": "tasks_approved",
+}
+OPERATORS = {
+    ">=": lambda value, target: value >= target,
+    ">": lambda value, target: value > target,
+    "=": lambda value, target: value == target,
+    "==": lambda value, target: value == target,
+}
+_CONDITION = re.compile(
+    r"^\s*(?P<metric>[a-z_]+)(?:\s+in\s+topic\s+(?P<topic>.+?))?\s*(?P<op>>=|==|>|=)\s*(?P<value>\d+)\s*$",
+    re.IGNORECASE,
+)
+
+
+class RuleError(ValueError):
+    pass
+
+
+def parse_criteria(text):
+    """Parse unlock_criteria into [(metric, topic name or None, operator, value)]."""
+    conditions = []
+    for clause in re.split(r"\s+and\s+", text.strip(), flags=re.IGNORECASE):
+        match = _CONDITION.match(clause)
+        if not match:
+            raise RuleError(f"Cannot understand '{clause}'. Try e.g. 'points >= 100'.")
+        metric, topic = match["metric"].lower(), match["topic"]
+        if topic and metric != "attempts":
+            raise RuleError(f"Only attempts can be counted per topic, not '{metric}'.")
+        if not topic and metric not in METRICS:
+            raise RuleError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}.")
+        conditions.append((metric, topic.strip() if topic else None, match["op"], int(match["value"])))
+    return conditions
+
+
+# -------------------------------
+# Compiled rules (per process, rebuilt when any Badge changes)
+# -------------------------------
+# The version is kept in the database (versions.py), so the run_jobs worker
+# recompiles after a badge is edited in the admin of a web process.
+VERSION_NAME = "badges"
+_compiled = {"version": None, "rules": []}
+_compiled_lock = threading.Lock()
+
+
+def invalidate_rules():
+    versions.touch(VERSION_NAME)
+
+
+def compiled_rules():
+    """[(badge_id, [(metric, topic_id, operator, value)])] for every badge with valid criteria."""
+    version = versions.get(VERSION_NAME)
+    if _compiled["version"] == version:
+        return _compiled["rules"]
+
+    parsed = []
+    for badge_id, name, criteria in Badge.objects.values_list("id", "name", "unlock_criteria"):
+        try:
+            parsed.append((badge_id, parse_criteria(criteria)))
+        except RuleError as exc:
+            logger.warning("Badge %r is never awarded: %s", name, exc)
+    # Topic names in rules are matched case-insensitively; the topic table is small.
+    topics = {name.lower(): topic_id for topic_id, name in GameTopic.objects.values_list("id", "name")}
+
+    rules = []
+    for badge_id, conditions in parsed:
+        compiled = []
+        for metric, topic, op, value in conditions:
+            if topic and topic.lower() not in topics:
+                logger.warning("Badge %s refers to unknown topic %r", badge_id, topic)
+                break
+            compiled.append(("topic" if topic else metric, topics.get(topic.lower()) if topic else None, OPERATORS[op], value))
+        else:
+            rules.append((badge_id, compiled))
+
+    with _compiled_lock:
+        _compiled.update(version=version, rules=rules)
+    return rules
+
+
+def satisfied(conditions, stats, topic_attempts):
+    for metric, topic_id, op, value in conditions:
+        current = topic_attempts.get(topic_id, 0) if metric == "topic" else stats.get(metric, 0)
+        if not op(current, value):
+            return False
+    return True
+
+
+# -------------------------------
+# Incremental evaluation
+# -------------------------------
+def evaluate(user_id, metrics):
+    """
+    Check the badges whose rules mention any of ``metrics`` for one user, using
+    the stored counters only, and award the ones now satisfied.
+    """
+    metrics = set(metrics)
+    relevant = [(badge_id, conditions) for badge_id, conditions in compiled_rules()
+                if any(metric in metrics for metric, _, _, _ in conditions)]
+    if not relevant:
+        return []
+    owned = set(UserBadge.objects.filter(user_id=user_id).values_list("badge_id", flat=True))
+    relevant = [(badge_id, conditions) for badge_id, conditions in relevant if badge_id not in owned]
+    if not relevant:
+        return []
+
+    counter = UserActivityCounter.objects.filter(user_id=user_id).values(*set(METRICS.values()) - {"points"}).first() or {}
+    stats = {metric: counter.get(field, 0) for metric, field in METRICS.items()}
+    stats["points"] = UserPointBalance.points_for(user_id)
+    topic_ids = {topic_id for _, conditions in relevant for metric, topic_id, _, _ in conditions if metric == "topic"}
+    topic_attempts = dict(
+        UserTopicCounter.objects.filter(user_id=user_id, topic_id__in=topic_ids).values_list("topic_id", "attempts")
+    ) if topic_ids else {}
+
+    earned = [badge_id for badge_id, conditions in relevant if satisfied(conditions, stats, topic_attempts)]
+    UserBadge.objects.bulk_create([UserBadge(user_id=user_id, badge_id=badge_id) for badge_id in earned], ignore_conflicts=True)
+    return earned
+
+
+# -------------------------------
+# Counter updates for events (run in the event's own transaction)
+# -------------------------------
+def count_attempts(attempts):
+    """Count newly written GameAttempts [(user_id, game_id)]; returns the affected user ids."""
+    if not attempts:
+        return set()
+    topics = dict(Game.objects.filter(id__in={game_id for _, game_id in attempts}).values_list("id", "topic_id"))
+    per_user, per_topic = {}, {}
+    for user_id, game_id in attempts:
+        per_user[user_id] = per_user.get(user_id, 0) + 1
+        topic_id = topics.get(game_id)
+        if topic_id is not None:
+            per_topic[(user_id, topic_id)] = per_topic.get((user_id, topic_id), 0) + 1
+    for user_id, delta in per_user.items():
+        UserActivityCounter.bump(user_id, attempts=delta)
+    for (user_id, topic_id), delta in per_topic.items():
+        UserTopicCounter.bump(user_id, topic_id, delta)
+    return set(per_user)
+
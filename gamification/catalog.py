@@ -0,0 +1,95 @@
+import threading
+
+from . import versions
+from .models import Category, SubTopic
+
+
+# -------------------------------
+# Category / SubTopic catalog
+# -------------------------------
+# The catalog only changes when an admin edits it, so each process keeps the
+# whole tree in memory and serves dashboards from it with a single version
+# read per request. The version token (versions.py, in the database) is bumped
+# on every Category or SubTopic save/delete (see signals.py); a process whose
+# copy carries another token rebuilds it with two queries. The tree is shared
+# between requests: treat it as read-only.
+
+VERSION_NAME = "catalog"
+
+_local = {"version": None, "tree": None}
+_local_lock = threading.Lock()
+
+
+def catalog_version():
+    return versions.get(VERSION_NAME)
+
+
+def invalidate():
+    versions.touch(VERSION_NAME)
+
+
+def build_tree():
+    categories = [
+        {
+            "id": category.id,
+            "name": category.name,
+            "description": category.description,
+            "grade_min": category.grade_min,
+            "grade_max": category.grade_max,
+            "godot_game_file": category.godot_game_file.name or "",
+            "subtopics": [],
+        }
+        for category in Category.objects.order_by("id")
+    ]
+    by_id = {category["id"]: category for category in categories}
+    subtopics = {}
+    for subtopic in SubTopic.objects.order_by("id").values("id", "category_id", "name", "description"):
+        category = by_id.get(subtopic["category_id"])
+        if category is not None:
+            category["subtopics"].append(subtopic)
+            subtopics[subtopic["id"]] = subtopic
+    return {"categories": categories, "by_id": by_id, "subtopics": subtopics, "by_grade": {}}
+
+
+def get_tree():
+    version = catalog_version()
+    if _local["version"] == version:
+        return _local["tree"]
+    tree = build_tree()
+    with _local_lock:
+        _local["version"], _local["tree"] = version, tree
+    return tree
+
+
+def categories(grade=None):
+    """
+    All categories, or those whose grade_min/grade_max range admits ``grade``.
+    An open bound (NULL) admits every grade on that side.
+    """
+    tree = get_tree()
+    if grade is None:
+        return tree["categories"]
+    eligible = tree["by_grade"].get(grade)
+    if eligible is None:
+        eligible = [
+            category for category in tree["categories"]
+            if (category["grade_min"] is None or category["grade_min"] <= grade)
+            and (category["grade_max"] is None or grade <= category["grade_max"])
+        ]
+        tree["by_grade"][grade] = eligible
+    return eligible
+
+
+def category(category_id):
+    """One category with its ``subtopics``, or None."""
+    try:
+        return get_tree()["by_id"].get(int(category_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def subtopic(subtopic_id):
+    try:
+        return get_tree()["subtopics"].get(int(subtopic_id))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,276 @@
+import base64
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Prefetch, Q, Sum
+from django.utils.timesince import timesince
+from django.utils.timezone import get_current_timezone, localdate, now
+
+from . import catalog
+from .logins import live_streak
+from .models import Badge, EcoPoint, Game, GameAttempt, QuizQuestion, StudentProfile, TaskSubmission, TeacherProfile
+
+
+# -------------------------------
+# Teacher dashboard: students by class
+# -------------------------------
+# A page of students is always four queries, however many students it holds:
+# the teacher's profile, the students (with balance, activity counters and badge
+# count joined in), their latest attempts and their pending submissions.
+
+RECENT_ATTEMPTS = 3
+RECENT_ACTIVITY = 5
+RECENT_ACTIVITY_DAYS = getattr(settings, "RECENT_ACTIVITY_DAYS", 7)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class ClassroomError(ValueError):
+    pass
+
+
+def teacher_institution(teacher):
+    profile = TeacherProfile.objects.select_related("institution").filter(user=teacher).first()
+    return profile.institution if profile else None
+
+
+def class_field(institution):
+    """Schools group students by grade, colleges by year of study."""
+    return "current_year" if institution.type == "College" else "grade"
+
+
+def class_label(institution, value):
+    if value is None:
+        return "Unassigned"
+    return f"Year {value}" if institution.type == "College" else f"Grade {value}"
+
+
+def classes(institution):
+    field = class_field(institution)
+    rows = (
+        StudentProfile.objects.filter(institution=institution)
+        .values(field).annotate(students=Count("id")).order_by(field)
+    )
+    return [
+        {"value": "" if row[field] is None else row[field], "label": class_label(institution, row[field]), "students": row["students"]}
+        for row in rows
+    ]
+
+
+def encode_cursor(username):
+    return base64.urlsafe_b64encode(username.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ClassroomError("invalid cursor")
+
+
+def students_page(institution, class_value=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of an institution's students ordered by username, optionally for a single class."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    field = class_field(institution)
+
+    queryset = StudentProfile.objects.filter(institution=institution)
+    if class_value is not None:
+        if class_value == "":
+            queryset = queryset.filter(**{f"{field}__isnull": True})
+        else:
+            try:
+                queryset = queryset.filter(**{field: int(class_value)})
+            except ValueError:
+                raise ClassroomError("class must be a number")
+    if cursor:
+        queryset = queryset.filter(user__username__gt=decode_cursor(cursor))
+
+    queryset = (
+        queryset.select_related("user", "user__point_balance", "user__activity")
+        .annotate(badge_count=Count("user__userbadge"))
+        .prefetch_related(
+            # Sliced Prefetch: the latest attempts per student in one windowed query.
+            Prefetch(
+                "user__gameattempt_set",
+                queryset=GameAttempt.objects.select_related("game").only(
+                    "id", "user_id", "score", "accuracy", "attempt_date", "game__title"
+                ).order_by("-attempt_date")[:RECENT_ATTEMPTS],
+                to_attr="recent_attempts",
+            ),
+            Prefetch(
+                "user__tasksubmission_set",
+                queryset=TaskSubmission.objects.filter(status="pending").only(
+                    "id", "user_id", "submission", "submitted_at"
+                ).order_by("submitted_at"),
+                to_attr="pending_submissions",
+            ),
+        )
+        .order_by("user__username")
+    )
+    rows = list(queryset[: limit + 1])
+    page, has_more = rows[:limit], len(rows) > limit
+    return {
+        "results": [_student(institution, profile, localdate()) for profile in page],
+        "next_cursor": encode_cursor(page[-1].user.username) if has_more else None,
+    }
+
+
+def _student(institution, profile, today):
+    user = profile.user
+    balance = getattr(user, "point_balance", None)
+    activity = getattr(user, "activity", None)
+    return {
+        "id": user.id,
+        "username": user.username,
+        "name": user.get_full_name() or user.username,
+        "enrollment_no": profile.enrollment_no,
+        "class": class_label(institution, getattr(profile, class_field(institution))),
+        "points": balance.points if balance else 0,
+        "badges": profile.badge_count,
+        "attempts": activity.attempts if activity else 0,
+        "tasks_approved": activity.tasks_approved if activity else 0,
+        "login_streak": live_streak(activity.current_streak, activity.last_login_date, today) if activity else 0,
+        "last_login": activity.last_login_date.isoformat() if activity and activity.last_login_date else None,
+        "recent_attempts": [
+            {
+                "game": attempt.game.title,
+                "score": attempt.score,
+                "accuracy": attempt.accuracy,
+                "date": attempt.attempt_date.isoformat(),
+            }
+            for attempt in user.recent_attempts
+        ],
+        "pending_submissions": [
+            {"id": submission.id, "submission": submission.submission, "submitted_at": submission.submitted_at.isoformat()}
+            for submission in user.pending_submissions
+        ],
+    }
+
+
+# -------------------------------
+# Teacher dashboard: headline numbers and activity feed
+# -------------------------------
+def verification_counts(institution):
+    """Submissions waiting for a moderator, and approved since midnight, in one query."""
+    midnight = datetime.combine(localdate(), time.min, tzinfo=get_current_timezone())
+    return TaskSubmission.objects.filter(
+        user__studentprofile__institution=institution, status__in=["pending", "approved"]
+    ).aggregate(
+        pending=Count("id", filter=Q(status="pending")),
+        approved_today=Count("id", filter=Q(status="approved", verified_at__gte=midnight)),
+    )
+
+
+def recent_activity(institution, limit=RECENT_ACTIVITY, days=RECENT_ACTIVITY_DAYS):
+    """
+    The institution's latest EcoPoints and task submissions, newest first.
+    Only the last ``days`` days are looked at, so the sort never sees the
+    institution's whole history.
+    """
+    since = now() - timedelta(days=days)
+    points = (
+        EcoPoint.objects.filter(user__studentprofile__institution=institution, awarded_at__gte=since)
+        .select_related("user")
+        .only("points", "awarded_at", "is_daily", "submission_id", "user__username")
+        .order_by("-awarded_at")[:limit]
+    )
+    submissions = (
+        TaskSubmission.objects.filter(user__studentprofile__institution=institution, submitted_at__gte=since)
+        .select_related("user", "game")
+        .only("submitted_at", "user__username", "game__title")
+        .order_by("-submitted_at")[:limit]
+    )
+    events = [
+        (point.awarded_at, {
+            "type": "points",
+            "user": point.user.username,
+            "action": f"earned {point.points} EcoPoints",
+            "item": "for logging in" if point.is_daily else "for an approved task" if point.submission_id else "",
+        })
+        for point in points
+    ] + [
+        (submission.submitted_at, {
+            "type": "task",
+            "user": submission.user.username,
+            "action": "submitted",
+            "item": submission.game.title if submission.game else "a task",
+        })
+        for submission in submissions
+    ]
+    events.sort(key=lambda event: event[0], reverse=True)
+    return [{**event, "time": timesince(when)} for when, event in events[:limit]]
+
+
+# -------------------------------
+# Teacher dashboard: categories, tasks, badges and quizzes
+# -------------------------------
+def content_overview(institution):
+    """
+    The catalog, real-world tasks, badges and quizzes the dashboard tabs show,
+    with this institution's numbers next to them. Four queries; the categories
+    come from the in-memory catalog (catalog.py).
+    """
+    students = StudentProfile.objects.filter(institution=institution).aggregate(
+        students=Count("id"),
+        points=Sum("user__point_balance__points"),
+        active=Count("id", filter=Q(user__activity__last_login_date__gte=localdate() - timedelta(days=RECENT_ACTIVITY_DAYS))),
+    )
+    at_institution = Q(tasksubmission__user__studentprofile__institution=institution)
+    tasks = [
+        {
+            "id": game.id,
+            "title": game.title,
+            "topic": game.topic.name if game.topic else "",
+            "difficulty": game.difficulty,
+            "grades": [game.grade_min, game.grade_max],
+            "pending": game.pending,
+            "approved": game.approved,
+        }
+        for game in Game.objects.filter(game_type="real_world_task").select_related("topic").annotate(
+            pending=Count("tasksubmission", filter=at_institution & Q(tasksubmission__status="pending")),
+            approved=Count("tasksubmission", filter=at_institution & Q(tasksubmission__status="approved")),
+        ).order_by("title")
+    ]
+    badges = [
+        {"id": badge.id, "name": badge.name, "description": badge.description, "criteria": badge.unlock_criteria,
+         "earned_by": badge.earned_by}
+        for badge in Badge.objects.annotate(
+            earned_by=Count("userbadge", filter=Q(userbadge__user__studentprofile__institution=institution))
+        ).order_by("name")
+    ]
+
+    questions = {}
+    for subtopic_id, difficulty, count in (
+        QuizQuestion.objects.values("subtopic_id", "difficulty").annotate(count=Count("id"))
+        .order_by().values_list("subtopic_id", "difficulty", "count")
+    ):
+        questions.setdefault(subtopic_id, {})[difficulty] = count
+    categories, quizzes = [], []
+    for category in catalog.categories():
+        categories.append({
+            "id": category["id"],
+            "name": category["name"],
+            "description": category["description"],
+            "grades": [category["grade_min"], category["grade_max"]],
+            "subtopics": [subtopic["name"] for subtopic in category["subtopics"]],
+            "questions": sum(sum(questions.get(subtopic["id"], {}).values()) for subtopic in category["subtopics"]),
+        })
+        quizzes.extend(
+            {"id": subtopic["id"], "name": subtopic["name"], "category": category["name"],
+             "questions": questions[subtopic["id"]]}
+            for subtopic in category["subtopics"] if subtopic["id"] in questions
+        )
+
+    return {
+        "stats": {
+            "active_tasks": len(tasks),
+            "total_eco_points": students["points"] or 0,
+            "categories": len(categories),
+            "active_students": students["active"],
+            "students": students["students"],
+        },
+        "categories": categories,
+        "tasks": tasks,
+        "badges": badges,
+        "quizzes": quizzes,
+    }
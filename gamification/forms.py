@@ -0,0 +1,108 @@
+from django import forms
+from django.contrib.auth import password_validation
+from django.contrib.auth.validators import UnicodeUsernameValidator
+
+from . import institutions
+from .models import StudentProfile, User
+
+
+# -------------------------------
+# Signup
+# -------------------------------
+# Validation only: nothing here reads the users table. A taken username is
+# reported by accounts.register() when the unique constraint rejects it.
+
+STUDENT_ROLES = ["school_student", "college_student"]
+TEACHER_ROLES = ["school_teacher", "college_teacher"]
+ORGANIZATION_ROLES = ["ngo", "government"]
+
+
+class SignupForm(forms.Form):
+    role = forms.ChoiceField(choices=User.ROLE_CHOICES)
+    username = forms.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = forms.EmailField()
+    first_name = forms.CharField(max_length=150, required=False)
+    last_name = forms.CharField(max_length=150, required=False)
+    contact_no = forms.CharField(max_length=15, required=False)
+    dob = forms.DateField(required=False)
+    address = forms.CharField(required=False)
+    password1 = forms.CharField(strip=False)
+    password2 = forms.CharField(strip=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        password1, password2 = cleaned.get("password1"), cleaned.get("password2")
+        if password1 and password2 and password1 != password2:
+            self.add_error("password2", "Passwords do not match")
+        elif password1:
+            user = User(
+                username=cleaned.get("username", ""), email=cleaned.get("email", ""),
+                first_name=cleaned.get("first_name", ""), last_name=cleaned.get("last_name", ""),
+            )
+            try:
+                password_validation.validate_password(password1, user)
+            except forms.ValidationError as exc:
+                self.add_error("password1", exc)
+        return cleaned
+
+
+class InstitutionMemberForm(forms.Form):
+    """Students and teachers: an existing institution id, or "other" with its details."""
+
+    gender = forms.ChoiceField(choices=StudentProfile.gender_CHOICES, required=False)
+    institution = forms.CharField()
+    other_school_name = forms.CharField(max_length=255, required=False)
+    other_school_city = forms.CharField(max_length=100, required=False)
+    other_school_state = forms.CharField(max_length=100, required=False)
+
+    def clean_gender(self):
+        return self.cleaned_data["gender"] or "male"
+
+    def clean(self):
+        cleaned = super().clean()
+        value = cleaned.get("institution")
+        if value == "other":
+            for field in ("other_school_name", "other_school_city", "other_school_state"):
+                if not cleaned.get(field):
+                    self.add_error(field, "Required when your school/college is not listed")
+        elif value is not None:
+            # Checked against the search index: no query.
+            try:
+                institution_id = int(value)
+            except ValueError:
+                institution_id = None
+            if institution_id is None or institutions.get(institution_id) is None:
+                self.add_error("institution", "Pick your school/college from the list")
+            else:
+                cleaned["institution"] = institution_id
+        return cleaned
+
+
+class StudentForm(InstitutionMemberForm):
+    enrollment_no = forms.CharField(max_length=50)
+    grade = forms.IntegerField(min_value=1, max_value=12, required=False)
+    stream = forms.CharField(max_length=100, required=False)
+    current_year = forms.IntegerField(min_value=1, max_value=10, required=False)
+    course = forms.CharField(max_length=100, required=False)
+    field_of_study = forms.CharField(max_length=100, required=False)
+
+
+class TeacherForm(InstitutionMemberForm):
+    teacher_id = forms.CharField(max_length=50)
+    designation = forms.CharField(max_length=100, required=False)
+    department = forms.CharField(max_length=100, required=False)
+
+
+class OrganizationForm(forms.Form):
+    org_name = forms.CharField(max_length=255)
+    contact_person = forms.CharField(max_length=255)
+    website = forms.URLField(required=False)
+    city = forms.CharField(max_length=100)
+    state = forms.CharField(max_length=100)
+
+
+PROFILE_FORMS = {
+    **{role: StudentForm for role in STUDENT_ROLES},
+    **{role: TeacherForm for role in TEACHER_ROLES},
+    **{role: OrganizationForm for role in ORGANIZATION_ROLES},
+}
@@ -0,0 +1,169 @@
+import threading
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .ingest import MAX_TIME_TAKEN
+from .models import Game, GameAttempt, QuizOption, SubTopic
+from .quiz import QUIZ_CACHE_TTL, quiz_version
+
+
+# -------------------------------
+# Answer keys
+# -------------------------------
+# One key per subtopic: question id -> (sorted correct option ids, difficulty),
+# plus the quiz Game the attempts are recorded against. Keys share the quiz
+# payload version (quiz.py), which is kept in the database, so editing a
+# question or option on any process rebuilds them on every process.
+
+DIFFICULTY_WEIGHTS = {"easy": 1, "medium": 2, "hard": 3}
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+class GradingError(ValueError):
+    pass
+
+
+def _key(subtopic_id, version):
+    return f"quiz:answers:{subtopic_id}:{version}"
+
+
+def quiz_game_id(subtopic):
+    game_id = Game.objects.filter(subtopic=subtopic, game_type="quiz").order_by("id").values_list("id", flat=True).first()
+    if game_id is None:
+        game_id = Game.objects.create(
+            title=f"{subtopic.name} Quiz",
+            description=subtopic.description or f"Quiz on {subtopic.name}",
+            game_type="quiz",
+            grade_min=subtopic.category.grade_min,
+            grade_max=subtopic.category.grade_max,
+            subtopic=subtopic,
+        ).id
+    return game_id
+
+
+def build_answer_key(subtopic_id):
+    subtopic = SubTopic.objects.select_related("category").filter(id=subtopic_id).first()
+    if subtopic is None:
+        return None
+    questions = {}
+    rows = QuizOption.objects.filter(question__subtopic_id=subtopic_id).values_list(
+        "question_id", "id", "is_correct", "question__difficulty"
+    )
+    for question_id, option_id, is_correct, difficulty in rows:
+        correct, _ = questions.setdefault(question_id, ([], difficulty))
+        if is_correct:
+            correct.append(option_id)
+    return {
+        "game_id": quiz_game_id(subtopic),
+        "questions": {question_id: (tuple(sorted(correct)), difficulty) for question_id, (correct, difficulty) in questions.items()},
+    }
+
+
+def answer_key(subtopic_id):
+    version = quiz_version(subtopic_id)
+    local = _local.get(subtopic_id)
+    if local and local[0] == version:
+        return local[1]
+    key = cache.get(_key(subtopic_id, version))
+    if key is None:
+        key = build_answer_key(subtopic_id)
+        if key is None:
+            return None
+        cache.set(_key(subtopic_id, version), key, QUIZ_CACHE_TTL)
+    with _local_lock:
+        _local[subtopic_id] = (version, key)
+    return key
+
+
+# -------------------------------
+# Grading
+# -------------------------------
+def _selected(value):
+    values = value if isinstance(value, (list, tuple)) else [value]
+    try:
+        return tuple(sorted({int(option) for option in values}))
+    except (TypeError, ValueError, OverflowError):
+        raise GradingError("option ids must be numbers")
+
+
+def grade_sheet(key, answers, time_taken=None):
+    """Grade a whole answer sheet ({question_id: option id or ids}) in one pass over it."""
+    if not isinstance(answers, dict):
+        raise GradingError("answers must map question ids to option ids")
+    if time_taken is not None:
+        try:
+            time_taken = int(time_taken)
+        except (TypeError, ValueError, OverflowError):
+            raise GradingError("time_taken must be a number of seconds")
+        if not 0 <= time_taken <= MAX_TIME_TAKEN:
+            raise GradingError("time_taken is out of range")
+
+    # "5", "05" and "005" are all question 5: normalise before counting, so
+    # one question cannot be answered (and scored) more than once.
+    sheet = {}
+    for question_id, value in answers.items():
+        try:
+            number = int(question_id)
+        except (TypeError, ValueError):
+            number = None
+        if number not in key["questions"]:
+            raise GradingError(f"question {question_id} is not part of this quiz")
+        if number in sheet:
+            raise GradingError(f"question {number} is answered more than once")
+        sheet[number] = value
+
+    questions = key["questions"]
+    score = answered = correct_count = 0
+    results = {}
+    for question_id, value in sheet.items():
+        expected = questions[question_id]
+        correct = _selected(value) == expected[0]
+        answered += 1
+        if correct:
+            correct_count += 1
+            score += DIFFICULTY_WEIGHTS.get(expected[1], 1)
+        results[str(question_id)] = correct
+
+    return {
+        "score": score,
+        "correct": correct_count,
+        "answered": answered,
+        "total": len(questions),
+        "accuracy": round(correct_count * 100 / answered, 2) if answered else 0.0,
+        "progress": round(answered * 100 / len(questions), 2) if questions else 0.0,
+        "time_taken": time_taken,
+        "results": results,
+    }
+
+
+def build_attempt(user, key, result, client_attempt_id=None):
+    return GameAttempt(
+        user=user,
+        game_id=key["game_id"],
+        score=result["score"],
+        accuracy=result["accuracy"],
+        time_taken=result["time_taken"],
+        progress=result["progress"],
+        client_attempt_id=client_attempt_id,
+    )
+
+
+def grade_and_record(user, subtopic_id, answers, time_taken=None, client_attempt_id=None):
+    key = answer_key(subtopic_id)
+    if key is None:
+        raise GradingError("unknown subtopic")
+    result = grade_sheet(key, answers, time_taken)
+    attempt = build_attempt(user, key, result, client_attempt_id)
+    try:
+        with transaction.atomic():
+            attempt.save()
+    except IntegrityError:
+        # A retried submission: report the attempt that was already recorded.
+        attempt = GameAttempt.objects.filter(client_attempt_id=client_attempt_id, user=user).first()
+        if attempt is None:
+            raise
+    result["attempt_id"] = attempt.id
+    return result
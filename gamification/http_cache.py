@@ -0,0 +1,51 @@
+import os
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+
+from django.template.loader import get_template
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+# -------------------------------
+# HTTP cache policy
+# -------------------------------
+# Views that depend only on versioned data declare it with @cache_policy: the
+# ETag / Last-Modified come from the data's version token, a matching
+# If-None-Match / If-Modified-Since is answered 304 before the view runs, and
+# the response may be stored but must be revalidated (or reused for max_age
+# seconds). Everything else falls back to CachePolicyMiddleware, which keeps
+# no-store for authenticated, personalised pages.
+
+def version_time(token):
+    """Last-Modified for a time_ns() version token (as used by catalog, quiz, rollups)."""
+    return datetime.fromtimestamp(int(token) / 1e9, tz=timezone.utc)
+
+
+@lru_cache(maxsize=None)
+def template_version(template_name):
+    """(etag, last modified) of a template that renders without data; read once per process."""
+    stat = os.stat(get_template(template_name).origin.name)
+    return f"{template_name}-{stat.st_mtime_ns}-{stat.st_size}", datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+
+def cache_policy(etag=None, last_modified=None, public=False, max_age=0):
+    """
+    View decorator. ``etag`` and ``last_modified`` take the request (and the
+    view's arguments) and return None when the response must not be reused,
+    e.g. for a user who sees a personalised page at the same URL.
+    """
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if response.has_header("ETag") or response.has_header("Last-Modified"):
+                directives = {"public": True} if public else {"private": True}
+                if not max_age:
+                    directives["no_cache"] = True
+                patch_cache_control(response, max_age=max_age, **directives)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,223 @@
+import atexit
+import logging
+import math
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError, connections, models, transaction
+
+from . import badges
+from .jobs import enqueue
+from .models import Game, GameAttempt
+
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Buffered GameAttempt writes
+# -------------------------------
+class AttemptBuffer:
+    """
+    Collects GameAttempts posted by the games and writes them with one
+    bulk_create per batch. A batch is flushed when it reaches ``batch_size`` or
+    ``flush_seconds`` after its first attempt arrived, whichever comes first.
+    Attempts are keyed by client_attempt_id, so client retries collapse in the
+    buffer and are ignored by the unique constraint once written.
+
+    The buffer lives in process memory, so clients keep each attempt until
+    ``status`` reports it saved (or dropped) and post it again until then.
+    """
+
+    def __init__(self, batch_size, flush_seconds, max_pending):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._dropped = {}
+        self._timer = None
+
+    def add(self, attempts):
+        with self._lock:
+            for attempt in attempts:
+                self._pending[attempt.client_attempt_id] = attempt
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def status(self, attempts):
+        """
+        Split posted attempts into ``(saved, dropped, unsaved)``: client ids
+        already in the database, ``{client id: reason}`` for attempts a flush
+        had to drop, and the attempts that still need writing.
+        """
+        ids = [attempt.client_attempt_id for attempt in attempts]
+        saved = set(GameAttempt.objects.filter(client_attempt_id__in=ids).values_list("client_attempt_id", flat=True))
+        with self._lock:
+            dropped = {key: self._dropped[key] for key in ids if key in self._dropped and key not in saved}
+        unsaved = [attempt for attempt in attempts
+                   if attempt.client_attempt_id not in saved and attempt.client_attempt_id not in dropped]
+        return saved, dropped, unsaved
+
+    def flush(self):
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+
+        try:
+            return self._write(batch)
+        except DatabaseError:
+            logger.exception("Could not write %d game attempts, keeping them for the next flush", len(batch))
+            self._requeue(batch)
+            return 0
+
+    def _write(self, batch):
+        try:
+            with transaction.atomic():
+                return self._insert(batch)
+        except (DataError, IntegrityError, OverflowError):
+            # A value the database cannot store, or a game or student deleted
+            # while the attempt sat in the buffer: write the batch row by row so
+            # only that attempt is lost, not everyone else's.
+            logger.warning("A batch of %d game attempts has a row the database rejects, writing one by one", len(batch))
+        written = 0
+        for attempt in batch:
+            try:
+                # FK violations may only surface at commit, so count after it.
+                with transaction.atomic():
+                    inserted = self._insert([attempt])
+                written += inserted
+            except (DataError, IntegrityError, OverflowError) as exc:
+                logger.exception("Dropping game attempt %s of user %s", attempt.client_attempt_id, attempt.user_id)
+                self._drop(attempt, "game or student no longer exists" if isinstance(exc, IntegrityError) else "value out of range")
+        return written
+
+    def _insert(self, batch):
+        # Retries of attempts written by an earlier batch are dropped up front
+        # so the badge counters only see genuinely new attempts.
+        seen = set(
+            GameAttempt.objects.filter(client_attempt_id__in=[attempt.client_attempt_id for attempt in batch])
+            .values_list("client_attempt_id", flat=True)
+        )
+        fresh = [attempt for attempt in batch if attempt.client_attempt_id not in seen]
+        GameAttempt.objects.bulk_create(fresh, batch_size=self.batch_size, ignore_conflicts=True)
+        for user_id in badges.count_attempts([(attempt.user_id, attempt.game_id) for attempt in fresh]):
+            enqueue("badges.evaluate", user_id=user_id, metrics=["attempts", "topic"])
+        return len(batch)
+
+    def _drop(self, attempt, reason):
+        # Remembered so the client's next post of this id is answered as
+        # rejected instead of being buffered and dropped again.
+        with self._lock:
+            self._dropped[attempt.client_attempt_id] = reason
+            for key in list(self._dropped)[:len(self._dropped) - self.max_pending]:
+                del self._dropped[key]
+
+    def _requeue(self, batch):
+        with self._lock:
+            for attempt in batch:
+                self._pending.setdefault(attempt.client_attempt_id, attempt)
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                logger.error("Game attempt buffer full, dropping %d oldest attempts", overflow)
+                for key in list(self._pending)[:overflow]:
+                    del self._pending[key]
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own connection; don't leak it.
+            connections.close_all()
+
+
+attempt_buffer = AttemptBuffer(
+    batch_size=getattr(settings, "GAME_ATTEMPT_BATCH_SIZE", 50),
+    flush_seconds=getattr(settings, "GAME_ATTEMPT_FLUSH_SECONDS", 2),
+    max_pending=getattr(settings, "GAME_ATTEMPT_MAX_PENDING", 5000),
+)
+atexit.register(attempt_buffer.flush)
+
+
+# -------------------------------
+# Payload validation
+# -------------------------------
+class AttemptError(ValueError):
+    pass
+
+
+# Far above any real game, well inside the integer columns.
+MAX_SCORE = 1_000_000
+MAX_TIME_TAKEN = 24 * 60 * 60  # seconds
+
+
+def _number(payload, name, cast, low, high, required=False):
+    value = payload.get(name)
+    if value is None:
+        if required:
+            raise AttemptError(f"{name} is required")
+        return None
+    try:
+        # json.loads accepts Infinity, NaN and 1e400 (inf); int(inf) overflows.
+        value = cast(value)
+        if not math.isfinite(value):
+            raise ValueError(value)
+    except (TypeError, ValueError, OverflowError):
+        raise AttemptError(f"{name} must be a number")
+    if not low <= value <= high:
+        raise AttemptError(f"{name} is out of range")
+    return value
+
+
+def build_attempts(user, items):
+    """
+    Turn posted score dicts into unsaved GameAttempts for ``user``.
+    Returns ``(attempts, rejected)`` where rejected holds ``{"id", "error"}`` dicts.
+    """
+    game_ids = {str(item.get("game")) for item in items if item.get("game") is not None}
+    entries = {item["entry"] for item in items if isinstance(item.get("entry"), str)}
+    by_id, by_entry = {}, {}
+    if game_ids or entries:
+        lookup = models.Q(id__in=[value for value in game_ids if value.isdigit()]) | models.Q(entry_file__in=entries)
+        for game_id, entry_file in Game.objects.filter(lookup).values_list("id", "entry_file"):
+            by_id[str(game_id)] = game_id
+            if entry_file:
+                by_entry[entry_file] = game_id
+
+    attempts, rejected = [], []
+    for item in items:
+        client_id = item.get("id")
+        try:
+            try:
+                client_uuid = uuid.UUID(str(client_id))
+            except ValueError:
+                raise AttemptError("id must be a UUID")
+            entry = item.get("entry")
+            game_id = by_id.get(str(item.get("game"))) or (by_entry.get(entry) if isinstance(entry, str) else None)
+            if game_id is None:
+                raise AttemptError("unknown game")
+            attempts.append(GameAttempt(
+                user=user,
+                game_id=game_id,
+                client_attempt_id=client_uuid,
+                score=_number(item, "score", int, 0, MAX_SCORE, required=True),
+                accuracy=_number(item, "accuracy", float, 0, 100),
+                time_taken=_number(item, "time_taken", int, 0, MAX_TIME_TAKEN),
+                progress=_number(item, "progress", float, 0, 100),
+            ))
+        except AttemptError as exc:
+            rejected.append({"id": client_id, "error": str(exc)})
+    return attempts, rejected
@@ -0,0 +1,263 @@
+import copy
+import re
+import threading
+import time
+import unicodedata
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Institution
+
+
+# -------------------------------
+# Institution search
+# -------------------------------
+# Signup looks institutions up as the user types instead of listing them all.
+# Each process indexes every institution once: the trigrams of its name, city
+# and state (posting lists of entry numbers, so a query is a bincount over a
+# few arrays) and the sorted words of its name (so a prefix is a binary
+# search). New institutions (signup's "other", the roster import) bump an
+# "added" token and each process appends just those rows; an edit or delete
+# bumps the version token and the index is rebuilt (see signals.py).
+#
+# find_duplicate() uses the same normalisation to stop "St. Mary's School"
+# being added again as "St Marys  school" in the same city.
+
+VERSION_KEY = "institutions:version"
+ADDED_KEY = "institutions:added"
+ADD_WINDOW = 1000  # newest indexed institutions rechecked when others are added
+FIELDS = ("id", "name", "city", "state", "type")
+SEARCH_PAGE_SIZE = getattr(settings, "INSTITUTION_SEARCH_PAGE_SIZE", 10)
+MAX_PAGE_SIZE = 50
+MIN_SCORE = 0.5  # share of the query's trigrams an institution must contain
+PREFIX_BONUS = 0.5  # added when the last word typed starts a word of the name
+DUPLICATE_SIMILARITY = getattr(settings, "INSTITUTION_DUPLICATE_SIMILARITY", 0.8)
+
+_local = {"version": None, "added": None, "index": None}
+_local_lock = threading.Lock()
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def institutions_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """An institution was edited or deleted: every process rebuilds its index."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def added():
+    """Institutions were created: processes add them to the index they have."""
+    cache.set(ADDED_KEY, time.time_ns(), None)
+
+
+def normalise(text):
+    """St. Mary's  School -> st marys school."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text.replace("'", "")).split())
+
+
+def trigrams(text):
+    """Trigrams of each word padded as in pg_trgm, so short words and word starts count."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(first, second):
+    """Jaccard similarity of two normalised strings' trigrams."""
+    first, second = trigrams(first), trigrams(second)
+    if not first or not second:
+        return 1.0 if first == second else 0.0
+    return len(first & second) / len(first | second)
+
+
+class InstitutionIndex:
+    """
+    Search structures over (id, name, city, state, type) rows. Treated as
+    immutable once built: extended() returns a new index, so requests still
+    searching the old one are not disturbed.
+    """
+
+    def __init__(self, rows):
+        self.rows, self.names, self.places, self.by_place, self.by_id = [], [], [], {}, {}
+        self.schools = np.zeros(0, dtype=bool)
+        self.name_lengths = np.zeros(0, dtype=np.int32)
+        self.postings = {}
+        self.words = np.zeros(0, dtype=object)
+        self.word_entries = np.zeros(0, dtype=np.int32)
+        self._word_grams = {}
+        self._add(rows)
+
+    def extended(self, rows):
+        """A copy of this index with ``rows`` (newer institutions) added."""
+        index = copy.copy(self)
+        index.rows, index.names, index.places = list(self.rows), list(self.names), list(self.places)
+        index.by_place = {place: list(numbers) for place, numbers in self.by_place.items()}
+        index.by_id = dict(self.by_id)
+        index.postings = dict(self.postings)
+        index._add(rows)
+        return index
+
+    def _add(self, rows):
+        if not rows:
+            return
+        first = len(self.rows)
+        names = [normalise(name) for _, name, _, _, _ in rows]
+        places = [(normalise(city), normalise(state)) for _, _, city, state, _ in rows]
+        self.by_id.update((row[0], number) for number, row in enumerate(rows, start=first))
+        self.rows.extend(rows)
+        self.names.extend(names)
+        self.places.extend(places)
+        self.schools = np.concatenate([self.schools, np.array([kind == "School" for *_, kind in rows], dtype=bool)])
+        self.name_lengths = np.concatenate([self.name_lengths, np.array([len(name) for name in names], dtype=np.int32)])
+
+        # Names repeat the same words ("school", city names), so each word's
+        # trigrams are worked out once, and the new posting entries are cut
+        # out of one (trigram, entry) array sorted by trigram.
+        gram_ids, grams_by_id, words = {}, [], []
+        pair_grams, pair_entries = array("i"), array("i")
+        for number, (name, place) in enumerate(zip(names, places), start=first):
+            grams = set()
+            for word in " ".join((name, *place)).split():
+                word_grams = self._word_grams.get(word)
+                if word_grams is None:
+                    word_grams = self._word_grams[word] = tuple(trigrams(word))
+                grams.update(word_grams)
+            for gram in grams:
+                gram_id = gram_ids.get(gram)
+                if gram_id is None:
+                    gram_id = gram_ids[gram] = len(grams_by_id)
+                    grams_by_id.append(gram)
+                pair_grams.append(gram_id)
+            pair_entries.extend([number] * len(grams))
+            words.extend((word, number) for word in set(name.split()))
+            self.by_place.setdefault(place, []).append(number)
+
+        pair_grams = np.frombuffer(pair_grams, dtype=np.int32)
+        entries = np.frombuffer(pair_entries, dtype=np.int32)[np.argsort(pair_grams, kind="stable")]
+        counts = np.bincount(pair_grams, minlength=len(grams_by_id))
+        ends = np.cumsum(counts)
+        for gram_id, gram in enumerate(grams_by_id):
+            new = entries[ends[gram_id] - counts[gram_id]:ends[gram_id]]
+            old = self.postings.get(gram)
+            self.postings[gram] = new if old is None else np.concatenate([old, new])
+
+        words.sort()
+        new_words = np.empty(len(words), dtype=object)
+        new_words[:] = [word for word, _ in words]
+        positions = np.searchsorted(self.words, new_words)
+        self.words = np.insert(self.words, positions, new_words)
+        self.word_entries = np.insert(self.word_entries, positions, [number for _, number in words])
+
+    def prefixed(self, prefix):
+        """Entry numbers with a name word starting with ``prefix``."""
+        start, end = np.searchsorted(self.words, np.array([prefix, prefix + "\uffff"], dtype=object))
+        return self.word_entries[start:end]
+
+    def scores(self, query):
+        grams = trigrams(query)
+        scores = np.zeros(len(self.rows), dtype=np.float32)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if lists:
+            scores += np.bincount(np.concatenate(lists), minlength=len(self.rows)) / len(grams)
+        scores[self.prefixed(query.split()[-1])] += PREFIX_BONUS
+        return scores
+
+    def search(self, query, kind=None, city=None, state=None):
+        """Entry numbers matching ``query``, best first."""
+        query = normalise(query)
+        if not query or not self.rows:
+            return []
+        scores = self.scores(query)
+        matches = scores >= MIN_SCORE
+        if kind in ("School", "College"):
+            matches &= self.schools if kind == "School" else ~self.schools
+        if city or state:
+            wanted = (normalise(city), normalise(state))
+            place = np.zeros(len(self.rows), dtype=bool)
+            for key, numbers in self.by_place.items():
+                if (not city or key[0] == wanted[0]) and (not state or key[1] == wanted[1]):
+                    place[numbers] = True
+            matches &= place
+        found = np.flatnonzero(matches)
+        # Best score first, then shorter (closer) names, then oldest.
+        order = np.lexsort((found, self.name_lengths[found], -scores[found]))
+        return found[order].tolist()
+
+    def duplicate(self, name, city, state):
+        """Entry number of an institution in the same place with (nearly) the same name."""
+        name = normalise(name)
+        best, best_score = None, DUPLICATE_SIMILARITY
+        for number in self.by_place.get((normalise(city), normalise(state)), []):
+            score = similarity(name, self.names[number])
+            if score >= best_score:
+                best, best_score = number, score
+        return best
+
+    def entry(self, number):
+        institution_id, name, city, state, kind = self.rows[number]
+        return {"id": institution_id, "name": name, "city": city, "state": state, "type": kind}
+
+
+def build_index():
+    return InstitutionIndex(list(Institution.objects.order_by("id").values_list(*FIELDS)))
+
+
+def get_index():
+    version, added_token = institutions_version(), cache.get(ADDED_KEY)
+    index = _local["index"]
+    if _local["version"] == version and _local["added"] == added_token:
+        return index
+    if _local["version"] == version:
+        # Only rows past the newest ones indexed; the window also catches ids
+        # that committed out of order.
+        recent = index.rows[-ADD_WINDOW:]
+        known = {row[0] for row in recent}
+        newer = Institution.objects.order_by("id").values_list(*FIELDS)
+        if len(recent) == ADD_WINDOW:
+            newer = newer.filter(id__gt=recent[0][0])
+        index = index.extended([row for row in newer if row[0] not in known])
+    else:
+        index = build_index()
+    with _local_lock:
+        _local["version"], _local["added"], _local["index"] = version, added_token, index
+    return index
+
+
+def search(query, kind=None, city=None, state=None, page=1, limit=SEARCH_PAGE_SIZE):
+    """One page of institutions matching ``query`` (name, city or state, or the start of a word)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = max(1, page)
+    index = get_index()
+    found = index.search(query, kind, city, state)
+    start = (page - 1) * limit
+    return {
+        "results": [index.entry(number) for number in found[start:start + limit]],
+        "page": page,
+        "has_next": len(found) > start + limit,
+    }
+
+
+def get(institution_id):
+    """One institution as search() returns it, or None; from the index, without a query."""
+    index = get_index()
+    number = index.by_id.get(institution_id)
+    return None if number is None else index.entry(number)
+
+
+def find_duplicate(name, city, state):
+    """The id of an existing institution this one would duplicate, or None."""
+    index = get_index()
+    number = index.duplicate(name, city, state)
+    return None if number is None else index.rows[number][0]
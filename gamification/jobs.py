@@ -0,0 +1,171 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from .models import BackgroundJob
+
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Database-backed background jobs
+# -------------------------------
+# enqueue() writes a BackgroundJob row in the caller's transaction, so a job
+# exists exactly when the work that triggered it committed. `manage.py
+# run_jobs` claims ready rows with a compare-and-set UPDATE (works the same on
+# SQLite and PostgreSQL, no broker needed), runs the registered function and
+# retries failures with exponential backoff.
+#
+# Jobs are not wrapped in a transaction: each one opens its own where it needs
+# them, so a long job such as a roster import does not hold one (on SQLite,
+# the database write lock) for its whole run. A retried job may find part of
+# its work already done, so jobs must be safe to run again.
+#
+# While a job runs, a heartbeat thread refreshes heartbeat_at every
+# JOB_HEARTBEAT_SECONDS. requeue_stale() puts back running jobs whose heartbeat
+# stopped for JOB_STALE_SECONDS (their worker died), however long they have
+# been running, and fails those that have used up their attempts.
+
+BACKGROUND_JOBS_EAGER = getattr(settings, "BACKGROUND_JOBS_EAGER", False)
+JOB_RETRY_BASE_SECONDS = getattr(settings, "JOB_RETRY_BASE_SECONDS", 10)
+JOB_HEARTBEAT_SECONDS = getattr(settings, "JOB_HEARTBEAT_SECONDS", 30)
+JOB_STALE_SECONDS = getattr(settings, "JOB_STALE_SECONDS", 5 * 60)
+
+_registry = {}
+
+
+def job(name):
+    """Register a function as a background job under ``name``."""
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, run_after=None, max_attempts=5, **payload):
+    if name not in _registry:
+        raise KeyError(f"No background job registered as '{name}'")
+    queued = BackgroundJob.objects.create(
+        name=name, payload=payload, run_after=run_after or now(), max_attempts=max_attempts
+    )
+    if BACKGROUND_JOBS_EAGER:
+        # Development/tests without a worker: run right after the commit.
+        transaction.on_commit(lambda: run_claimed(claim_one(queued.pk, "eager")))
+    return queued
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_one(job_id, worker):
+    claimed = BackgroundJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", locked_by=worker, locked_at=now(), heartbeat_at=now(), attempts=F("attempts") + 1
+    )
+    return BackgroundJob.objects.get(pk=job_id) if claimed else None
+
+
+def claim(worker, limit=10):
+    ready = BackgroundJob.objects.filter(status="queued", run_after__lte=now()).order_by("run_after", "id")
+    claimed = []
+    for job_id in ready.values_list("id", flat=True)[:limit]:
+        # Another worker may win the row between the SELECT and this UPDATE.
+        claimed_job = claim_one(job_id, worker)
+        if claimed_job is not None:
+            claimed.append(claimed_job)
+    return claimed
+
+
+class Heartbeat(threading.Thread):
+    """Refreshes a running job's heartbeat_at until stop() is called."""
+
+    def __init__(self, job_id, interval=JOB_HEARTBEAT_SECONDS):
+        super().__init__(name=f"job-heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    BackgroundJob.objects.filter(pk=self.job_id, status="running").update(heartbeat_at=now())
+                except DatabaseError:
+                    # e.g. SQLite locked by the job itself; the next beat tries again.
+                    logger.warning("Could not refresh the heartbeat of job %s", self.job_id)
+        finally:
+            # The thread has its own connection; don't leak it.
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def run_claimed(claimed_job):
+    if claimed_job is None:
+        return False
+    func = _registry.get(claimed_job.name)
+    heartbeat = Heartbeat(claimed_job.pk)
+    heartbeat.start()
+    try:
+        if func is None:
+            raise KeyError(f"No background job registered as '{claimed_job.name}'")
+        func(**claimed_job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if claimed_job.attempts >= claimed_job.max_attempts:
+            logger.error("Job %s failed for good after %d attempts", claimed_job, claimed_job.attempts)
+            BackgroundJob.objects.filter(pk=claimed_job.pk).update(
+                status="failed", last_error=error, finished_at=now(), locked_by="", locked_at=None
+            )
+        else:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (claimed_job.attempts - 1)
+            logger.warning("Job %s failed, retrying in %ds", claimed_job, delay)
+            BackgroundJob.objects.filter(pk=claimed_job.pk).update(
+                status="queued", last_error=error, run_after=now() + timedelta(seconds=delay),
+                locked_by="", locked_at=None, heartbeat_at=None,
+            )
+        return False
+    finally:
+        heartbeat.stop()
+
+    BackgroundJob.objects.filter(pk=claimed_job.pk).update(
+        status="done", finished_at=now(), locked_by="", locked_at=None
+    )
+    return True
+
+
+def requeue_stale(timeout=JOB_STALE_SECONDS):
+    """
+    Put back jobs whose worker died mid-run (no heartbeat for ``timeout``
+    seconds), or fail them once they have used up their attempts. Returns
+    ``(requeued, failed)``.
+    """
+    cutoff = now() - timedelta(seconds=timeout)
+    # Rows claimed before heartbeats existed only have locked_at.
+    stale = BackgroundJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, locked_at__lt=cutoff), status="running"
+    )
+    error = f"The worker stopped responding (no heartbeat for {timeout}s)."
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", last_error=error, finished_at=now(), locked_by="", locked_at=None, heartbeat_at=None
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status="queued", last_error=error, locked_by="", locked_at=None, heartbeat_at=None
+    )
+    return requeued, failed
+
+
+def purge_finished(older_than_days):
+    cutoff = now() - timedelta(days=older_than_days)
+    deleted, _ = BackgroundJob.objects.filter(status="done", finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,100 @@
+from bisect import bisect_left, insort
+
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .jobs import enqueue
+from .models import StudentProfile, UserPointBalance
+
+
+# -------------------------------
+# Institution leaderboards
+# -------------------------------
+# Each institution's standings live in the cache as a sorted list of
+# (-points, username, user_id) tuples, so the top-N is a slice and any
+# student's rank is a bisect. Writes patch the cached list in place; the TTL
+# bounds how long a lost update between two processes can survive.
+#
+# Point changes are applied to the standings by the background worker when
+# the cache is shared between processes (Redis, Memcached, the database). A
+# local-memory cache is per process, so there the request that changed the
+# points applies them itself once it commits: the worker would only update
+# its own copy, which no page ever reads.
+
+LEADERBOARD_SIZE = getattr(settings, "LEADERBOARD_SIZE", 10)
+LEADERBOARD_TTL = getattr(settings, "LEADERBOARD_TTL", 300)
+
+
+def _key(institution_id):
+    return f"leaderboard:institution:{institution_id}"
+
+
+def rebuild(institution_id):
+    rows = (
+        UserPointBalance.objects.filter(user__studentprofile__institution_id=institution_id)
+        .order_by("-points", "user__username")
+        .values_list("points", "user__username", "user_id")
+    )
+    standings = [(-points, username, user_id) for points, username, user_id in rows]
+    cache.set(_key(institution_id), standings, LEADERBOARD_TTL)
+    return standings
+
+
+def standings(institution_id):
+    data = cache.get(_key(institution_id))
+    if data is None:
+        data = rebuild(institution_id)
+    return data
+
+
+def top(institution_id, size=LEADERBOARD_SIZE):
+    board = []
+    data = standings(institution_id)
+    for index, (neg_points, username, user_id) in enumerate(data[:size]):
+        # Competition ranking: ties share the rank of the first holder.
+        rank = index + 1 if index == 0 or data[index - 1][0] != neg_points else board[-1]["rank"]
+        board.append({"rank": rank, "user_id": user_id, "user__username": username, "total": -neg_points})
+    return board
+
+
+def rank_of(institution_id, user_id):
+    """Return ``(rank, participants)`` for a student, or ``(None, participants)``."""
+    data = standings(institution_id)
+    points = UserPointBalance.objects.filter(user_id=user_id).values_list("points", flat=True).first()
+    if points is None:
+        return None, len(data)
+    return bisect_left(data, (-points,)) + 1, len(data)
+
+
+def record(user_id):
+    """Move one student to their current balance in the cached standings."""
+    profile = StudentProfile.objects.filter(user_id=user_id).values_list("institution_id", "user__username").first()
+    if profile is None:
+        return
+    institution_id, username = profile
+    data = cache.get(_key(institution_id))
+    if data is None:
+        # Nothing cached yet; the next read rebuilds from the balance table.
+        return
+
+    data = [entry for entry in data if entry[2] != user_id]
+    points = UserPointBalance.objects.filter(user_id=user_id).values_list("points", flat=True).first()
+    if points is not None:
+        insort(data, (-points, username, user_id))
+    cache.set(_key(institution_id), data, LEADERBOARD_TTL)
+
+
+def shared_cache():
+    """True if every process (web and worker) sees the same cached standings."""
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def points_changed(user_id):
+    """A student's balance changed in this transaction: update the standings and badges after it commits."""
+    if not shared_cache():
+        transaction.on_commit(partial(record, user_id))
+    enqueue("points.changed", user_id=user_id)
@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+
+from .models import LoginCalendar, UserActivityCounter
+
+
+# -------------------------------
+# Login calendar
+# -------------------------------
+# A login is stored as one bit in a per-user, per-year bitmap (46 bytes per
+# user per year) instead of one LoginHistory row per login. The running
+# streak, longest streak and login-day total live on UserActivityCounter, so
+# streak lookups read a single row. "Active days this month" counts at most
+# 31 bits of one calendar row.
+
+CALENDAR_BYTES = 46  # 366 days rounded up to whole bytes
+
+
+def day_bit(day):
+    """(byte index, bit mask) of ``day`` inside its year's bitmap."""
+    offset = day.timetuple().tm_yday - 1
+    return offset // 8, 1 << (offset % 8)
+
+
+def _as_bits(days):
+    return bytearray(days) if days else bytearray(CALENDAR_BYTES)
+
+
+def _count_bits(bits, first, last):
+    """Number of set bits for day-of-year offsets first..last (inclusive)."""
+    value = int.from_bytes(bits, "little") >> first
+    return (value & ((1 << (last - first + 1)) - 1)).bit_count()
+
+
+def record_login(user_id, day):
+    """
+    Mark ``day`` as active for the user and advance the streak counters.
+    Returns True the first time a day is recorded, False for repeat logins.
+    """
+    index, mask = day_bit(day)
+    with transaction.atomic():
+        # The row exists for every login after the first of the year: look it
+        # up first, and only create it (racing other logins) on a miss.
+        calendars = LoginCalendar.objects.select_for_update().filter(user_id=user_id, year=day.year)
+        calendar = calendars.first()
+        if calendar is None:
+            try:
+                with transaction.atomic():
+                    calendar = LoginCalendar.objects.create(user_id=user_id, year=day.year, days=bytes(CALENDAR_BYTES))
+            except IntegrityError:
+                calendar = calendars.get()
+        bits = _as_bits(calendar.days)
+        if bits[index] & mask:
+            return False
+        bits[index] |= mask
+        calendar.days = bytes(bits)
+        calendar.active_days += 1
+        calendar.save(update_fields=["days", "active_days"])
+
+        counter, _ = UserActivityCounter.objects.select_for_update().get_or_create(user_id=user_id)
+        counter.login_days += 1
+        if counter.last_login_date is None or counter.last_login_date < day:
+            if counter.last_login_date == day - timedelta(days=1):
+                counter.current_streak += 1
+            else:
+                counter.current_streak = 1
+            counter.longest_streak = max(counter.longest_streak, counter.current_streak)
+            counter.last_login_date = day
+        counter.save(update_fields=["current_streak", "longest_streak", "login_days", "last_login_date"])
+    return True
+
+
+def streaks(user_id, today):
+    """(current streak, longest streak); the current streak is 0 once a day is missed."""
+    row = UserActivityCounter.objects.filter(user_id=user_id).values(
+        "current_streak", "longest_streak", "last_login_date"
+    ).first()
+    if row is None:
+        return 0, 0
+    return live_streak(row["current_streak"], row["last_login_date"], today), row["longest_streak"]
+
+
+def live_streak(current_streak, last_login_date, today):
+    """The stored streak, or 0 if the user has since missed a day."""
+    if last_login_date is None or last_login_date < today - timedelta(days=1):
+        return 0
+    return current_streak
+
+
+def active_days_in_month(user_id, year, month):
+    days = LoginCalendar.objects.filter(user_id=user_id, year=year).values_list("days", flat=True).first()
+    if not days:
+        return 0
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return _count_bits(bytes(days), first.timetuple().tm_yday - 1, last.timetuple().tm_yday - 1)
+
+
+def was_active(user_id, day):
+    days = LoginCalendar.objects.filter(user_id=user_id, year=day.year).values_list("days", flat=True).first()
+    if not days:
+        return False
+    index, mask = day_bit(day)
+    return bool(bytes(days)[index] & mask)
+
+
+def iter_days(year, days):
+    """Yield the dates set in one calendar bitmap, in order."""
+    bits = bytes(days)
+    start = date(year, 1, 1)
+    for index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield start + timedelta(days=index * 8 + bit)
@@ -0,0 +1,126 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from gamification.middleware import sql_shape
+from gamification.models import Category, StudentProfile, TeacherProfile, User
+
+
+# -------------------------------
+# Dashboard views to audit
+# -------------------------------
+# Each view is requested once, as a sample user of the given kind, with a cold
+# cache, and every SELECT it issues is EXPLAINed. The queries are captured
+# from the real views, so this list only names the views: it cannot drift
+# from what they actually run.
+# (URL name, kind of user, URL kwargs factory taking the sample users)
+AUDITED_VIEWS = [
+    ("student_dashboard", "student", lambda users: {"slug": users["student"].slug}),
+    ("explore_subtopics", "student", lambda users: {"category_id": users["category_id"]}),
+    ("teacher_dashboard", "teacher", lambda users: {"slug": users["teacher"].slug}),
+    ("teacher_students", "teacher", lambda users: {}),
+    ("teacher_analytics", "teacher", lambda users: {}),
+    ("analytics_dashboard", "analytics", lambda users: {}),
+]
+
+# Small reference tables read whole into in-process copies (catalog,
+# registry, badge rules); a full scan of these is expected.
+SCAN_EXPECTED = {
+    "gamification_category", "gamification_subtopic", "gamification_game", "gamification_gameasset",
+    "gamification_gametopic", "gamification_badge",
+}
+
+# SQLite: "SCAN gamification_ecopoint" (no USING INDEX); PostgreSQL: "Seq Scan on ..."
+FULL_SCAN_PATTERNS = [
+    re.compile(r"\bSCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)"),
+    re.compile(r"Seq Scan on (\w+)"),
+]
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(row[-1] for row in cursor.fetchall())
+        cursor.execute(f"EXPLAIN {sql}")
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def capture(client, user, url):
+    """The SELECTs ``user`` causes by requesting ``url``; nothing the view writes is kept."""
+    with transaction.atomic():
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        transaction.set_rollback(True)
+    return [query["sql"] for query in queries.captured_queries if query["sql"].lstrip().upper().startswith("SELECT")]
+
+
+class Command(BaseCommand):
+    help = "Request each dashboard view as a sample user, EXPLAIN every query it issues and flag full-table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username of the student to request the student views as.")
+        parser.add_argument("--view", help="Only audit this view name.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not just the flagged ones.")
+
+    def sample_users(self, student_username):
+        students = StudentProfile.objects.select_related("user")
+        if student_username:
+            students = students.filter(user__username=student_username)
+        student = students.first()
+        if student is None:
+            raise CommandError("Need at least one student profile to request the dashboards as.")
+        teacher = TeacherProfile.objects.select_related("user").first()
+        return {
+            "student": student.user,
+            "teacher": teacher.user if teacher else None,
+            "analytics": User.objects.filter(role__in=["ngo", "government"]).first(),
+            "category_id": Category.objects.values_list("id", flat=True).first(),
+        }
+
+    def handle(self, *args, **options):
+        users = self.sample_users(options["user"])
+        tables = set(connection.introspection.table_names())
+        flagged = 0
+        seen = set()
+        # A cold cache, so views show the queries behind their cached data too
+        # (more than their query budgets allow, which is not what this checks).
+        caches = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "audit-indexes"}}
+        with override_settings(ALLOWED_HOSTS=["testserver"], CACHES=caches, QUERY_BUDGET_RAISE=False):
+            client = Client()
+            for view, kind, kwargs in AUDITED_VIEWS:
+                if options["view"] and options["view"] != view:
+                    continue
+                if users[kind] is None or (view == "explore_subtopics" and users["category_id"] is None):
+                    self.stdout.write(self.style.WARNING(f"[{view}] skipped: no sample {kind} or category."))
+                    continue
+                queries = capture(client, users[kind], reverse(view, kwargs=kwargs(users)))
+                self.stdout.write(f"[{view}] {len(queries)} queries")
+                for sql in queries:
+                    # The same query from several views (the session lookup, say) is explained once.
+                    shape = sql_shape(sql)
+                    if shape in seen:
+                        continue
+                    seen.add(shape)
+                    plan = explain(sql)
+                    # Subqueries and CTEs are scanned by name too; only real tables count.
+                    scanned = sorted({table for pattern in FULL_SCAN_PATTERNS for table in pattern.findall(plan)} & tables)
+                    label = shape[:120]
+                    if set(scanned) - SCAN_EXPECTED:
+                        flagged += 1
+                        self.stdout.write(self.style.ERROR(f"[{view}] full scan of {', '.join(scanned)}: {label}"))
+                        self.stdout.write(plan)
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f"[{view}] ok: {label}"))
+                        if options["verbose_plans"]:
+                            self.stdout.write(plan)
+
+        summary = f"{flagged} of {len(seen)} queries with unexpected full-table scans on {connection.vendor}."
+        self.stdout.write(self.style.ERROR(summary) if flagged else self.style.SUCCESS(summary))
+        if flagged:
+            self.stdout.write("Plans depend on table statistics; run ANALYZE on production-sized data before trusting them.")
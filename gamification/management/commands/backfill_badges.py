@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from gamification.badges import METRICS, compiled_rules, satisfied
+from gamification.logins import iter_days
+from gamification.models import (
+    EcoPoint, GameAttempt, LoginCalendar, UserActivityCounter, UserBadge, UserPointBalance, UserTopicCounter,
+)
+
+
+class Command(BaseCommand):
+    help = "Award badges for existing data in bulk. Optionally rebuild the activity counters from history first."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild-counters",
+            action="store_true",
+            help="Recompute attempts, topic attempts, approved tasks and login streaks from history and login calendars.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def rebuild_counters(self, batch_size):
+        counters = {}
+
+        def counter(user_id):
+            return counters.setdefault(user_id, UserActivityCounter(user_id=user_id))
+
+        for user_id, total in GameAttempt.objects.values("user_id").annotate(n=Count("id")).order_by().values_list("user_id", "n"):
+            counter(user_id).attempts = total
+        for user_id, total in (
+            EcoPoint.objects.filter(submission__isnull=False)
+            .values("user_id").annotate(n=Count("id")).order_by().values_list("user_id", "n")
+        ):
+            counter(user_id).tasks_approved = total
+
+        calendars = LoginCalendar.objects.order_by("user_id", "year").values_list("user_id", "year", "days")
+        for user_id, year, bitmap in calendars.iterator(chunk_size=1000):
+            row = counter(user_id)
+            for day in iter_days(year, bitmap):
+                if row.last_login_date == day - timedelta(days=1):
+                    row.current_streak += 1
+                else:
+                    row.current_streak = 1
+                row.longest_streak = max(row.longest_streak, row.current_streak)
+                row.login_days += 1
+                row.last_login_date = day
+
+        topics = (
+            GameAttempt.objects.filter(game__topic__isnull=False)
+            .values("user_id", "game__topic_id").annotate(n=Count("id")).order_by()
+            .values_list("user_id", "game__topic_id", "n")
+        )
+        with transaction.atomic():
+            UserActivityCounter.objects.all().delete()
+            UserActivityCounter.objects.bulk_create(counters.values(), batch_size=batch_size)
+            UserTopicCounter.objects.all().delete()
+            UserTopicCounter.objects.bulk_create(
+                (UserTopicCounter(user_id=user_id, topic_id=topic_id, attempts=n) for user_id, topic_id, n in topics),
+                batch_size=batch_size,
+            )
+        self.stdout.write(f"Rebuilt counters for {len(counters)} users.")
+
+    def handle(self, *args, **options):
+        if options["rebuild_counters"]:
+            self.rebuild_counters(options["batch_size"])
+
+        rules = compiled_rules()
+        if not rules:
+            self.stdout.write("No badges with valid unlock criteria.")
+            return
+
+        fields = set(METRICS.values()) - {"points"}
+        stats = {
+            row.pop("user_id"): row for row in UserActivityCounter.objects.values("user_id", *fields)
+        }
+        points = dict(UserPointBalance.objects.values_list("user_id", "points"))
+        topic_attempts = {}
+        for user_id, topic_id, attempts in UserTopicCounter.objects.values_list("user_id", "topic_id", "attempts"):
+            topic_attempts.setdefault(user_id, {})[topic_id] = attempts
+        owned = set(UserBadge.objects.values_list("user_id", "badge_id"))
+
+        awards = []
+        for user_id in stats.keys() | points.keys():
+            row = stats.get(user_id, {})
+            user_stats = {metric: row.get(field, 0) for metric, field in METRICS.items()}
+            user_stats["points"] = points.get(user_id, 0)
+            for badge_id, conditions in rules:
+                if (user_id, badge_id) not in owned and satisfied(conditions, user_stats, topic_attempts.get(user_id, {})):
+                    awards.append(UserBadge(user_id=user_id, badge_id=badge_id))
+
+        # unique_together (user, badge) turns races with the live engine into no-ops.
+        UserBadge.objects.bulk_create(awards, batch_size=options["batch_size"], ignore_conflicts=True)
+        self.stdout.write(self.style.SUCCESS(f"Awarded {len(awards)} badges."))
@@ -0,0 +1,100 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from gamification import passwords
+from gamification.models import User
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+def parse_config(text):
+    """
+    "pbkdf2", "pbkdf2:<iterations>", "argon2" or
+    "argon2:<time_cost>:<memory_cost KiB>:<parallelism>" -> settings to override.
+    """
+    strategy, *costs = text.split(":")
+    try:
+        costs = [int(cost) for cost in costs]
+    except ValueError:
+        raise CommandError(f"Costs must be numbers: {text!r}.")
+    try:
+        overrides = {"PASSWORD_HASHERS": passwords.hashers_for(strategy)}
+    except ValueError as exc:
+        raise CommandError(str(exc))
+    if strategy == "pbkdf2" and costs:
+        overrides["PASSWORD_PBKDF2_ITERATIONS"] = costs[0]
+    elif strategy == "argon2" and costs:
+        overrides["PASSWORD_ARGON2"] = dict(zip(("time_cost", "memory_cost", "parallelism"), costs))
+    elif costs:
+        raise CommandError(f"Unexpected costs in {text!r}.")
+    return overrides
+
+
+class Command(BaseCommand):
+    help = (
+        "Log a throwaway user in repeatedly under each hashing configuration and report logins/sec "
+        "and logins per CPU-second (per core). Configurations: pbkdf2[:iterations], "
+        "argon2[:time_cost:memory_kib:parallelism]; argon2 needs argon2-cffi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("configs", nargs="*", help="Hashing configurations (default: the current one, "
+                                                       "Django's PBKDF2 default and argon2 when installed).")
+        parser.add_argument("--count", type=int, default=50, help="Logins per configuration.")
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent logins (request threads).")
+
+    def handle(self, *args, **options):
+        configs = options["configs"]
+        if not configs:
+            configs = [
+                settings.PASSWORD_HASHING,
+                "pbkdf2:1000000",
+                *(["argon2"] if argon2 is not None else []),
+            ]
+        count = max(1, options["count"])
+        self.stdout.write(f"{count} logins per configuration, {options['threads']} threads, "
+                          f"{passwords.LOGIN_HASH_WORKERS} hashing workers.")
+        for config in configs:
+            overrides = parse_config(config)
+            if overrides["PASSWORD_HASHERS"][0] == passwords.HASHERS["argon2"] and argon2 is None:
+                self.stdout.write(self.style.WARNING(f"{config}: skipped, argon2-cffi is not installed."))
+                continue
+            with override_settings(**overrides):
+                self.bench(config, count, max(1, options["threads"]))
+
+    def bench(self, config, count, threads):
+        username = f"bench-login-{uuid.uuid4().hex[:8]}"
+        password = "bench-Passw0rd!"
+        user = User.objects.create(username=username, slug=username, role="school_student",
+                                   password=make_password(password))
+
+        def login(_):
+            try:
+                return authenticate(None, username=username, password=password, role="school_student") is not None
+            except passwords.HashingBusy:
+                return None
+            finally:
+                connection.close()
+
+        try:
+            started, cpu_started = time.perf_counter(), time.process_time()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(login, range(count)))
+            elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        finally:
+            user.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"{config}: {count / elapsed:.1f} logins/s, {count / cpu:.1f} logins/s per core "
+            f"({results.count(False)} failed, {results.count(None)} turned away)."
+        ))
@@ -0,0 +1,76 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from gamification import accounts
+from gamification.models import Institution, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Register throwaway student accounts through the signup pipeline from several threads "
+        "and report registrations/sec and latency. Every tenth signup reuses a username, so the "
+        "duplicate path is measured too. The accounts are deleted afterwards unless --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200, help="Signups to attempt.")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent signups.")
+        parser.add_argument("--fast-hash", action="store_true",
+                            help="Hash with MD5 so the numbers show the database side only.")
+        parser.add_argument("--keep", action="store_true", help="Keep the accounts created.")
+
+    def handle(self, *args, **options):
+        institution = Institution.objects.order_by("id").first()
+        created_institution = institution is None
+        if created_institution:
+            institution = Institution.objects.create(name="Bench School", city="Bench", state="Bench", type="School")
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        count = max(1, options["count"])
+
+        def signup(number):
+            # Every tenth signup asks for the previous username again.
+            username = f"{prefix}-{number - 1 if number % 10 == 9 else number}"
+            data = {
+                "role": "school_student", "username": username, "email": f"{username}@example.com",
+                "first_name": "Bench", "last_name": str(number),
+                "password1": "bench-Passw0rd!", "password2": "bench-Passw0rd!",
+                "institution": str(institution.id), "enrollment_no": f"B{number}", "grade": "8",
+            }
+            started = time.perf_counter()
+            try:
+                accounts.register(data)
+                outcome = "created"
+            except accounts.SignupError:
+                outcome = "rejected"
+            except Exception:
+                outcome = "error"
+            finally:
+                connection.close()
+            return outcome, time.perf_counter() - started
+
+        hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"] if options["fast_hash"] else None
+        with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, options["threads"])) as pool:
+                results = list(pool.map(signup, range(count)))
+            elapsed = time.perf_counter() - started
+
+        outcomes = [outcome for outcome, _ in results]
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} signups in {elapsed:.2f}s ({count / elapsed:.1f}/s): "
+            f"{outcomes.count('created')} created, {outcomes.count('rejected')} rejected, "
+            f"{outcomes.count('error')} errors; p50 {statistics.median(latencies):.0f}ms, p95 {p95:.0f}ms."
+        ))
+
+        if not options["keep"]:
+            User.objects.filter(username__startswith=f"{prefix}-").delete()
+            if created_institution:
+                institution.delete()
@@ -0,0 +1,79 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gamification import badges
+from gamification.grading import GradingError, answer_key, build_attempt, grade_sheet
+from gamification.jobs import enqueue
+from gamification.models import GameAttempt, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Grade a class's offline answer sheets from a CSV file and record one GameAttempt per sheet. "
+        "Columns: username, subtopic, answers, time_taken (optional). "
+        "answers looks like '12:40;13:44|45' (question:option, several options joined with |)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--dry-run", action="store_true", help="Grade and report, but do not record attempts.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def parse_answers(self, raw):
+        answers = {}
+        for pair in filter(None, (part.strip() for part in raw.split(";"))):
+            question, _, options = pair.partition(":")
+            if not options:
+                raise GradingError(f"malformed answer '{pair}'")
+            answers[question.strip()] = [option.strip() for option in options.split("|")]
+        return answers
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8-sig") as handle:
+                rows = list(csv.DictReader(handle))
+        except OSError as exc:
+            raise CommandError(exc)
+        if rows and not {"username", "subtopic", "answers"} <= rows[0].keys():
+            raise CommandError("CSV needs username, subtopic and answers columns.")
+
+        # One query for every student on the sheets; answer keys come from the cache.
+        users = User.objects.in_bulk({row["username"].strip() for row in rows}, field_name="username")
+        keys = {}
+
+        attempts, errors = [], 0
+        for line, row in enumerate(rows, start=2):
+            try:
+                user = users.get(row["username"].strip())
+                if user is None:
+                    raise GradingError(f"unknown user '{row['username']}'")
+                try:
+                    subtopic_id = int(row["subtopic"])
+                except ValueError:
+                    raise GradingError("subtopic must be an id")
+                if subtopic_id not in keys:
+                    keys[subtopic_id] = answer_key(subtopic_id)
+                key = keys[subtopic_id]
+                if key is None:
+                    raise GradingError(f"unknown subtopic {subtopic_id}")
+                result = grade_sheet(key, self.parse_answers(row["answers"]), row.get("time_taken") or None)
+            except GradingError as exc:
+                errors += 1
+                self.stderr.write(f"line {line}: {exc}")
+                continue
+            attempts.append(build_attempt(user, key, result))
+            self.stdout.write(
+                f"line {line}: {user.username} scored {result['score']} "
+                f"({result['correct']}/{result['answered']} correct)"
+            )
+
+        if not options["dry_run"]:
+            with transaction.atomic():
+                GameAttempt.objects.bulk_create(attempts, batch_size=options["batch_size"])
+                for user_id in badges.count_attempts([(attempt.user_id, attempt.game_id) for attempt in attempts]):
+                    enqueue("badges.evaluate", user_id=user_id, metrics=["attempts", "topic"])
+
+        verb = "Graded" if options["dry_run"] else "Recorded"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(attempts)} sheets, {errors} rejected."))
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gamification import roster
+from gamification.models import Institution
+
+
+class Command(BaseCommand):
+    help = (
+        "Create student and teacher accounts from a roster (.csv, or .xlsx with openpyxl installed). "
+        "Columns: username, role, password, first_name, last_name, email, institution_name, "
+        "institution_city, institution_state and the profile fields (grade, enrollment_no, teacher_id, ...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster file.")
+        parser.add_argument("--report", default=None, help="Write the per-row report (CSV) here; '-' for stdout.")
+        parser.add_argument("--institution", type=int, default=None,
+                            help="Put everyone in this institution id and ignore the institution columns.")
+        parser.add_argument("--batch-size", type=int, default=roster.ROSTER_BATCH_SIZE, help="Rows per transaction.")
+        parser.add_argument("--workers", type=int, default=roster.ROSTER_HASH_WORKERS,
+                            help="Processes hashing passwords.")
+
+    def handle(self, *args, **options):
+        institution = None
+        if options["institution"] is not None:
+            institution = Institution.objects.filter(id=options["institution"]).first()
+            if institution is None:
+                raise CommandError(f"No institution with id {options['institution']}.")
+
+        report = options["report"]
+        report_file = None
+        if report == "-":
+            report_file = sys.stdout
+        elif report:
+            report_file = open(report, "w", newline="", encoding="utf-8")
+        started = time.monotonic()
+        try:
+            with open(options["path"], "rb") as handle:
+                counts = roster.import_roster(
+                    handle, os.path.basename(options["path"]), report_file, institution=institution,
+                    batch_size=max(1, options["batch_size"]), workers=options["workers"],
+                )
+        except (OSError, roster.RosterError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if report_file is not None and report_file is not sys.stdout:
+                report_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['created']} of {counts['rows']} rows imported in {time.monotonic() - started:.1f}s; "
+            f"{counts['exists']} already existed, {counts['error']} had errors, "
+            f"{counts['institutions_created']} institutions created."
+        ))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from gamification.models import EcoPoint, UserPointBalance
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Rebuild UserPointBalance from the EcoPoint ledger and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not write anything.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(EcoPoint.objects.values_list("user_id", flat=True).distinct())
+            | set(UserPointBalance.objects.values_list("user_id", flat=True))
+        )
+        drifted = 0
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            drifted += self.repair(user_ids[start:start + BATCH_SIZE], options["dry_run"])
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"No drift across {len(user_ids)} ledgers."))
+        elif options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{drifted} balances drifted (dry run, nothing written)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {drifted} balances."))
+
+    def repair(self, user_ids, dry_run):
+        """
+        Compare and fix one batch of users. The balance rows are locked before
+        the ledger is summed, so a ledger write either commits before the sum
+        (and is in it) or waits and applies its delta on top of the repair.
+        """
+        with transaction.atomic():
+            balances = dict(
+                UserPointBalance.objects.select_for_update().filter(user_id__in=user_ids).values_list("user_id", "points")
+            )
+            ledger = dict(
+                EcoPoint.objects.filter(user_id__in=user_ids)
+                .values("user_id").annotate(total=Sum("points")).order_by().values_list("user_id", "total")
+            )
+            drifted = {}
+            for user_id in user_ids:
+                expected = ledger.get(user_id, 0)
+                stored = balances.get(user_id)
+                if stored != expected and not (stored is None and expected == 0):
+                    drifted[user_id] = (stored, expected)
+                    self.stdout.write(f"user {user_id}: stored={stored} ledger={expected}")
+            if dry_run or not drifted:
+                return len(drifted)
+
+            # A row created meanwhile by the first ledger write was seeded from
+            # the ledger itself; keep it.
+            UserPointBalance.objects.bulk_create(
+                [UserPointBalance(user_id=user_id, points=expected)
+                 for user_id, (stored, expected) in drifted.items() if stored is None],
+                ignore_conflicts=True,
+            )
+            for user_id, (stored, expected) in drifted.items():
+                if stored is not None:
+                    UserPointBalance.objects.filter(user_id=user_id).update(points=expected)
+        return len(drifted)
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate
+
+from gamification import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold new EcoPoints and GameAttempts into the daily analytics rollups (run every few minutes). "
+        "With --rebuild, recompute finished days from scratch (run nightly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute whole days instead of folding new rows.")
+        parser.add_argument("--days", type=int, default=2, help="With --rebuild: how many finished days to recompute.")
+        parser.add_argument("--since", default=None, help="With --rebuild: first day to recompute (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        if not options["rebuild"]:
+            folded = rollups.refresh()
+            self.stdout.write(self.style.SUCCESS(
+                "Folded " + (", ".join(f"{count} {source} ids" for source, count in folded.items()) or "nothing new") + "."
+            ))
+            return
+
+        # Today is still being written to and is left to the incremental refresh.
+        last = localdate() - timedelta(days=1)
+        if options["since"]:
+            try:
+                first = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must look like 2025-01-31")
+        else:
+            first = last - timedelta(days=max(options["days"], 1) - 1)
+        if first > last:
+            raise CommandError("Nothing to rebuild: --since must be before today.")
+
+        # Fold first so the rebuild sees every row up to the newest id.
+        rollups.refresh()
+        rows = rollups.rebuild(first, last)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} institution-days from {first} to {last}."))
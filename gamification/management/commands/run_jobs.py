@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gamification import jobs, roster
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (leaderboards, point awards, badges) from the BackgroundJob table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the ready jobs once and exit.")
+        parser.add_argument("--batch", type=int, default=20, help="Jobs claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--worker-id", default=None, help="Name recorded on claimed jobs.")
+        parser.add_argument("--purge-after", type=int, default=7, help="Delete finished jobs older than this many days.")
+
+    def handle(self, *args, **options):
+        worker = options["worker_id"] or jobs.worker_name()
+        self.stdout.write(f"Worker {worker} started.")
+        last_housekeeping = 0.0
+        done = failed = 0
+        try:
+            while True:
+                if time.monotonic() - last_housekeeping > 60:
+                    requeued, expired = jobs.requeue_stale()
+                    if requeued or expired:
+                        self.stdout.write(self.style.WARNING(
+                            f"Requeued {requeued} stale jobs, failed {expired} out of attempts."
+                        ))
+                    jobs.purge_finished(options["purge_after"])
+                    roster.purge_uploads()
+                    last_housekeeping = time.monotonic()
+
+                claimed = jobs.claim(worker, options["batch"])
+                for claimed_job in claimed:
+                    if jobs.run_claimed(claimed_job):
+                        done += 1
+                    else:
+                        failed += 1
+
+                if not claimed:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped: {done} done, {failed} failed."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from gamification import registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Register the games under static/games/ and the uploaded Category game files, "
+        "and link them to Game rows (run after adding or updating a game)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-create", action="store_true", help="Do not create Game rows for new bundled games.")
+        parser.add_argument("--uploads-only", action="store_true", help="Only rescan uploaded Category game files.")
+
+    def handle(self, *args, **options):
+        counts = registry.scan(static=not options["uploads_only"], create_games=not options["no_create"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['created']} new, {counts['updated']} changed, {counts['removed']} removed games; "
+            f"{counts['games_created']} Game rows created."
+        ))
@@ -1,9 +1,140 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import add_never_cache_headers, patch_cache_control
 from django.utils.deprecation import MiddlewareMixin
 from django.shortcuts import redirect
 
-class NoCacheMiddleware(MiddlewareMixin):
+# -------------------------------
+# Default cache policy
+# -------------------------------
+class CachePolicyMiddleware(MiddlewareMixin):
+    """
+    Cache-Control for responses whose view did not choose one (see
+    http_cache.cache_policy). Pages for a signed-in user are personalised and
+    must not outlive a logout in the browser's back/forward cache, so they are
+    never stored; anonymous pages may be stored but are revalidated.
+    """
+
     def process_response(self, request, response):
-        response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response['Pragma'] = 'no-cache'
-        response['Expires'] = '0'
-        return response
\ No newline at end of file
+        if response.has_header("Cache-Control"):
+            return response
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            add_never_cache_headers(response)
+        else:
+            patch_cache_control(response, no_cache=True)
+        return response
+
+
+# -------------------------------
+# Query budget / N+1 detection
+# -------------------------------
+query_logger = logging.getLogger("gamification.queries")
+
+# Literals are stripped so "WHERE id = 3" and "WHERE id = 4" share one shape.
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+
+
+def sql_shape(sql):
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return " ".join(shape.split())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# Savepoints are transaction bookkeeping, not queries; counting them would make
+# the same view cost more inside a test's transaction than in production.
+_TRANSACTION_CONTROL = re.compile(r"^\s*(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.IGNORECASE)
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts queries, time and repeated SQL shapes."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            if not _TRANSACTION_CONTROL.match(sql):
+                self.count += 1
+                self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, hits) for shape, hits in self.shapes.most_common() if hits >= threshold]
+
+
+class QueryBudgetMiddleware:
+    """
+    Count SQL queries and DB time per request and report them in one
+    structured log line, and as X-DB-* headers with DEBUG on or to staff. Repeated query shapes are reported as N+1
+    suspects. QUERY_BUDGETS maps URL names to a maximum query count; with
+    QUERY_BUDGET_RAISE on (as in tests) going over budget raises
+    QueryBudgetExceeded instead of only logging a warning.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def show_headers(request):
+        # They tell anyone how expensive each page is; only developers need that.
+        if settings.DEBUG:
+            return True
+        user = getattr(request, "user", None)
+        return user is not None and user.is_authenticated and user.is_staff
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        view = getattr(getattr(request, "resolver_match", None), "view_name", None)
+        repeated = recorder.repeated(getattr(settings, "QUERY_NPLUSONE_THRESHOLD", 5))
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view)
+
+        if self.show_headers(request):
+            response["X-DB-Queries"] = str(recorder.count)
+            response["X-DB-Time-ms"] = f"{recorder.duration * 1000:.1f}"
+            if repeated:
+                response["X-DB-Repeated-Queries"] = str(sum(hits for _, hits in repeated))
+
+        record = {
+            "path": request.path,
+            "view": view,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(recorder.duration * 1000, 1),
+            "budget": budget,
+            "repeated": [{"sql": shape[:200], "count": hits} for shape, hits in repeated],
+        }
+        over_budget = budget is not None and recorder.count > budget
+        level = logging.WARNING if over_budget or repeated else logging.DEBUG
+        if query_logger.isEnabledFor(level):
+            query_logger.log(level, json.dumps(record), extra={"query_stats": record})
+
+        if over_budget and getattr(settings, "QUERY_BUDGET_RAISE", False):
+            raise QueryBudgetExceeded(
+                f"{view} ran {recorder.count} queries, budget is {budget}: {json.dumps(record['repeated'])}"
+            )
+        return response
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    EcoPoint = apps.get_model("gamification", "EcoPoint")
+    UserPointBalance = apps.get_model("gamification", "UserPointBalance")
+    totals = EcoPoint.objects.values("user_id").annotate(total=Sum("points")).order_by()
+    UserPointBalance.objects.bulk_create(
+        [UserPointBalance(user_id=row["user_id"], points=row["total"]) for row in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0008_alter_ecopoint_submission"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserPointBalance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="point_balance",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("points", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils.timezone import localdate
+
+
+def backfill_reward_dates(apps, schema_editor):
+    # Stamp existing daily rewards with their day and drop same-day duplicates
+    # (concurrent dashboard tabs used to double-award) before the unique
+    # constraint is added. Balances are corrected for every dropped row.
+    EcoPoint = apps.get_model("gamification", "EcoPoint")
+    UserPointBalance = apps.get_model("gamification", "UserPointBalance")
+
+    seen = set()
+    stamped, duplicates = [], []
+    rows = EcoPoint.objects.filter(is_daily=True).order_by("user_id", "awarded_at", "id")
+    for point in rows.iterator(chunk_size=2000):
+        key = (point.user_id, localdate(point.awarded_at))
+        if key in seen:
+            duplicates.append(point)
+            continue
+        seen.add(key)
+        point.reward_date = key[1]
+        stamped.append(point)
+        if len(stamped) >= 1000:
+            EcoPoint.objects.bulk_update(stamped, ["reward_date"])
+            stamped = []
+    EcoPoint.objects.bulk_update(stamped, ["reward_date"])
+
+    for point in duplicates:
+        UserPointBalance.objects.filter(user_id=point.user_id).update(points=F("points") - point.points)
+    EcoPoint.objects.filter(pk__in=[point.pk for point in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0009_userpointbalance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ecopoint",
+            name="reward_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_reward_dates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="ecopoint",
+            constraint=models.UniqueConstraint(
+                fields=("user", "reward_date"), name="unique_daily_reward_per_user"
+            ),
+        ),
+    ]
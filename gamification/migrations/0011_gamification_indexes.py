@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0010_ecopoint_reward_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ecopoint",
+            index=models.Index(
+                fields=["user", "is_daily", "awarded_at"],
+                name="ecopoint_user_daily_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gameattempt",
+            index=models.Index(
+                fields=["user", "-attempt_date"], name="attempt_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasksubmission",
+            index=models.Index(
+                fields=["user", "-submitted_at"], name="tasksub_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasksubmission",
+            index=models.Index(
+                fields=["status", "submitted_at", "id"], name="tasksub_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasksubmission",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["submitted_at", "id"],
+                name="tasksub_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userpointbalance",
+            index=models.Index(fields=["-points"], name="balance_points_idx"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0011_gamification_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="entry_file",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="gameattempt",
+            name="client_attempt_id",
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0012_game_score_ingestion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="subtopic",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="games",
+                to="gamification.subtopic",
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:30
+
+from datetime import date, timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import localdate
+
+
+def fold_login_history(apps, schema_editor):
+    # Fold LoginHistory rows, plus the days a daily login reward was paid, into
+    # one day-bitmap per user per year, then derive the login-day totals and
+    # streaks on UserActivityCounter from those bitmaps. LoginHistory rows are
+    # left in place.
+    LoginHistory = apps.get_model("gamification", "LoginHistory")
+    EcoPoint = apps.get_model("gamification", "EcoPoint")
+    LoginCalendar = apps.get_model("gamification", "LoginCalendar")
+    UserActivityCounter = apps.get_model("gamification", "UserActivityCounter")
+
+    bitmaps = {}
+
+    def mark(user_id, day):
+        offset = day.timetuple().tm_yday - 1
+        bits = bitmaps.setdefault((user_id, day.year), bytearray(46))
+        bits[offset // 8] |= 1 << (offset % 8)
+
+    for user_id, login_time in LoginHistory.objects.values_list("user_id", "login_time").iterator(chunk_size=5000):
+        mark(user_id, localdate(login_time))
+    rewards = EcoPoint.objects.filter(reward_date__isnull=False).values_list("user_id", "reward_date")
+    for user_id, day in rewards.iterator(chunk_size=5000):
+        mark(user_id, day)
+    if not bitmaps:
+        return
+
+    LoginCalendar.objects.bulk_create(
+        [
+            LoginCalendar(user_id=user_id, year=year, days=bytes(bits), active_days=int.from_bytes(bits, "little").bit_count())
+            for (user_id, year), bits in bitmaps.items()
+        ],
+        batch_size=1000,
+    )
+
+    # Login fields are recomputed from scratch for every folded user.
+    existing = {counter.user_id: counter for counter in UserActivityCounter.objects.filter(
+        user_id__in={user_id for user_id, _ in bitmaps}
+    )}
+    counters = {}
+    for user_id, year in sorted(bitmaps):
+        counter = counters.get(user_id)
+        if counter is None:
+            counter = counters[user_id] = existing.get(user_id) or UserActivityCounter(user_id=user_id)
+            counter.login_days = counter.current_streak = counter.longest_streak = 0
+            counter.last_login_date = None
+        value, day = int.from_bytes(bitmaps[(user_id, year)], "little"), date(year, 1, 1)
+        while value:
+            if value & 1:
+                if counter.last_login_date == day - timedelta(days=1):
+                    counter.current_streak += 1
+                else:
+                    counter.current_streak = 1
+                counter.longest_streak = max(counter.longest_streak, counter.current_streak)
+                counter.login_days += 1
+                counter.last_login_date = day
+            value >>= 1
+            day += timedelta(days=1)
+
+    UserActivityCounter.objects.bulk_create(
+        [counter for user_id, counter in counters.items() if user_id not in existing], batch_size=1000
+    )
+    UserActivityCounter.objects.bulk_update(
+        list(existing.values()), ["login_days", "current_streak", "longest_streak", "last_login_date"], batch_size=1000
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0015_activity_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LoginCalendar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                ("days", models.BinaryField(max_length=46)),
+                ("active_days", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="login_calendars",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "year")},
+            },
+        ),
+        migrations.RunPython(fold_login_history, migrations.RunPython.noop),
+    ]
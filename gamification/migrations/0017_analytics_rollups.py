@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0016_login_calendar"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "source",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyRegionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("points", models.BigIntegerField(default=0)),
+                ("attempts", models.IntegerField(default=0)),
+                ("tasks_approved", models.IntegerField(default=0)),
+                ("active_students", models.IntegerField(default=0)),
+                ("state", models.CharField(max_length=100)),
+                ("city", models.CharField(max_length=100)),
+                ("day", models.DateField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["day"], name="rollup_region_day_idx"),
+                    models.Index(
+                        fields=["state", "day"], name="rollup_region_state_idx"
+                    ),
+                ],
+                "unique_together": {("state", "city", "day")},
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyInstitutionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("points", models.BigIntegerField(default=0)),
+                ("attempts", models.IntegerField(default=0)),
+                ("tasks_approved", models.IntegerField(default=0)),
+                ("active_students", models.IntegerField(default=0)),
+                ("day", models.DateField()),
+                ("state", models.CharField(max_length=100)),
+                ("city", models.CharField(max_length=100)),
+                (
+                    "institution",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="gamification.institution",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["state", "city", "day"], name="rollup_inst_region_idx"
+                    )
+                ],
+                "unique_together": {("institution", "day")},
+            },
+        ),
+    ]
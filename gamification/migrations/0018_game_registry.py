@@ -0,0 +1,91 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The descriptions the student dashboard used to hard-code for the bundled
+# games. Seeding Game rows keeps them once the dashboard lists games from the
+# registry; registry.scan() links these rows to the files it finds.
+BUNDLED_GAMES = [
+    ("Blue Planet Defender", "games/Blue Planet Defender.HTML",
+     "Save oceans, forests, and reefs in this interactive eco-game."),
+    ("Eco-Quest Waste Sorter", "games/Eco-Quest Waste Sorter.HTML",
+     "Sort waste correctly and learn about recycling challenges."),
+    ("Splash Saver", "games/Splash Saver.HTML",
+     "Protect water resources in this fun water management game."),
+    ("Power Grid Guardians", "games/Welcome to Power Grid Guardians!.HTML",
+     "Manage renewable energy and protect the grid from failures."),
+    ("Trash Catcher", "games/Trash_Catcher_v1/Trash Catcher.html",
+     "Catch garbage in right can."),
+]
+
+
+def seed_bundled_games(apps, schema_editor):
+    Game = apps.get_model("gamification", "Game")
+    existing = set(Game.objects.values_list("entry_file", flat=True))
+    Game.objects.bulk_create([
+        Game(title=title, entry_file=entry, description=description, game_type="mini_game")
+        for title, entry, description in BUNDLED_GAMES
+        if entry not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0017_analytics_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GameAsset",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("entry", models.CharField(max_length=255, unique=True)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("static", "Bundled static game"),
+                            ("upload", "Uploaded Godot build"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("title", models.CharField(max_length=255)),
+                ("size", models.BigIntegerField(default=0)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("scanned_at", models.DateTimeField(auto_now=True)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="game_assets",
+                        to="gamification.category",
+                    ),
+                ),
+                (
+                    "game",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="assets",
+                        to="gamification.game",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(seed_bundled_games, migrations.RunPython.noop),
+    ]
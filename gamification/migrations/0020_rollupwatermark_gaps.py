@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0019_backgroundjob_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rollupwatermark",
+            name="gaps",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0020_rollupwatermark_gaps"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="ecopoint",
+            name="ecopoint_user_daily_idx",
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0021_drop_ecopoint_user_daily_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("token", models.BigIntegerField()),
+            ],
+        ),
+    ]
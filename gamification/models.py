@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import AbstractUser
+from django.utils.timezone import now
 from django.utils.text import slugify
 
 
@@ -138,6 +140,8 @@ class Game(models.Model):
     grade_max = models.IntegerField(null=True, blank=True)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, blank=True)
     topic = models.ForeignKey(GameTopic, on_delete=models.SET_NULL, null=True)
+    entry_file = models.CharField(max_length=255, blank=True)  # static path of a bundled game, e.g. "games/Splash Saver.HTML"
+    subtopic = models.ForeignKey("SubTopic", on_delete=models.SET_NULL, null=True, blank=True, related_name="games")  # quiz games
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -157,6 +161,13 @@ class GameAttempt(models.Model):
     time_taken = models.IntegerField(null=True, blank=True)  # in seconds
     progress = models.FloatField(null=True, blank=True)      # percentage
     attempt_date = models.DateTimeField(auto_now_add=True)
+    client_attempt_id = models.UUIDField(null=True, blank=True, unique=True)  # set by the game client, makes retries safe
+
+    class Meta:
+        indexes = [
+            # "recent attempts" on the student dashboard
+            models.Index(fields=["user", "-attempt_date"], name="attempt_user_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.game.title}"
@@ -176,6 +187,20 @@ class TaskSubmission(models.Model):
     verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="verified_tasks")
     verified_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # "recent submissions" on the student dashboard
+            models.Index(fields=["user", "-submitted_at"], name="tasksub_user_date_idx"),
+            # moderation queues, walked in (status, submitted_at, id) order
+            models.Index(fields=["status", "submitted_at", "id"], name="tasksub_status_date_idx"),
+            # the pending queue is the hot one and stays small relative to the table
+            models.Index(
+                fields=["submitted_at", "id"],
+                condition=models.Q(status="pending"),
+                name="tasksub_pending_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Task by {self.user.username}"
 
@@ -189,13 +214,85 @@ class EcoPoint(models.Model):
     points = models.IntegerField()
     awarded_at = models.DateTimeField(auto_now_add=True)
     is_daily = models.BooleanField(default=False)  # 👈 new field to mark daily login rewards
+    reward_date = models.DateField(null=True, blank=True)  # set only on daily login rewards
 
+    class Meta:
+        constraints = [
+            # One daily login reward per user per day; NULLs (task points) never collide.
+            # Also the index behind the "rewarded today?" lookup (rewards.py).
+            models.UniqueConstraint(fields=["user", "reward_date"], name="unique_daily_reward_per_user"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The ledger row and the materialized balance are written together.
+        # Deletes are handled by the post_delete receiver in signals.py.
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = EcoPoint.objects.filter(pk=self.pk).values_list("user_id", "points").first()
+            super().save(*args, **kwargs)
+            if previous and previous[0] != self.user_id:
+                UserPointBalance.apply_delta(previous[0], -previous[1], create=False)
+                UserPointBalance.apply_delta(self.user_id, self.points)
+            else:
+                UserPointBalance.apply_delta(self.user_id, self.points - (previous[1] if previous else 0))
 
     def __str__(self):
         reward_type = "Daily Login" if self.is_daily else "Task"
         return f"{self.user.username} - {self.points} pts ({reward_type})"
 
 
+# -------------------------------
+# EcoPoint Balances (materialized SUM of the EcoPoint ledger)
+# -------------------------------
+class UserPointBalance(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="point_balance")
+    points = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-points"], name="balance_points_idx"),
+        ]
+
+    @classmethod
+    def apply_delta(cls, user_id, delta, create=True):
+        """Add ``delta`` to a user's balance; call inside the ledger write's transaction."""
+        if not delta or cls.objects.filter(user_id=user_id).update(points=F("points") + delta, updated_at=now()):
+            return
+        if not create:
+            return
+        # First ledger write for this user: seed the row from the ledger, which
+        # already contains the row being saved.
+        total = EcoPoint.objects.filter(user_id=user_id).aggregate(total=Sum("points"))["total"] or 0
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, points=total)
+        except IntegrityError:
+            # A concurrent writer seeded it first; fall back to the increment.
+            cls.objects.filter(user_id=user_id).update(points=F("points") + delta, updated_at=now())
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Bulk form of apply_delta for ledger rows written with bulk_create: {user_id: delta}."""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        by_delta = {}
+        for user_id, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(user_id)
+        for delta, user_ids in by_delta.items():
+            cls.objects.filter(user_id__in=user_ids).update(points=F("points") + delta, updated_at=now())
+        existing = set(cls.objects.filter(user_id__in=deltas).values_list("user_id", flat=True))
+        for user_id in deltas.keys() - existing:
+            cls.apply_delta(user_id, deltas[user_id])
+
+    @classmethod
+    def points_for(cls, user_id):
+        return cls.objects.filter(user_id=user_id).values_list("points", flat=True).first() or 0
+
+    def __str__(self):
+        return f"{self.user.username} - {self.points} pts"
+
+
 # -------------------------------
 # Badges
 # -------------------------------
@@ -224,6 +321,58 @@ class UserBadge(models.Model):
         return f"{self.user.username} - {self.badge.name}"
 
 
+# -------------------------------
+# Per-user activity counters (badge rules are evaluated against these)
+# -------------------------------
+class UserActivityCounter(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="activity")
+    attempts = models.IntegerField(default=0)
+    tasks_approved = models.IntegerField(default=0)
+    login_days = models.IntegerField(default=0)
+    current_streak = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    last_login_date = models.DateField(null=True, blank=True)
+
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Add to scalar counters, e.g. bump(user_id, attempts=1); creates the row on first use."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if cls.objects.filter(user_id=user_id).update(**{field: F(field) + delta for field, delta in deltas.items()}):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, **deltas)
+        except IntegrityError:
+            cls.objects.filter(user_id=user_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+    def __str__(self):
+        return f"{self.user.username} activity"
+
+
+class UserTopicCounter(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="topic_counters")
+    topic = models.ForeignKey(GameTopic, on_delete=models.CASCADE)
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "topic")
+
+    @classmethod
+    def bump(cls, user_id, topic_id, delta=1):
+        if cls.objects.filter(user_id=user_id, topic_id=topic_id).update(attempts=F("attempts") + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, topic_id=topic_id, attempts=delta)
+        except IntegrityError:
+            cls.objects.filter(user_id=user_id, topic_id=topic_id).update(attempts=F("attempts") + delta)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.topic.name}: {self.attempts}"
+
+
 # -------------------------------
 # Login History
 # -------------------------------
@@ -235,6 +384,22 @@ class LoginHistory(models.Model):
         return f"{self.user.username} logged in at {self.login_time}"
 
 
+# -------------------------------
+# Login Calendar (one bit per day, see logins.py)
+# -------------------------------
+class LoginCalendar(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="login_calendars")
+    year = models.PositiveSmallIntegerField()
+    days = models.BinaryField(max_length=46)  # bit n set = logged in on day-of-year n + 1
+    active_days = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "year")
+
+    def __str__(self):
+        return f"{self.user.username} - {self.year}: {self.active_days} days"
+
+
 # -------------------------------
 # Categories
 # -------------------------------
@@ -320,3 +485,133 @@ class PuzzleOption(models.Model):
 
     def __str__(self):
         return f"{self.text} ({'correct' if self.is_correct else 'wrong'})"
+
+
+# -------------------------------
+# Background Jobs (database-backed queue, see jobs.py)
+# -------------------------------
+class BackgroundJob(models.Model):
+    STATUS_CHOICES = [("queued", "Queued"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # refreshed while the job runs
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # what the worker polls: ready jobs, oldest first
+            models.Index(fields=["status", "run_after"], name="job_ready_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# -------------------------------
+# Analytics rollups (see rollups.py)
+# -------------------------------
+class RollupMetrics(models.Model):
+    points = models.BigIntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    tasks_approved = models.IntegerField(default=0)
+    active_students = models.IntegerField(default=0)  # students who signed in that day
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def add(cls, key, defaults=None, **deltas):
+        """Add to the metrics of the row identified by ``key``; creates the row (with ``defaults``) on first use."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        increments = {field: F(field) + delta for field, delta in deltas.items()}
+        if cls.objects.filter(**key).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, **(defaults or {}), **deltas)
+        except IntegrityError:
+            cls.objects.filter(**key).update(**increments)
+
+
+class DailyInstitutionRollup(RollupMetrics):
+    institution = models.ForeignKey(Institution, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    state = models.CharField(max_length=100)  # copied from the institution
+    city = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ("institution", "day")
+        indexes = [
+            models.Index(fields=["state", "city", "day"], name="rollup_inst_region_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.institution_id} {self.day}"
+
+
+class DailyRegionRollup(RollupMetrics):
+    state = models.CharField(max_length=100)
+    city = models.CharField(max_length=100)
+    day = models.DateField()
+
+    class Meta:
+        unique_together = ("state", "city", "day")
+        indexes = [
+            models.Index(fields=["day"], name="rollup_region_day_idx"),
+            models.Index(fields=["state", "day"], name="rollup_region_state_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.state} / {self.city} {self.day}"
+
+
+class RollupWatermark(models.Model):
+    source = models.CharField(max_length=50, primary_key=True)  # "ecopoint", "gameattempt"; "version" (see rollups.py)
+    last_id = models.BigIntegerField(default=0)
+    gaps = models.JSONField(default=dict, blank=True)  # {id: time first missed} of ids below last_id not yet seen
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} up to #{self.last_id}"
+
+
+# -------------------------------
+# Game registry
+# -------------------------------
+class GameAsset(models.Model):
+    """One playable game found by registry.scan(): a bundled static game or a Category's uploaded build."""
+    SOURCE_CHOICES = [("static", "Bundled static game"), ("upload", "Uploaded Godot build")]
+
+    entry = models.CharField(max_length=255, unique=True)  # static path / media name of the page that starts the game
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    title = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)  # bytes, all files of the game
+    content_hash = models.CharField(max_length=64)  # sha256 over the game's files
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name="assets")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="game_assets")
+    scanned_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.entry})"
+
+
+# -------------------------------
+# Cache versions (see versions.py)
+# -------------------------------
+class CacheVersion(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)  # "quiz:<subtopic id>", "catalog", "registry", ...
+    token = models.BigIntegerField()  # a time_ns(), only ever moves forward
+
+    def __str__(self):
+        return f"{self.name} @ {self.token}"
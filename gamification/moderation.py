@@ -0,0 +1,148 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from . import leaderboard
+from .models import EcoPoint, TaskSubmission, TeacherProfile, UserActivityCounter, UserPointBalance
+
+
+# -------------------------------
+# Task verification queue
+# -------------------------------
+# Pages are walked with a keyset over (status, submitted_at, id), which the
+# tasksub_status_date_idx index serves directly: no OFFSET and no COUNT(*), so
+# page 500 costs the same as page 1.
+
+TASK_APPROVAL_POINTS = getattr(settings, "TASK_APPROVAL_POINTS", 10)
+MODERATOR_ROLES = ["school_teacher", "college_teacher", "ngo", "government"]
+MAX_PAGE_SIZE = 100
+MAX_BULK_SIZE = 5000
+ACTIONS = {"approve": "approved", "reject": "rejected"}
+
+
+class ModerationError(ValueError):
+    pass
+
+
+def can_moderate(user):
+    return user.is_authenticated and (user.is_staff or user.role in MODERATOR_ROLES)
+
+
+def submissions_for(moderator):
+    """Submissions a moderator may see: teachers get their own institution's students."""
+    queryset = TaskSubmission.objects.all()
+    if moderator.is_staff or moderator.role in ["ngo", "government"]:
+        return queryset
+    institution_id = TeacherProfile.objects.filter(user=moderator).values_list("institution_id", flat=True).first()
+    if institution_id is None:
+        # No profile or no institution: filtering on None would match every
+        # student without an institution.
+        return queryset.none()
+    return queryset.filter(user__studentprofile__institution_id=institution_id)
+
+
+def encode_cursor(submission):
+    raw = f"{submission.submitted_at.isoformat()}|{submission.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        submitted_at, submission_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(submitted_at), int(submission_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ModerationError("invalid cursor")
+
+
+def queue_page(moderator, status="pending", cursor=None, limit=50):
+    if status not in dict(TaskSubmission.STATUS_CHOICES):
+        raise ModerationError("unknown status")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    queryset = (
+        submissions_for(moderator)
+        .filter(status=status)
+        .select_related("user", "game")
+        .only("id", "submission", "submitted_at", "status", "user__username", "game__title")
+        .order_by("submitted_at", "id")
+    )
+    if cursor:
+        submitted_at, submission_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(submitted_at__gt=submitted_at) | Q(submitted_at=submitted_at, id__gt=submission_id)
+        )
+
+    # One extra row tells us whether there is a next page.
+    rows = list(queryset[: limit + 1])
+    page, has_more = rows[:limit], len(rows) > limit
+    return {
+        "results": [
+            {
+                "id": submission.id,
+                "user": submission.user.username,
+                "game": submission.game.title if submission.game else None,
+                "submission": submission.submission,
+                "submitted_at": submission.submitted_at.isoformat(),
+                "status": submission.status,
+            }
+            for submission in page
+        ],
+        "next_cursor": encode_cursor(page[-1]) if has_more else None,
+    }
+
+
+def bulk_moderate(moderator, submission_ids, action, points=None):
+    """
+    Approve or reject pending submissions in one transaction. Approval writes
+    the linked EcoPoint for each submission in the same transaction. Returns
+    the number of submissions changed; ids that are not pending or not visible
+    to the moderator are skipped.
+    """
+    if action not in ACTIONS:
+        raise ModerationError("action must be approve or reject")
+    if not submission_ids or len(submission_ids) > MAX_BULK_SIZE:
+        raise ModerationError(f"send between 1 and {MAX_BULK_SIZE} submission ids")
+    points = TASK_APPROVAL_POINTS if points is None else points
+    if action == "approve" and (not isinstance(points, int) or points <= 0):
+        raise ModerationError("points must be a positive whole number")
+
+    with transaction.atomic():
+        pending = list(
+            submissions_for(moderator)
+            .select_for_update(of=("self",))
+            .filter(id__in=submission_ids, status="pending")
+            .values_list("id", "user_id")
+        )
+        if not pending:
+            return 0
+        TaskSubmission.objects.filter(id__in=[submission_id for submission_id, _ in pending]).update(
+            status=ACTIONS[action], verified_by=moderator, verified_at=now()
+        )
+
+        if action == "approve":
+            already_awarded = set(
+                EcoPoint.objects.filter(submission_id__in=[submission_id for submission_id, _ in pending])
+                .values_list("submission_id", flat=True)
+            )
+            awards = [
+                EcoPoint(user_id=user_id, submission_id=submission_id, points=points)
+                for submission_id, user_id in pending
+                if submission_id not in already_awarded
+            ]
+            # bulk_create skips EcoPoint.save(), so the balances are updated here.
+            EcoPoint.objects.bulk_create(awards, batch_size=1000)
+            deltas, approved = {}, {}
+            for award in awards:
+                deltas[award.user_id] = deltas.get(award.user_id, 0) + award.points
+                approved[award.user_id] = approved.get(award.user_id, 0) + 1
+            UserPointBalance.apply_deltas(deltas)
+            for user_id, count in approved.items():
+                UserActivityCounter.bump(user_id, tasks_approved=count)
+            for user_id in deltas:
+                leaderboard.points_changed(user_id)
+
+    return len(pending)
@@ -0,0 +1,160 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.db import connection
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Password hashing
+# -------------------------------
+# PASSWORD_HASHING picks the hasher new passwords get ("pbkdf2", or "argon2"
+# with argon2-cffi installed) and the cost settings below tune it; both are
+# read when a password is hashed, so changing them needs no migration. A
+# stored hash made with another hasher or other parameters still verifies and
+# is replaced the next time its owner logs in (rehash() below).
+#
+# Verifying a password is the expensive part of a login. Logins hash on a
+# small thread pool (hashlib and argon2 release the GIL while hashing), at
+# most LOGIN_HASH_WORKERS at once, so a login storm queues there instead of
+# every request thread fighting for the CPU; past LOGIN_HASH_QUEUE waiting
+# logins, new ones are turned away with HashingBusy rather than piling up.
+
+LOGIN_HASH_WORKERS = getattr(settings, "LOGIN_HASH_WORKERS", 2)
+LOGIN_HASH_QUEUE = getattr(settings, "LOGIN_HASH_QUEUE", 32)
+LOGIN_HASH_TIMEOUT = getattr(settings, "LOGIN_HASH_TIMEOUT", 10)  # seconds a login waits for its hash
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(LOGIN_HASH_WORKERS + LOGIN_HASH_QUEUE)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS; reads existing pbkdf2_sha256 hashes."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with the time, memory and parallelism costs in PASSWORD_ARGON2."""
+
+    def _cost(self, name):
+        return getattr(settings, "PASSWORD_ARGON2", {}).get(name, getattr(Argon2PasswordHasher, name))
+
+    @property
+    def time_cost(self):
+        return self._cost("time_cost")
+
+    @property
+    def memory_cost(self):
+        return self._cost("memory_cost")
+
+    @property
+    def parallelism(self):
+        return self._cost("parallelism")
+
+
+HASHERS = {
+    "pbkdf2": "gamification.passwords.TunedPBKDF2PasswordHasher",
+    "argon2": "gamification.passwords.TunedArgon2PasswordHasher",
+}
+
+
+def hashers_for(strategy):
+    """PASSWORD_HASHERS for a PASSWORD_HASHING strategy: it first, the others to read older hashes."""
+    if strategy not in HASHERS:
+        raise ValueError(f"PASSWORD_HASHING must be one of {', '.join(HASHERS)}, not {strategy!r}.")
+    return [HASHERS[strategy], *(path for name, path in HASHERS.items() if name != strategy)]
+
+
+class HashingBusy(RuntimeError):
+    """Too many logins are already waiting for a hash."""
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix="login-hash")
+    return _pool
+
+
+def _release(future):
+    _slots.release()
+
+
+def submit(function, *args):
+    """Run ``function`` on the hashing pool; HashingBusy when its queue is full."""
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Too many logins in progress, try again in a moment.")
+    try:
+        future = _get_pool().submit(function, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def run(function, *args):
+    """submit() and wait for the result; HashingBusy if it does not come in time."""
+    try:
+        return submit(function, *args).result(timeout=LOGIN_HASH_TIMEOUT)
+    except FutureTimeout:
+        raise HashingBusy("Logins are taking too long, try again in a moment.")
+
+
+def needs_rehash(encoded):
+    """True if ``encoded`` was not made by the preferred hasher with its current parameters."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher("default")
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def verify(password, encoded):
+    """(correct, needs_rehash) for ``password`` against the stored hash, hashed on the pool."""
+    correct = run(check_password, password, encoded)
+    return correct, correct and needs_rehash(encoded)
+
+
+def hash_once(password):
+    """Spend one hash on the pool, so a missing user takes as long as a wrong password."""
+    run(make_password, password)
+
+
+def _rehash(user_id, password, encoded):
+    try:
+        # Only if the password was not changed meanwhile.
+        User.objects.filter(id=user_id, password=encoded).update(password=make_password(password))
+    except Exception:
+        logger.exception("Could not rehash the password of user %s", user_id)
+    finally:
+        connection.close()
+
+
+def rehash(user, password):
+    """Replace the user's stored hash with one made by the current hasher, in the background."""
+    try:
+        submit(_rehash, user.id, password, user.password)
+    except HashingBusy:
+        pass  # the next login will try again
@@ -0,0 +1,101 @@
+import gzip
+import json
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from . import versions
+from .models import QuizOption, QuizQuestion, SubTopic
+
+
+# -------------------------------
+# Quiz payloads per SubTopic
+# -------------------------------
+# A subtopic's questions and options are serialized once into a gzipped JSON
+# payload stored in the cache under the subtopic's current version (a database
+# token, see versions.py). Editing a question or option bumps the version (see
+# signals.py), so stale payloads are never served and simply age out. Each
+# process also keeps the decoded payload so random subsets are drawn with one
+# version read and without touching the cache payload again.
+
+QUIZ_CACHE_TTL = getattr(settings, "QUIZ_CACHE_TTL", 60 * 60 * 24)
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _payload_key(subtopic_id, version):
+    return f"quiz:payload:{subtopic_id}:{version}"
+
+
+def quiz_version(subtopic_id):
+    return versions.get(f"quiz:{subtopic_id}")
+
+
+def invalidate(subtopic_id):
+    versions.touch(f"quiz:{subtopic_id}")
+
+
+def build_payload(subtopic_id):
+    options = Prefetch("options", queryset=QuizOption.objects.order_by("id"))
+    questions = Prefetch("quiz_questions", queryset=QuizQuestion.objects.order_by("id").prefetch_related(options))
+    subtopic = SubTopic.objects.select_related("category").prefetch_related(questions).filter(id=subtopic_id).first()
+    if subtopic is None:
+        return None
+    return {
+        "subtopic": {"id": subtopic.id, "name": subtopic.name, "category": subtopic.category.name},
+        "questions": [
+            {
+                "id": question.id,
+                "text": question.text,
+                "difficulty": question.difficulty,
+                "options": [{"id": option.id, "text": option.text} for option in question.options.all()],
+            }
+            for question in subtopic.quiz_questions.all()
+        ],
+    }
+
+
+def get_quiz(subtopic_id):
+    """
+    Return ``(version, data, gzipped_json)`` for a subtopic, or ``None`` if it
+    does not exist. Only the first request after an edit reads the questions.
+    """
+    version = quiz_version(subtopic_id)
+    local = _local.get(subtopic_id)
+    if local and local[0] == version:
+        return local
+
+    compressed = cache.get(_payload_key(subtopic_id, version))
+    if compressed is None:
+        data = build_payload(subtopic_id)
+        if data is None:
+            return None
+        data["version"] = str(version)
+        compressed = gzip.compress(json.dumps(data, separators=(",", ":")).encode(), mtime=0)
+        cache.set(_payload_key(subtopic_id, version), compressed, QUIZ_CACHE_TTL)
+    else:
+        data = json.loads(gzip.decompress(compressed))
+
+    data["by_difficulty"] = {}
+    for question in data["questions"]:
+        data["by_difficulty"].setdefault(question["difficulty"], []).append(question)
+    local = (version, data, compressed)
+    with _local_lock:
+        _local[subtopic_id] = local
+    return local
+
+
+def sample_questions(data, count=None, difficulty=None, seed=None):
+    """``count`` random questions (all of them, shuffled, when None or more than there are)."""
+    pool = data["by_difficulty"].get(difficulty, []) if difficulty else data["questions"]
+    if count is not None and count < 0:
+        raise ValueError("count must not be negative")
+    if count is None or count >= len(pool):
+        picked = list(pool)
+        random.Random(seed).shuffle(picked)
+        return picked
+    return random.Random(seed).sample(pool, count)
@@ -0,0 +1,204 @@
+import threading
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count
+
+from . import catalog, versions
+from .models import Game, GameAttempt, UserActivityCounter
+
+
+# -------------------------------
+# Grade-aware recommendations
+# -------------------------------
+# Games and subtopics (through their category) carry a grade_min/grade_max
+# range. Each process indexes those ranges once per content version and keeps
+# the eligible candidates per grade. A student's ranked list is computed from
+# one aggregate over their own attempts and cached under their attempt count,
+# so it is reused on every dashboard render until their next attempt (or the
+# next content edit) and the stale entry simply ages out.
+
+RECOMMENDATIONS_CACHE_TTL = getattr(settings, "RECOMMENDATIONS_CACHE_TTL", 60 * 60 * 24)
+RECOMMENDATIONS_LIMIT = 5
+MASTERY_ACCURACY = 70  # mean accuracy (0-100) at which a difficulty counts as mastered
+DIFFICULTIES = ["easy", "medium", "hard"]
+GAMES_VERSION_NAME = "games"  # in the database (versions.py), shared by every process
+
+_local = {"version": None, "index": None}
+_local_lock = threading.Lock()
+
+
+class GradeIndex:
+    """
+    Items with an inclusive [grade_min, grade_max] range, NULL meaning open on
+    that side. Ranges are kept sorted by lower bound, so a grade lookup
+    bisects past every range that starts above it and checks only the upper
+    bound of the rest.
+    """
+
+    def __init__(self, entries):
+        low, high = float("-inf"), float("inf")
+        self._entries = sorted(
+            ((low if grade_min is None else grade_min, high if grade_max is None else grade_max, position, item)
+             for position, (grade_min, grade_max, item) in enumerate(entries)),
+            key=lambda entry: (entry[0], entry[2]),
+        )
+        self._starts = [entry[0] for entry in self._entries]
+        self._all = [item for _, _, item in entries]
+
+    def stab(self, grade):
+        """Items whose range contains ``grade`` (everything for None), in insertion order."""
+        if grade is None:
+            return list(self._all)
+        hits = [entry for entry in self._entries[: bisect_right(self._starts, grade)] if entry[1] >= grade]
+        return [item for _, _, _, item in sorted(hits, key=lambda entry: entry[2])]
+
+
+def games_version():
+    return versions.get(GAMES_VERSION_NAME)
+
+
+def invalidate_games():
+    versions.touch(GAMES_VERSION_NAME)
+
+
+def content_version():
+    return f"{catalog.catalog_version()}-{games_version()}"
+
+
+def build_index():
+    tree = catalog.get_tree()
+    subtopic_entries, quiz_games = [], {}
+    games = list(
+        Game.objects.order_by("id").values(
+            "id", "title", "game_type", "difficulty", "grade_min", "grade_max", "topic_id", "subtopic_id", "entry_file",
+        )
+    )
+    for game in games:
+        subtopic = tree["subtopics"].get(game["subtopic_id"])
+        game["category_id"] = subtopic["category_id"] if subtopic else None
+        if subtopic:
+            quiz_games[subtopic["id"]] = quiz_games.get(subtopic["id"], 0) + 1
+    for category in tree["categories"]:
+        for subtopic in category["subtopics"]:
+            subtopic_entries.append((category["grade_min"], category["grade_max"], {
+                "id": subtopic["id"],
+                "name": subtopic["name"],
+                "category_id": category["id"],
+                "category": category["name"],
+                "quiz_games": quiz_games.get(subtopic["id"], 0),
+            }))
+    return {
+        "games": GradeIndex([(game["grade_min"], game["grade_max"], game) for game in games]),
+        "subtopics": GradeIndex(subtopic_entries),
+        "by_grade": {},
+    }
+
+
+def get_index():
+    version = content_version()
+    if _local["version"] == version:
+        return version, _local["index"]
+    index = build_index()
+    with _local_lock:
+        _local["version"], _local["index"] = version, index
+    return version, index
+
+
+def candidates(index, grade):
+    """Eligible games and subtopics for one grade, computed once per content version."""
+    eligible = index["by_grade"].get(grade)
+    if eligible is None:
+        eligible = {"games": index["games"].stab(grade), "subtopics": index["subtopics"].stab(grade)}
+        index["by_grade"][grade] = eligible
+    return eligible
+
+
+def _history(user_id):
+    """Per-game attempt counts and mean accuracy for one student."""
+    return list(
+        GameAttempt.objects.filter(user_id=user_id)
+        .values("game_id", "game__topic_id", "game__subtopic_id", "game__subtopic__category_id", "game__difficulty")
+        .annotate(attempts=Count("id"), accuracy=Avg("accuracy"))
+    )
+
+
+def _mean_accuracy(rows, field):
+    """Attempt-weighted mean accuracy per value of ``field``, ignoring attempts without accuracy."""
+    totals = {}
+    for row in rows:
+        if row[field] is None or row["accuracy"] is None:
+            continue
+        total, attempts = totals.get(row[field], (0.0, 0))
+        totals[row[field]] = (total + row["accuracy"] * row["attempts"], attempts + row["attempts"])
+    return {key: total / attempts for key, (total, attempts) in totals.items()}
+
+
+def target_difficulty(difficulty_accuracy):
+    """The easiest difficulty not yet mastered (hard once everything is)."""
+    for difficulty in DIFFICULTIES:
+        if difficulty_accuracy.get(difficulty, 0) < MASTERY_ACCURACY:
+            return difficulty
+    return DIFFICULTIES[-1]
+
+
+def rank(eligible, history, limit=RECOMMENDATIONS_LIMIT):
+    played_games = {row["game_id"] for row in history}
+    played_subtopics = {row["game__subtopic_id"] for row in history if row["game__subtopic_id"] is not None}
+    topic_accuracy = _mean_accuracy(history, "game__topic_id")
+    category_accuracy = _mean_accuracy(history, "game__subtopic__category_id")
+    target = target_difficulty(_mean_accuracy(history, "game__difficulty"))
+    step = DIFFICULTIES.index(target)
+
+    def weakness(accuracy):
+        # Untried topics sit halfway so weak topics come first, then new ones.
+        return 0.5 if accuracy is None else 1 - min(accuracy, 100) / 100
+
+    games = []
+    for game in eligible["games"]:
+        if game["id"] in played_games:
+            continue
+        accuracy = topic_accuracy.get(game["topic_id"])
+        if game["difficulty"] in DIFFICULTIES:
+            fit = 1 - abs(DIFFICULTIES.index(game["difficulty"]) - step) / 2
+        else:
+            fit = 0.5
+        if accuracy is not None and accuracy < MASTERY_ACCURACY:
+            reason = f"Practice a weak topic ({accuracy:.0f}% accuracy)"
+        elif game["difficulty"] == target:
+            reason = f"Next step: {target}"
+        else:
+            reason = "Something new"
+        games.append((weakness(accuracy) + fit, game["id"], {**game, "reason": reason}))
+
+    subtopics = []
+    for subtopic in eligible["subtopics"]:
+        if subtopic["id"] in played_subtopics:
+            continue
+        accuracy = category_accuracy.get(subtopic["category_id"])
+        reason = f"Strengthen {subtopic['category']}" if accuracy is not None and accuracy < MASTERY_ACCURACY else "Not explored yet"
+        subtopics.append((weakness(accuracy) + (0.25 if subtopic["quiz_games"] else 0), subtopic["id"], {**subtopic, "reason": reason}))
+
+    games.sort(key=lambda entry: (-entry[0], entry[1]))
+    subtopics.sort(key=lambda entry: (-entry[0], entry[1]))
+    return {
+        "target_difficulty": target,
+        "games": [item for _, _, item in games[:limit]],
+        "subtopics": [item for _, _, item in subtopics[:limit]],
+    }
+
+
+def for_student(user_id, grade=None):
+    """
+    Ranked unplayed games and subtopics for a student. A warm call is one
+    counter lookup and one cache read.
+    """
+    attempts = UserActivityCounter.objects.filter(user_id=user_id).values_list("attempts", flat=True).first() or 0
+    version, index = get_index()
+    key = f"recommendations:{user_id}:{grade}:{attempts}:{version}"
+    result = cache.get(key)
+    if result is None:
+        result = rank(candidates(index, grade), _history(user_id))
+        cache.set(key, result, RECOMMENDATIONS_CACHE_TTL)
+    return result
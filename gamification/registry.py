@@ -0,0 +1,220 @@
+import hashlib
+import html
+import logging
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import recommendations, versions
+from .models import Category, Game, GameAsset
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Game registry
+# -------------------------------
+# scan() walks the bundled games under static/games/ and the builds uploaded
+# as Category.godot_game_file, records one GameAsset per game (title, size,
+# entry page, content hash) and links it to the Game row with the same
+# entry_file. It runs after `migrate`, from `manage.py scan_games` and, for
+# uploads, as a background job when a Category is saved.
+#
+# Dashboards read manifest(): the GameAssets joined with their Game rows,
+# built with one query per registry/games version and kept in process memory
+# and the cache. Both versions live in the database (versions.py), so a web
+# process picks up what `scan_games` or the job worker recorded. Listing games
+# never touches the filesystem.
+
+GAMES_STATIC_DIR = getattr(settings, "GAMES_STATIC_DIR", "games")
+REGISTRY_CACHE_TTL = getattr(settings, "REGISTRY_CACHE_TTL", 60 * 60 * 24)
+VERSION_NAME = "registry"
+ENTRY_EXTENSIONS = (".html", ".htm")
+IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+TITLE_BYTES = 8192  # <title> is looked for in this much of the entry page
+
+_TITLE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+_local = {"version": None, "manifest": None}
+_local_lock = threading.Lock()
+
+
+def registry_version():
+    return versions.get(VERSION_NAME)
+
+
+def invalidate():
+    versions.touch(VERSION_NAME)
+
+
+def _title(content, fallback):
+    match = _TITLE.search(content[:TITLE_BYTES])
+    if match:
+        title = " ".join(html.unescape(match.group(1).decode("utf-8", "replace")).split())
+        if title:
+            return title
+    return fallback
+
+
+def _describe(files, entry, fallback_title):
+    """(title, size, sha256) of a game made of ``files`` [(name, storage)]."""
+    digest, size, title = hashlib.sha256(), 0, fallback_title
+    for name, storage in sorted(files, key=lambda item: item[0]):
+        digest.update(name.encode())
+        with storage.open(name) as content:
+            for index, chunk in enumerate(content.chunks()):
+                if index == 0 and name == entry:
+                    title = _title(chunk, fallback_title)
+                digest.update(chunk)
+                size += len(chunk)
+    return title, size, digest.hexdigest()
+
+
+def static_games():
+    """
+    Games under static/<GAMES_STATIC_DIR>/: a page directly in that folder is a
+    game on its own, a sub-folder (a Godot web export) is one game started by
+    the page at its top level.
+    """
+    groups = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list(IGNORE_PATTERNS):
+            path = path.replace(os.sep, "/")
+            parts = path.split("/")
+            if len(parts) < 2 or parts[0] != GAMES_STATIC_DIR:
+                continue
+            # As with collectstatic, the first finder to provide a path wins.
+            groups.setdefault("/".join(parts[:2]), {}).setdefault(path, storage)
+
+    games = []
+    for key, members in sorted(groups.items()):
+        if key in members:
+            entry = key if key.lower().endswith(ENTRY_EXTENSIONS) else None
+        else:
+            pages = sorted(
+                path for path in members
+                if path.count("/") == 2 and path.lower().endswith(ENTRY_EXTENSIONS)
+            )
+            entry = pages[0] if pages else None
+        if entry is None:
+            continue
+        fallback = os.path.splitext(os.path.basename(entry))[0]
+        title, size, content_hash = _describe(
+            [(name, storage) for name, storage in members.items()], entry, fallback,
+        )
+        games.append({"entry": entry, "source": "static", "title": title, "size": size, "content_hash": content_hash})
+    return games
+
+
+def uploaded_games():
+    """One game per Category with an uploaded godot_game_file that still exists."""
+    games = []
+    for category in Category.objects.exclude(godot_game_file="").exclude(godot_game_file__isnull=True):
+        name = category.godot_game_file.name
+        if not default_storage.exists(name):
+            logger.warning("Category %s points at missing game file %s", category.pk, name)
+            continue
+        title, size, content_hash = _describe([(name, default_storage)], None, category.name)
+        games.append({
+            "entry": name, "source": "upload", "title": title, "size": size,
+            "content_hash": content_hash, "category_id": category.id,
+        })
+    return games
+
+
+def scan(static=True, uploads=True, create_games=True):
+    """
+    Record the games currently on disk. Games of a scanned source that are gone
+    are dropped; with ``create_games`` a bundled game without a Game row gets
+    one, so its scores can be recorded. Returns counts per change.
+    """
+    sources = [source for source, wanted in (("static", static), ("upload", uploads)) if wanted]
+    found = (static_games() if static else []) + (uploaded_games() if uploads else [])
+    counts = {"created": 0, "updated": 0, "removed": 0, "games_created": 0}
+
+    with transaction.atomic():
+        games = dict(Game.objects.exclude(entry_file="").values_list("entry_file", "id"))
+        if create_games:
+            missing = [game for game in found if game["source"] == "static" and game["entry"] not in games]
+            for game in missing:
+                games[game["entry"]] = Game.objects.create(
+                    title=game["title"], description="", game_type="mini_game", entry_file=game["entry"],
+                ).id
+            counts["games_created"] = len(missing)
+
+        existing = {asset.entry: asset for asset in GameAsset.objects.filter(source__in=sources)}
+        fields = ("source", "title", "size", "content_hash", "game_id", "category_id")
+        for game in found:
+            values = {
+                "source": game["source"], "title": game["title"], "size": game["size"],
+                "content_hash": game["content_hash"], "game_id": games.get(game["entry"]),
+                "category_id": game.get("category_id"),
+            }
+            asset = existing.pop(game["entry"], None)
+            if asset is None:
+                GameAsset.objects.update_or_create(entry=game["entry"], defaults=values)
+                counts["created"] += 1
+            elif any(getattr(asset, field) != values[field] for field in fields):
+                for field in fields:
+                    setattr(asset, field, values[field])
+                asset.save()
+                counts["updated"] += 1
+        if existing:
+            GameAsset.objects.filter(id__in=[asset.id for asset in existing.values()]).delete()
+            counts["removed"] = len(existing)
+        transaction.on_commit(invalidate)
+    return counts
+
+
+def _url(asset):
+    if asset.source == "upload":
+        return default_storage.url(asset.entry)
+    try:
+        return staticfiles_storage.url(asset.entry)
+    except ValueError:
+        # Not collected yet (DEBUG off before collectstatic): link the original name.
+        logger.warning("Game %s is missing from the static files manifest", asset.entry)
+        return settings.STATIC_URL + asset.entry
+
+
+def build_manifest():
+    assets = GameAsset.objects.select_related("game").order_by("title", "entry")
+    return [
+        {
+            "entry": asset.entry,
+            "source": asset.source,
+            "title": asset.game.title if asset.game else asset.title,
+            "description": asset.game.description if asset.game else "",
+            "game_id": asset.game_id,
+            "game_type": asset.game.game_type if asset.game else "",
+            "difficulty": asset.game.difficulty if asset.game else "",
+            "category_id": asset.category_id,
+            "size": asset.size,
+            "hash": asset.content_hash,
+            "url": _url(asset),
+        }
+        for asset in assets
+    ]
+
+
+def manifest():
+    """{"version", "games"}: every registered game, for dashboards and the fragment cache key."""
+    version = f"{registry_version()}-{recommendations.games_version()}"
+    if _local["version"] == version:
+        return _local["manifest"]
+    key = f"registry:manifest:{version}"
+    games = cache.get(key)
+    if games is None:
+        games = build_manifest()
+        cache.set(key, games, REGISTRY_CACHE_TTL)
+    result = {"version": version, "games": games}
+    with _local_lock:
+        _local["version"], _local["manifest"] = version, result
+    return result
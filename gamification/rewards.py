@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils.timezone import localdate, now
+
+from . import leaderboard
+from .models import EcoPoint, UserPointBalance
+
+
+# -------------------------------
+# Daily login reward
+# -------------------------------
+DAILY_LOGIN_POINTS = getattr(settings, "DAILY_LOGIN_POINTS", 1)
+
+
+def _insert_daily(user_id, day):
+    """Insert the day's reward row unless it exists; True if this call inserted it."""
+    # The unique (user, reward_date) constraint decides the race instead of an
+    # exists() pre-check. Both paths go around EcoPoint.save(), so the caller
+    # updates the balance itself.
+    if connection.vendor not in ("postgresql", "sqlite"):
+        try:
+            with transaction.atomic():
+                EcoPoint.objects.bulk_create(
+                    [EcoPoint(user_id=user_id, points=DAILY_LOGIN_POINTS, is_daily=True, reward_date=day)]
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    meta = EcoPoint._meta
+    columns = [meta.get_field(name).column for name in ("user", "points", "awarded_at", "is_daily", "reward_date")]
+    user_column, date_column = columns[0], columns[-1]
+    sql = (
+        f"INSERT INTO {connection.ops.quote_name(meta.db_table)} "
+        f"({', '.join(connection.ops.quote_name(column) for column in columns)}) "
+        f"VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({connection.ops.quote_name(user_column)}, {connection.ops.quote_name(date_column)}) "
+        f"DO NOTHING RETURNING {connection.ops.quote_name(meta.pk.column)}"
+    )
+    with connection.cursor() as cursor:
+        params = [
+            user_id,
+            DAILY_LOGIN_POINTS,
+            connection.ops.adapt_datetimefield_value(now()),
+            True,
+            connection.ops.adapt_datefield_value(day),
+        ]
+        cursor.execute(sql, params)
+        return cursor.fetchone() is not None
+
+
+def award_daily_login(user, day=None):
+    """Give ``user`` the daily login point at most once per day; True if awarded now."""
+    day = day or localdate()
+    with transaction.atomic():
+        awarded = _insert_daily(user.id, day)
+        if awarded:
+            UserPointBalance.apply_delta(user.id, DAILY_LOGIN_POINTS)
+            leaderboard.points_changed(user.id)
+    return awarded
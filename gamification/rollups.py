@@ -0,0 +1,268 @@
+import time as clock
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils.timezone import get_current_timezone
+
+from .logins import day_bit
+from .models import (
+    DailyInstitutionRollup, DailyRegionRollup, EcoPoint, GameAttempt, Institution, LoginCalendar,
+    RollupWatermark, StudentProfile,
+)
+
+
+# -------------------------------
+# Daily analytics rollups
+# -------------------------------
+# Government and NGO dashboards read DailyInstitutionRollup (institution x day)
+# and DailyRegionRollup (state x city x day), never EcoPoint or GameAttempt.
+#
+# * refresh() (every few minutes) folds EcoPoints and GameAttempts written since
+#   the last run into the rollups, using an id watermark per source table.
+#   Ids below the watermark that were missing (their transaction had not
+#   committed yet) are remembered as gaps and folded once they appear; a gap
+#   still empty after ROLLUP_GAP_SECONDS was a rolled-back insert.
+# * Active students are counted as each student's first login of the day is
+#   recorded (logins.record_login), so they are exact without any scan.
+# * rebuild() (nightly) recomputes finished days from scratch. It picks up
+#   deleted rows, rows committed out of id order and institutions that moved
+#   city or state.
+#
+# Every write bumps a version token, which the dashboards use as their ETag /
+# Last-Modified (see http_cache.py). It is kept in the database, in the
+# "version" watermark row, so every process sees the same token whatever
+# cache is configured.
+
+METRICS = ("points", "attempts", "tasks_approved", "active_students")
+SOURCES = {
+    "ecopoint": (
+        EcoPoint,
+        "awarded_at",
+        {"points": Sum("points"), "tasks_approved": Count("submission_id")},
+    ),
+    "gameattempt": (GameAttempt, "attempt_date", {"attempts": Count("id")}),
+}
+ROLLUP_GAP_SECONDS = getattr(settings, "ROLLUP_GAP_SECONDS", 60 * 60)
+MAX_GAPS = 10000  # per source; the oldest are dropped first
+ROLLUP_WINDOWS = [7, 30, 90, 365]  # days the analytics dashboard can be drawn over
+
+VERSION_ROW = "version"  # its last_id holds the version token, a time_ns()
+
+
+def version():
+    token = RollupWatermark.objects.filter(source=VERSION_ROW).values_list("last_id", flat=True).first()
+    if token is None:
+        try:
+            with transaction.atomic():
+                token = RollupWatermark.objects.create(source=VERSION_ROW, last_id=clock.time_ns()).last_id
+        except IntegrityError:
+            token = RollupWatermark.objects.get(source=VERSION_ROW).last_id
+    return token
+
+
+def touch():
+    # Never backwards, even when this host's clock is behind the last writer's.
+    if not RollupWatermark.objects.filter(source=VERSION_ROW).update(
+        last_id=Greatest(F("last_id") + 1, Value(clock.time_ns()))
+    ):
+        version()
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=get_current_timezone())
+
+
+def _aggregate(source, exclude_ids=(), **filters):
+    """{(institution_id, day): {metric: value}} for students' rows of one source table."""
+    model, date_field, metrics = SOURCES[source]
+    rows = model.objects.filter(user__studentprofile__isnull=False, **filters)
+    if exclude_ids:
+        rows = rows.exclude(id__in=exclude_ids)
+    rows = (
+        rows.values(institution_id=F("user__studentprofile__institution_id"), day=TruncDate(date_field))
+        .annotate(**metrics)
+        .order_by()
+    )
+    return {(row.pop("institution_id"), row.pop("day")): row for row in rows}
+
+
+def _regions(institution_ids):
+    return {
+        institution_id: {"state": state, "city": city}
+        for institution_id, state, city in Institution.objects.filter(id__in=institution_ids).values_list(
+            "id", "state", "city"
+        )
+    }
+
+
+def _apply(deltas):
+    regions = _regions({institution_id for institution_id, _ in deltas})
+    per_region = {}
+    for (institution_id, day), metrics in deltas.items():
+        region = regions[institution_id]
+        DailyInstitutionRollup.add({"institution_id": institution_id, "day": day}, defaults=region, **metrics)
+        totals = per_region.setdefault((region["state"], region["city"], day), {})
+        for metric, value in metrics.items():
+            totals[metric] = totals.get(metric, 0) + value
+    for (state, city, day), metrics in per_region.items():
+        DailyRegionRollup.add({"state": state, "city": city, "day": day}, **metrics)
+
+
+def _merge(deltas, more):
+    for key, metrics in more.items():
+        totals = deltas.setdefault(key, {})
+        for metric, value in metrics.items():
+            totals[metric] = totals.get(metric, 0) + value
+    return deltas
+
+
+def refresh():
+    """Fold rows written since the last refresh into the rollups. Returns the rows' (source, count)."""
+    folded = {}
+    for source, (model, _, _) in SOURCES.items():
+        with transaction.atomic():
+            RollupWatermark.objects.get_or_create(source=source)
+            # The row lock keeps two refreshes from folding the same ids.
+            watermark = RollupWatermark.objects.select_for_update().get(source=source)
+            low, high = watermark.last_id, max(watermark.last_id, model.objects.aggregate(high=Max("id"))["high"] or 0)
+            gaps = {int(row_id): seen for row_id, seen in watermark.gaps.items()}
+
+            # Rows that were still uncommitted below the watermark last time.
+            filled = list(model.objects.filter(id__in=list(gaps)).values_list("id", flat=True)) if gaps else []
+            deltas = _aggregate(source, id__in=filled) if filled else {}
+            for row_id in filled:
+                del gaps[row_id]
+
+            if high > low:
+                new = model.objects.filter(id__gt=low, id__lte=high)
+                missing = []
+                if new.count() < high - low:
+                    present = set(new.values_list("id", flat=True))
+                    missing = [row_id for row_id in range(max(low + 1, high - MAX_GAPS + 1), high + 1) if row_id not in present]
+                    gaps.update(dict.fromkeys(missing, clock.time()))
+                # A missing id that commits meanwhile is left to the next refresh, which finds it in the gaps.
+                _merge(deltas, _aggregate(source, missing, id__gt=low, id__lte=high))
+
+            expired = clock.time() - ROLLUP_GAP_SECONDS
+            gaps = {row_id: seen for row_id, seen in gaps.items() if seen >= expired}
+            gaps = dict(sorted(gaps.items())[-MAX_GAPS:])
+            if not deltas and high == low and len(gaps) == len(watermark.gaps):
+                continue
+            _apply(deltas)
+            if high > low or filled:
+                folded[source] = high - low + len(filled)
+            watermark.last_id = high
+            watermark.gaps = {str(row_id): seen for row_id, seen in gaps.items()}
+            watermark.save(update_fields=["last_id", "gaps", "updated_at"])
+    if folded:
+        touch()
+    return folded
+
+
+def record_login(user_id, day):
+    """Count a student's first login of ``day`` as one active student."""
+    profile = (
+        StudentProfile.objects.filter(user_id=user_id)
+        .values("institution_id", "institution__state", "institution__city")
+        .first()
+    )
+    if profile is None:
+        return
+    region = {"state": profile["institution__state"], "city": profile["institution__city"]}
+    DailyInstitutionRollup.add({"institution_id": profile["institution_id"], "day": day}, defaults=region, active_students=1)
+    DailyRegionRollup.add({"state": region["state"], "city": region["city"], "day": day}, active_students=1)
+    touch()
+
+
+def _active_students(first, last):
+    """{(institution_id, day): students who signed in} from the login calendars."""
+    counts = {}
+    calendars = LoginCalendar.objects.filter(
+        year__range=(first.year, last.year), user__studentprofile__isnull=False
+    ).values_list("user__studentprofile__institution_id", "year", "days")
+    for institution_id, year, days in calendars.iterator(chunk_size=2000):
+        days = bytes(days)
+        day = max(first, first.replace(year=year, month=1, day=1))
+        end = min(last, last.replace(year=year, month=12, day=31))
+        while day <= end:
+            index, mask = day_bit(day)
+            if days[index] & mask:
+                counts[(institution_id, day)] = counts.get((institution_id, day), 0) + 1
+            day += timedelta(days=1)
+    return counts
+
+
+def rebuild(first, last):
+    """
+    Recompute the rollups for the days first..last from the source tables. Rows
+    newer than the refresh watermarks, or still in their gaps, are left for the
+    next refresh().
+    """
+    with transaction.atomic():
+        marks = {}
+        for source in SOURCES:
+            RollupWatermark.objects.get_or_create(source=source)
+            marks[source] = RollupWatermark.objects.select_for_update().get(source=source)
+
+        window = {"__gte": _day_start(first), "__lt": _day_start(last + timedelta(days=1))}
+        totals = {}
+        for source, (_, date_field, _) in SOURCES.items():
+            filters = {date_field + lookup: value for lookup, value in window.items()}
+            mark = marks[source]
+            for key, metrics in _aggregate(source, [int(row_id) for row_id in mark.gaps], id__lte=mark.last_id, **filters).items():
+                totals.setdefault(key, {}).update(metrics)
+        for key, count in _active_students(first, last).items():
+            totals.setdefault(key, {})["active_students"] = count
+
+        regions = _regions({institution_id for institution_id, _ in totals})
+        DailyInstitutionRollup.objects.filter(day__range=(first, last)).delete()
+        DailyInstitutionRollup.objects.bulk_create(
+            [
+                DailyInstitutionRollup(institution_id=institution_id, day=day, **regions[institution_id], **metrics)
+                for (institution_id, day), metrics in totals.items()
+            ],
+            batch_size=1000,
+        )
+
+        DailyRegionRollup.objects.filter(day__range=(first, last)).delete()
+        per_region = (
+            DailyInstitutionRollup.objects.filter(day__range=(first, last))
+            .values("state", "city", "day")
+            .annotate(**{metric: Sum(metric) for metric in METRICS})
+            .order_by()
+        )
+        DailyRegionRollup.objects.bulk_create([DailyRegionRollup(**row) for row in per_region], batch_size=1000)
+    touch()
+    return len(totals)
+
+
+# -------------------------------
+# Dashboard queries
+# -------------------------------
+def summary(first, last, state=None, city=None):
+    """
+    Totals per state, per city of ``state``, or per institution of ``city``
+    for the days first..last, plus a per-day trend for the same scope.
+    """
+    days = (last - first).days + 1
+    if city:
+        rows = DailyInstitutionRollup.objects.filter(state=state, city=city)
+        keys, group = ["institution_id"], F("institution__name")
+    elif state:
+        rows = DailyRegionRollup.objects.filter(state=state)
+        keys, group = [], F("city")
+    else:
+        rows = DailyRegionRollup.objects.all()
+        keys, group = [], F("state")
+    rows = rows.filter(day__range=(first, last))
+    totals = {metric: Sum(metric) for metric in METRICS}
+
+    breakdown = list(rows.values(*keys, name=group).annotate(**totals).order_by("-points", "name"))
+    trend = list(rows.values("day").annotate(**totals).order_by("day"))
+    for row in breakdown:
+        # Active students are distinct per day only, so show the daily average.
+        row["avg_daily_active"] = round(row.pop("active_students") / days, 1)
+    return {"breakdown": breakdown, "trend": trend, "days": days}
@@ -0,0 +1,490 @@
+import csv
+import io
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+from django.utils.timezone import now
+
+from .institutions import added as institutions_added, find_duplicate, normalise
+from .models import BackgroundJob, Institution, StudentProfile, TeacherProfile, User
+
+try:
+    import openpyxl
+except ImportError:  # optional: only CSV rosters can be read without it
+    openpyxl = None
+
+
+# -------------------------------
+# Bulk roster import
+# -------------------------------
+# A roster (CSV, or XLSX with openpyxl installed) is read row by row and
+# handled ROSTER_BATCH_SIZE rows at a time, so memory does not grow with the
+# file. Per batch: rows are validated, the usernames/slugs already taken are
+# looked up with one query, institutions are matched on (name, city, state)
+# through the search index (near-duplicates included) and created once, the distinct passwords are hashed in a
+# process pool (hashing is what dominates the run time) and the users and
+# profiles are written with bulk_create in one transaction. If that
+# transaction hits a unique constraint (someone signed up meanwhile), the
+# batch is retried row by row so only the clashing rows fail.
+#
+# Every row gets one line in the report: created, or the reason it was not.
+
+ROSTER_BATCH_SIZE = getattr(settings, "ROSTER_BATCH_SIZE", 1000)
+ROSTER_HASH_WORKERS = getattr(settings, "ROSTER_HASH_WORKERS", os.cpu_count() or 1)
+STUDENT_ROLES = ["school_student", "college_student"]
+TEACHER_ROLES = ["school_teacher", "college_teacher"]
+ROSTER_ROLES = STUDENT_ROLES + TEACHER_ROLES
+GENDERS = {value for value, _ in StudentProfile.gender_CHOICES}
+REPORT_FIELDS = ["line", "username", "status", "detail"]
+# Spreadsheet headings that mean the same column.
+ALIASES = {
+    "institution": "institution_name",
+    "school": "institution_name",
+    "college": "institution_name",
+    "city": "institution_city",
+    "state": "institution_state",
+    "class": "grade",
+    "year": "current_year",
+    "date_of_birth": "dob",
+    "phone": "contact_no",
+}
+
+_validate_username = UnicodeUsernameValidator()
+
+
+class RosterError(ValueError):
+    pass
+
+
+# -------------------------------
+# Reading
+# -------------------------------
+def _column(heading):
+    name = "_".join(str(heading or "").strip().lower().split())
+    return ALIASES.get(name, name)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # spreadsheets store 9 as 9.0
+    return str(value).strip()
+
+
+def read_rows(handle, filename):
+    """Yield (line number, {column: text}) for each non-empty row of a binary file."""
+    if filename.lower().endswith(".xlsx"):
+        if openpyxl is None:
+            raise RosterError("Reading .xlsx rosters needs openpyxl (pip install openpyxl); upload a CSV instead.")
+        workbook = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [_column(heading) for heading in next(rows, [])]
+            for line, values in enumerate(rows, start=2):
+                row = {column: _cell(value) for column, value in zip(header, values) if column}
+                if any(row.values()):
+                    yield line, row
+        finally:
+            workbook.close()
+        return
+    if not filename.lower().endswith(".csv"):
+        raise RosterError("Rosters must be .csv or .xlsx files.")
+    reader = csv.reader(io.TextIOWrapper(handle, encoding="utf-8-sig", newline=""))
+    header = [_column(heading) for heading in next(reader, [])]
+    for values in reader:
+        row = {column: _cell(value) for column, value in zip(header, values) if column}
+        if any(row.values()):
+            yield reader.line_num, row
+
+
+# -------------------------------
+# Validation
+# -------------------------------
+def _integer(row, column, errors):
+    value = row.get(column, "")
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        errors.append(f"{column} must be a number")
+        return None
+
+
+def institution_key(name, city, state):
+    return normalise(name), normalise(city), normalise(state)
+
+
+def _too_long(model, values, errors):
+    for field, value in values.items():
+        max_length = model._meta.get_field(field).max_length
+        if isinstance(value, str) and max_length and len(value) > max_length:
+            errors.append(f"{field} is longer than {max_length} characters")
+
+
+def clean_row(row, institution=None, roles=ROSTER_ROLES):
+    """
+    Model field values for one row, or raise RosterError listing what is
+    wrong with it. ``institution`` (a teacher's own) overrides the
+    institution columns.
+    """
+    errors = []
+    username = row.get("username", "")
+    if not username:
+        errors.append("username is required")
+    else:
+        try:
+            _validate_username(username)
+        except ValidationError:
+            errors.append("username may only contain letters, digits and @/./+/-/_")
+
+    role = row.get("role", "").lower()
+    if role not in roles:
+        errors.append(f"role must be one of {', '.join(roles)}")
+
+    email = row.get("email", "")
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append("email is not valid")
+
+    dob = None
+    if row.get("dob"):
+        try:
+            dob = date.fromisoformat(row["dob"])
+        except ValueError:
+            errors.append("dob must look like 2010-01-31")
+
+    gender = row.get("gender", "").lower() or "male"
+    if gender not in GENDERS:
+        errors.append(f"gender must be one of {', '.join(sorted(GENDERS))}")
+
+    if institution is None:
+        name, city, state = (row.get(column, "") for column in ("institution_name", "institution_city", "institution_state"))
+        if not (name and city and state):
+            errors.append("institution_name, institution_city and institution_state are required")
+        _too_long(Institution, {"name": name, "city": city, "state": state}, errors)
+    else:
+        name, city, state = institution.name, institution.city, institution.state
+
+    user = {
+        "username": username,
+        "email": email,
+        "first_name": row.get("first_name", ""),
+        "last_name": row.get("last_name", ""),
+        "contact_no": row.get("contact_no", ""),
+        "dob": dob,
+        "address": row.get("address", ""),
+        "role": role,
+    }
+    profile = {"gender": gender}
+    if role in STUDENT_ROLES:
+        profile.update({
+            "enrollment_no": row.get("enrollment_no", ""),
+            "grade": _integer(row, "grade", errors),
+            "stream": row.get("stream", ""),
+            "current_year": _integer(row, "current_year", errors),
+            "course": row.get("course", ""),
+            "field_of_study": row.get("field_of_study", ""),
+        })
+    elif role in TEACHER_ROLES:
+        profile.update({
+            "teacher_id": row.get("teacher_id", ""),
+            "designation": row.get("designation", ""),
+            "department": row.get("department", ""),
+        })
+
+    _too_long(User, user, errors)
+    _too_long(StudentProfile if role in STUDENT_ROLES else TeacherProfile, profile, errors)
+    if errors:
+        raise RosterError("; ".join(errors))
+    return {
+        "user": user,
+        "profile": profile,
+        "password": row.get("password", ""),
+        "institution": (name, city, state, "School" if role.startswith("school") else "College"),
+    }
+
+
+# -------------------------------
+# Password hashing
+# -------------------------------
+def _init_worker():
+    # Forked workers inherit the configured project; spawned ones set it up.
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+class PasswordHasherPool:
+    """
+    Hashes passwords on ``workers`` processes, or in this one for a single
+    worker. Rows sharing a password (a class-wide first password, typically)
+    share its hash across the whole import; up to KNOWN_PASSWORDS of them are
+    remembered between batches.
+    """
+
+    KNOWN_PASSWORDS = 10000
+
+    def __init__(self, workers=ROSTER_HASH_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = None
+        # No password given: an unusable one, to be set by the teacher or an admin.
+        self._known = {"": make_password(None)}
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def hash_all(self, passwords):
+        passwords = set(passwords)
+        distinct = sorted(passwords - self._known.keys())
+        if self._executor is None:
+            hashes = map(_hash, distinct)
+        else:
+            hashes = self._executor.map(_hash, distinct, chunksize=max(1, len(distinct) // (self.workers * 4)))
+        hashed = dict(zip(distinct, hashes))
+        for password in passwords - hashed.keys():
+            hashed[password] = self._known[password]
+        if len(self._known) < self.KNOWN_PASSWORDS:
+            self._known.update(islice(hashed.items(), self.KNOWN_PASSWORDS - len(self._known)))
+        return hashed
+
+
+# -------------------------------
+# Writing
+# -------------------------------
+class InstitutionCache:
+    """Institution ids by institution_key(), remembered for the whole import."""
+
+    def __init__(self, known=()):
+        self._ids = {institution_key(item.name, item.city, item.state): item.id for item in known}
+        self.created = 0
+
+    def resolve(self, institutions):
+        """
+        {key: id} for (name, city, state, type) tuples. An institution that
+        exists, or nearly does (see institutions.find_duplicate), is reused;
+        the others are created in their own transaction, so a batch of users
+        that is rolled back does not take them along.
+        """
+        wanted = {institution_key(*values[:3]): values for values in institutions}
+        new = []
+        for key, (name, city, state, kind) in wanted.items():
+            if key in self._ids:
+                continue
+            existing = find_duplicate(name, city, state)
+            if existing is not None:
+                self._ids[key] = existing
+            else:
+                new.append(Institution(name=" ".join(name.split()), city=city, state=state, type=kind))
+        if new:
+            with transaction.atomic():
+                for institution in Institution.objects.bulk_create(new):
+                    self._ids[institution_key(institution.name, institution.city, institution.state)] = institution.id
+                # bulk_create sends no post_save: tell the search index here.
+                transaction.on_commit(institutions_added)
+            self.created += len(new)
+        return {key: self._ids[key] for key in wanted}
+
+
+def _save(entries, hashed, institution_ids):
+    """Write users and profiles in one transaction; an IntegrityError rolls all of them back."""
+    built = []
+    for _, entry in entries:
+        user = User(**entry["user"], password=hashed[entry["password"]], slug=slugify(entry["user"]["username"]))
+        model = StudentProfile if entry["user"]["role"] in STUDENT_ROLES else TeacherProfile
+        institution_id = institution_ids[institution_key(*entry["institution"][:3])]
+        built.append((user, model(**entry["profile"], institution_id=institution_id)))
+    with transaction.atomic():
+        User.objects.bulk_create([user for user, _ in built])
+        for user, profile in built:
+            profile.user_id = user.id
+        for model in (StudentProfile, TeacherProfile):
+            model.objects.bulk_create([profile for _, profile in built if isinstance(profile, model)])
+
+
+def _created(entry):
+    return "" if entry["password"] else "no password set"
+
+
+def import_batch(rows, hasher, institutions, report, institution=None, roles=ROSTER_ROLES, seen=None):
+    """Validate and save one batch of (line, row), reporting every row."""
+    seen = set() if seen is None else seen
+    valid = []
+    for line, row in rows:
+        try:
+            entry = clean_row(row, institution, roles)
+        except RosterError as exc:
+            report(line, row.get("username", ""), "error", str(exc))
+            continue
+        # Slugs are unique too and fold case: "Asha" and "asha" would clash.
+        slug = slugify(entry["user"]["username"])
+        if slug in seen:
+            report(line, entry["user"]["username"], "error", "username appears earlier in the file")
+            continue
+        seen.add(slug)
+        valid.append((line, entry, slug))
+
+    usernames = [entry["user"]["username"] for _, entry, _ in valid]
+    slugs = [slug for _, _, slug in valid]
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+    taken_slugs = set(User.objects.filter(slug__in=slugs).values_list("slug", flat=True))
+    entries = []
+    for line, entry, slug in valid:
+        if entry["user"]["username"] in taken_usernames or slug in taken_slugs:
+            report(line, entry["user"]["username"], "exists", "a user with this username already exists")
+        else:
+            entries.append((line, entry))
+    if not entries:
+        return
+
+    institution_ids = institutions.resolve(entry["institution"] for _, entry in entries)
+    hashed = hasher.hash_all(entry["password"] for _, entry in entries)
+    try:
+        _save(entries, hashed, institution_ids)
+    except IntegrityError:
+        # Lost a race with a signup or another import: find the clashing rows.
+        for line, entry in entries:
+            try:
+                _save([(line, entry)], hashed, institution_ids)
+            except IntegrityError:
+                report(line, entry["user"]["username"], "exists", "a user with this username already exists")
+            else:
+                report(line, entry["user"]["username"], "created", _created(entry))
+        return
+    for line, entry in entries:
+        report(line, entry["user"]["username"], "created", _created(entry))
+
+
+def import_roster(handle, filename, report_file=None, institution=None, roles=ROSTER_ROLES,
+                  batch_size=ROSTER_BATCH_SIZE, workers=ROSTER_HASH_WORKERS):
+    """
+    Import a roster from a binary file ``handle``; one report line per row is
+    written to ``report_file`` (a text file) as CSV. ``institution`` puts
+    everyone in that institution and ``roles`` limits the accepted roles.
+    Returns the counts per outcome.
+    """
+    writer = csv.writer(report_file) if report_file is not None else None
+    if writer is not None:
+        writer.writerow(REPORT_FIELDS)
+    counts = {"rows": 0, "created": 0, "exists": 0, "error": 0, "institutions_created": 0}
+
+    def report(line, username, status, detail):
+        counts[status] += 1
+        if writer is not None:
+            writer.writerow([line, username, status, detail])
+
+    rows = read_rows(handle, filename)
+    institutions, seen = InstitutionCache([institution] if institution else []), set()
+    with PasswordHasherPool(workers) as hasher:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            counts["rows"] += len(batch)
+            import_batch(batch, hasher, institutions, report, institution, roles, seen)
+    counts["institutions_created"] = institutions.created
+    return counts
+
+
+# -------------------------------
+# Uploads (imported by the "roster.import" background job)
+# -------------------------------
+# Uploaded rosters hold plaintext passwords, so they are kept in
+# ROSTER_UPLOAD_DIR, outside MEDIA_ROOT where nothing serves them, readable
+# by the server's user only, and deleted as soon as their job has run
+# (or, if its worker died, by purge_uploads() in the worker's housekeeping).
+# Reports (no passwords) sit next to them and are only handed out by
+# views.roster_report.
+
+ROSTER_UPLOAD_GRACE = 60 * 60  # seconds before an upload without a job counts as abandoned
+
+
+def upload_storage():
+    location = getattr(settings, "ROSTER_UPLOAD_DIR", os.path.join(settings.BASE_DIR, "private", "rosters"))
+    return FileSystemStorage(location=location, file_permissions_mode=0o600, directory_permissions_mode=0o700)
+
+
+def store_upload(uploaded):
+    """Save an uploaded roster; returns the (upload, report) storage names for the job."""
+    extension = os.path.splitext(uploaded.name)[1].lower()
+    if extension not in (".csv", ".xlsx"):
+        raise RosterError("Rosters must be .csv or .xlsx files.")
+    if extension == ".xlsx" and openpyxl is None:
+        raise RosterError("Reading .xlsx rosters needs openpyxl (pip install openpyxl); upload a CSV instead.")
+    stem = uuid.uuid4().hex
+    return upload_storage().save(stem + extension, uploaded), stem + ".report.csv"
+
+
+def import_upload(upload, report, institution_id=None, roles=ROSTER_ROLES):
+    """Import a stored roster, save its report next to it and delete the roster (it holds passwords)."""
+    storage = upload_storage()
+    try:
+        institution = Institution.objects.get(id=institution_id) if institution_id else None
+        with tempfile.TemporaryFile() as spool:
+            report_file = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+            with storage.open(upload, "rb") as handle:
+                counts = import_roster(handle, upload, report_file, institution=institution, roles=roles)
+            report_file.flush()
+            spool.seek(0)
+            storage.save(report, File(spool))
+            report_file.detach()
+    finally:
+        if storage.exists(upload):
+            storage.delete(upload)
+    return counts
+
+
+def purge_uploads(grace=ROSTER_UPLOAD_GRACE):
+    """
+    Delete rosters whose job will not run any more (its worker died, say) and
+    reports whose job was purged. Files younger than ``grace`` seconds may
+    belong to a job that is being queued and are left alone. Returns the
+    number of files deleted.
+    """
+    storage = upload_storage()
+    try:
+        _, files = storage.listdir("")
+    except FileNotFoundError:
+        return 0
+    imports = list(BackgroundJob.objects.filter(name="roster.import").values_list("status", "payload"))
+    pending = {payload.get("upload") for status, payload in imports if status in ("queued", "running")}
+    reports = {payload.get("report") for _, payload in imports}
+    cutoff = now() - timedelta(seconds=grace)
+    deleted = 0
+    for name in files:
+        if name in (reports if name.endswith(".report.csv") else pending):
+            continue
+        if storage.get_modified_time(name) > cutoff:
+            continue
+        storage.delete(name)
+        deleted += 1
+    return deleted
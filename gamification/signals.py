@@ -0,0 +1,211 @@
+from functools import partial
+
+from django.contrib import messages
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import localdate
+
+from . import badges, catalog, institutions, leaderboard, logins, quiz, recommendations, registry, rollups, versions
+from .jobs import enqueue
+from .rewards import award_daily_login
+from .models import (
+    Badge, CacheVersion, Category, EcoPoint, Game, GameAsset, GameAttempt, GameTopic, Institution, QuizOption, QuizQuestion,
+    SubTopic, TaskSubmission, UserActivityCounter, UserPointBalance,
+)
+
+
+# -------------------------------
+# One version read per token per request
+# -------------------------------
+@receiver(request_started)
+def begin_version_scope(sender, **kwargs):
+    versions.begin()
+
+
+@receiver(request_finished)
+def end_version_scope(sender, **kwargs):
+    versions.end()
+
+
+# -------------------------------
+# EcoPoint ledger -> balance
+# -------------------------------
+@receiver(post_delete, sender=EcoPoint)
+def ecopoint_deleted(sender, instance, **kwargs):
+    # Runs inside the deletion collector's transaction. Never seed a row here:
+    # the user itself may be mid-cascade.
+    UserPointBalance.apply_delta(instance.user_id, -instance.points, create=False)
+    if instance.submission_id:
+        UserActivityCounter.objects.filter(user_id=instance.user_id).update(tasks_approved=F("tasks_approved") - 1)
+    leaderboard.points_changed(instance.user_id)
+
+
+# -------------------------------
+# EcoPoint ledger -> leaderboards
+# -------------------------------
+@receiver(post_save, sender=EcoPoint)
+def ecopoint_saved(sender, instance, created, **kwargs):
+    if created and instance.submission_id:
+        UserActivityCounter.bump(instance.user_id, tasks_approved=1)
+    leaderboard.points_changed(instance.user_id)
+
+
+# -------------------------------
+# Daily login reward
+# -------------------------------
+@receiver(user_logged_in)
+def reward_daily_login(sender, request, user, **kwargs):
+    if user.role not in ["school_student", "college_student"]:
+        return
+    if award_daily_login(user) and request is not None:
+        messages.success(request, "+1 Eco Point for Daily Login!", fail_silently=True)
+
+
+# -------------------------------
+# Quiz content -> cached quiz payloads
+# -------------------------------
+def _invalidate_quiz(subtopic_id):
+    if subtopic_id is not None:
+        transaction.on_commit(partial(quiz.invalidate, subtopic_id))
+
+
+@receiver(pre_save, sender=QuizQuestion)
+def quiz_question_moving(sender, instance, **kwargs):
+    if instance.pk:
+        previous = QuizQuestion.objects.filter(pk=instance.pk).values_list("subtopic_id", flat=True).first()
+        if previous != instance.subtopic_id:
+            _invalidate_quiz(previous)
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def quiz_question_changed(sender, instance, **kwargs):
+    _invalidate_quiz(instance.subtopic_id)
+
+
+@receiver(post_save, sender=QuizOption)
+@receiver(post_delete, sender=QuizOption)
+def quiz_option_changed(sender, instance, **kwargs):
+    _invalidate_quiz(QuizQuestion.objects.filter(pk=instance.question_id).values_list("subtopic_id", flat=True).first())
+
+
+@receiver(post_save, sender=SubTopic)
+def subtopic_changed(sender, instance, **kwargs):
+    _invalidate_quiz(instance.id)
+
+
+@receiver(post_delete, sender=Game)
+def quiz_game_deleted(sender, instance, **kwargs):
+    # Answer keys remember which Game quiz attempts are recorded against.
+    _invalidate_quiz(instance.subtopic_id)
+
+
+# -------------------------------
+# Catalog and game edits -> in-process catalog copies
+# -------------------------------
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubTopic)
+@receiver(post_delete, sender=SubTopic)
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def games_changed(sender, **kwargs):
+    transaction.on_commit(recommendations.invalidate_games)
+
+
+# -------------------------------
+# Institution edits -> in-process search index
+# -------------------------------
+@receiver(post_save, sender=Institution)
+def institution_saved(sender, created, **kwargs):
+    transaction.on_commit(institutions.added if created else institutions.invalidate)
+
+
+@receiver(post_delete, sender=Institution)
+def institution_deleted(sender, **kwargs):
+    transaction.on_commit(institutions.invalidate)
+
+
+# -------------------------------
+# Game files -> game registry
+# -------------------------------
+@receiver(post_migrate)
+def scan_games_after_migrate(sender, using, **kwargs):
+    # Deploys run migrate, so this is the "once at startup" scan. Skipped when
+    # migrating back to before the registry or its version table existed.
+    if sender.name != "gamification":
+        return
+    tables = connections[using].introspection.table_names()
+    if GameAsset._meta.db_table not in tables or CacheVersion._meta.db_table not in tables:
+        return
+    registry.scan()
+
+
+@receiver(pre_save, sender=Category)
+def category_game_file_changing(sender, instance, **kwargs):
+    instance._previous_game_file = (
+        Category.objects.filter(pk=instance.pk).values_list("godot_game_file", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_game_file_changed(sender, instance, **kwargs):
+    if (instance.godot_game_file.name or None) != (instance._previous_game_file or None):
+        enqueue("games.scan_uploads")
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    if instance.godot_game_file.name:
+        enqueue("games.scan_uploads")
+
+
+# -------------------------------
+# Task approval outside the moderation queue -> EcoPoint
+# -------------------------------
+@receiver(pre_save, sender=TaskSubmission)
+def task_submission_status(sender, instance, **kwargs):
+    instance._previous_status = (
+        TaskSubmission.objects.filter(pk=instance.pk).values_list("status", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=TaskSubmission)
+def task_submission_approved(sender, instance, **kwargs):
+    if instance.status == "approved" and instance._previous_status != "approved":
+        enqueue("tasks.award_points", submission_id=instance.pk)
+
+
+# -------------------------------
+# Badge engine: counters + incremental evaluation
+# -------------------------------
+@receiver(post_save, sender=GameAttempt)
+def game_attempt_saved(sender, instance, created, **kwargs):
+    # Bulk writers (ingest buffer, CSV grading) call badges.count_attempts themselves.
+    if created:
+        badges.count_attempts([(instance.user_id, instance.game_id)])
+        enqueue("badges.evaluate", user_id=instance.user_id, metrics=["attempts", "topic"])
+
+
+@receiver(user_logged_in)
+def record_login_day(sender, request, user, **kwargs):
+    # One bit per day in the user's LoginCalendar; repeat logins on a day are no-ops.
+    today = localdate()
+    if logins.record_login(user.id, today):
+        rollups.record_login(user.id, today)
+        enqueue("badges.evaluate", user_id=user.id, metrics=["streak", "longest_streak", "logins"])
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+@receiver(post_save, sender=GameTopic)
+def badge_rules_changed(sender, **kwargs):
+    transaction.on_commit(badges.invalidate_rules)
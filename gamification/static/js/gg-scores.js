@@ -0,0 +1,141 @@
+// Green Guardian score client for the bundled games.
+//
+// Usage from a game:
+//   <script src="../js/gg-scores.js" data-entry="games/Splash Saver.HTML"></script>
+//   GreenGuardian.reportScore({ score: 120, accuracy: 80, timeTaken: 60 });
+//
+// Every score gets a client-generated id and is kept in localStorage until the
+// server reports it saved, so retries (flaky school Wi-Fi, closed tabs, a
+// restarted server losing its write buffer) never lose or double an attempt.
+// Scores are posted in batches; pending ones are posted again after the
+// server's retry_after.
+(function () {
+  "use strict";
+
+  var script = document.currentScript;
+  var params = new URLSearchParams(window.location.search);
+  var ENDPOINT = (script && script.dataset.endpoint) || "/api/games/attempts/";
+  var GAME = params.get("game") || (script && script.dataset.game) || null;
+  var ENTRY = (script && script.dataset.entry) || null;
+  var QUEUE_KEY = "gg-score-queue";
+  var MAX_BATCH = 100;
+  var retryDelay = 2000;
+  var flushing = false;
+  var recheck = null;
+
+  function uuid() {
+    if (window.crypto && crypto.randomUUID) {
+      return crypto.randomUUID();
+    }
+    return "xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx".replace(/[xy]/g, function (c) {
+      var r = (Math.random() * 16) | 0;
+      return (c === "x" ? r : (r & 0x3) | 0x8).toString(16);
+    });
+  }
+
+  function readQueue() {
+    try {
+      return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+    } catch (e) {
+      return [];
+    }
+  }
+
+  function writeQueue(queue) {
+    try {
+      localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+    } catch (e) {
+      // Storage full or disabled: the in-flight post is the only copy.
+    }
+  }
+
+  function csrfToken() {
+    var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : "";
+  }
+
+  function flush(keepalive) {
+    var queue = readQueue();
+    if (flushing || !queue.length) {
+      return Promise.resolve();
+    }
+    flushing = true;
+    var batch = queue.slice(0, MAX_BATCH);
+
+    return fetch(ENDPOINT, {
+      method: "POST",
+      credentials: "same-origin",
+      keepalive: !!keepalive,
+      headers: { "Content-Type": "application/json", "X-CSRFToken": csrfToken() },
+      body: JSON.stringify({ attempts: batch }),
+    })
+      .then(function (response) {
+        if (response.status === 401 || response.status === 403) {
+          // Not logged in: keep the scores until the student signs in again.
+          throw new Error("not authenticated");
+        }
+        if (!response.ok && response.status !== 400) {
+          throw new Error("server error " + response.status);
+        }
+        return response.json();
+      })
+      .then(function (result) {
+        var done = {};
+        (result.saved || []).forEach(function (id) { done[id] = true; });
+        (result.rejected || []).forEach(function (item) {
+          done[item.id] = true;
+          console.warn("Score rejected:", item.error);
+        });
+        if (!result.saved && !result.rejected) {
+          batch.forEach(function (item) { done[item.id] = true; });
+        }
+        writeQueue(readQueue().filter(function (item) { return !done[item.id]; }));
+        retryDelay = 2000;
+        flushing = false;
+        var pending = {};
+        (result.pending || []).forEach(function (id) { pending[id] = true; });
+        var queue = readQueue();
+        if (queue.some(function (item) { return !pending[item.id]; })) {
+          return flush();
+        }
+        if (queue.length && !recheck) {
+          // Everything left is buffered on the server: ask again once it
+          // should have been written.
+          recheck = setTimeout(function () {
+            recheck = null;
+            flush();
+          }, (result.retry_after || 3) * 1000);
+        }
+      })
+      .catch(function () {
+        flushing = false;
+        setTimeout(flush, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 60000);
+      });
+  }
+
+  function reportScore(result) {
+    var attempt = {
+      id: uuid(),
+      game: result.game || GAME,
+      entry: result.entry || ENTRY,
+      score: Math.round(result.score || 0),
+      accuracy: result.accuracy == null ? null : result.accuracy,
+      time_taken: result.timeTaken == null ? null : Math.round(result.timeTaken),
+      progress: result.progress == null ? null : result.progress,
+    };
+    var queue = readQueue();
+    queue.push(attempt);
+    writeQueue(queue);
+    flush();
+    return attempt.id;
+  }
+
+  window.addEventListener("online", function () { flush(); });
+  window.addEventListener("pagehide", function () { flush(true); });
+  window.addEventListener("load", function () { flush(); });
+
+  window.GreenGuardian = window.GreenGuardian || {};
+  window.GreenGuardian.reportScore = reportScore;
+  window.GreenGuardian.flushScores = flush;
+})();
@@ -0,0 +1,118 @@
+// Signup page: form tabs, role-dependent fields and the institution search.
+//
+// The institution picker asks /api/institutions/ as the user types and keeps
+// the chosen id in the hidden "institution" input. "Not listed" sets it to
+// "other" and shows the fields for a new school/college.
+
+function openForm(formName) {
+    const tabContents = document.querySelectorAll('.form-tab-content');
+    tabContents.forEach(tab => tab.style.display = 'none');
+    const tabLinks = document.querySelectorAll('.tab-link');
+    tabLinks.forEach(link => link.classList.remove('active'));
+    document.getElementById(formName).style.display = 'block';
+    const activeTab = Array.from(tabLinks).find(tab => tab.getAttribute('onclick').includes(formName));
+    if (activeTab) { activeTab.classList.add('active'); }
+}
+function toggleStudentFields() {
+    const studentType = document.getElementById('student-type').value;
+    document.getElementById('school-fields').style.display = studentType === 'school_student' ? 'flex' : 'none';
+    document.getElementById('college-fields').style.display = studentType === 'college_student' ? 'flex' : 'none';
+}
+function toggleTeacherFields() {
+    const teacherType = document.getElementById('teacher-type').value;
+    document.getElementById('school-teacher-fields').style.display = teacherType === 'school_teacher' ? 'flex' : 'none';
+    document.getElementById('college-teacher-fields').style.display = teacherType === 'college_teacher' ? 'flex' : 'none';
+}
+
+(function () {
+    "use strict";
+
+    const SEARCH_URL = document.currentScript.dataset.searchUrl;
+    const DEBOUNCE_MS = 200;
+    const MIN_CHARS = 2;
+
+    function setupPicker(picker) {
+        const search = picker.querySelector('.institution-search');
+        const chosen = picker.querySelector('input[name="institution"]');
+        const results = picker.querySelector('.institution-results');
+        const other = document.getElementById(picker.dataset.other);
+        let timer = null;
+        let request = 0;
+
+        function choose(value, label) {
+            chosen.value = value;
+            search.value = label;
+            results.innerHTML = '';
+            other.style.display = value === 'other' ? 'flex' : 'none';
+            const name = other.querySelector('input[name="other_school_name"]');
+            if (value === 'other' && !name.value) { name.value = label; }
+        }
+
+        function item(text, place, onPick) {
+            const li = document.createElement('li');
+            li.textContent = text;
+            if (place) {
+                const span = document.createElement('span');
+                span.className = 'place';
+                span.textContent = ' · ' + place;
+                li.appendChild(span);
+            }
+            // mousedown, so it runs before the input loses focus
+            li.addEventListener('mousedown', event => { event.preventDefault(); onPick(); });
+            return li;
+        }
+
+        async function load(query, page) {
+            const current = ++request;
+            const params = new URLSearchParams({ q: query, page: page });
+            const response = await fetch(`${SEARCH_URL}?${params}`);
+            if (!response.ok || current !== request) { return; }
+            const data = await response.json();
+            if (page === 1) { results.innerHTML = ''; }
+            const more = results.querySelector('.more');
+            if (more) { more.remove(); }
+            const notListed = results.querySelector('.not-listed');
+            if (notListed) { notListed.remove(); }
+            data.results.forEach(institution => {
+                const label = `${institution.name} (${institution.type})`;
+                results.appendChild(item(label, `${institution.city}, ${institution.state}`,
+                    () => choose(String(institution.id), label)));
+            });
+            if (data.has_next) {
+                const li = item('More results…', '', () => load(query, page + 1));
+                li.className = 'more';
+                results.appendChild(li);
+            }
+            const li = item('My school/college is not listed', '', () => choose('other', search.value));
+            li.className = 'not-listed';
+            results.appendChild(li);
+        }
+
+        search.addEventListener('input', () => {
+            chosen.value = '';
+            other.style.display = 'none';
+            clearTimeout(timer);
+            const query = search.value.trim();
+            if (query.length < MIN_CHARS) {
+                request++;
+                results.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(() => load(query, 1), DEBOUNCE_MS);
+        });
+        search.addEventListener('blur', () => { results.innerHTML = ''; });
+        picker.closest('form').addEventListener('submit', event => {
+            if (!chosen.value) {
+                event.preventDefault();
+                search.setCustomValidity('Pick your school/college from the list, or "not listed".');
+                search.reportValidity();
+            }
+        });
+        search.addEventListener('input', () => search.setCustomValidity(''));
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('.institution-picker').forEach(setupPicker);
+        openForm('Student');
+    });
+})();
@@ -0,0 +1,47 @@
+from django.db import transaction
+
+from . import badges, leaderboard, registry, roster
+from .jobs import job
+from .models import EcoPoint, TaskSubmission
+from .moderation import TASK_APPROVAL_POINTS
+
+
+# -------------------------------
+# Background jobs (run by `manage.py run_jobs`)
+# -------------------------------
+@job("points.changed")
+def points_changed(user_id):
+    # Without a shared cache the request already updated the standings it
+    # reads (leaderboard.points_changed); this process's copy is never read.
+    if leaderboard.shared_cache():
+        leaderboard.record(user_id)
+    badges.evaluate(user_id, ["points", "tasks"])
+
+
+@job("badges.evaluate")
+def evaluate_badges(user_id, metrics):
+    badges.evaluate(user_id, metrics)
+
+
+@job("tasks.award_points")
+def award_task_points(submission_id, points=None):
+    # Approvals made outside the moderation queue (e.g. the admin). The
+    # submission OneToOne makes this idempotent.
+    submission = TaskSubmission.objects.filter(id=submission_id, status="approved").first()
+    if submission is None:
+        return
+    with transaction.atomic():
+        EcoPoint.objects.get_or_create(
+            submission=submission,
+            defaults={"user_id": submission.user_id, "points": points or TASK_APPROVAL_POINTS},
+        )
+
+
+@job("games.scan_uploads")
+def scan_uploaded_games():
+    registry.scan(static=False)
+
+
+@job("roster.import")
+def import_roster(upload, report, institution_id=None, roles=roster.ROSTER_ROLES, uploaded_by=None):
+    roster.import_upload(upload, report, institution_id, roles)
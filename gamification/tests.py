@@ -1,3 +1,1480 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipIf
+from urllib.parse import quote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate, now
+
+from . import (
+    accounts, analytics, assets, badges, catalog, classroom, institutions, jobs, leaderboard, logins, passwords, quiz,
+    recommendations, registry, rewards, rollups, roster, throttle, versions,
+)
+from .ingest import MAX_SCORE, AttemptBuffer, attempt_buffer, build_attempts
+from .management.commands import audit_indexes
+from .middleware import QueryBudgetExceeded, QueryRecorder, sql_shape
+from .models import (
+    BackgroundJob, Badge, CacheVersion, Category, DailyInstitutionRollup, DailyRegionRollup, EcoPoint, Game, GameAsset,
+    GameAttempt, GameTopic, Institution, QuizOption, QuizQuestion, RollupWatermark, StudentProfile, SubTopic,
+    TaskSubmission, TeacherProfile, User, UserBadge, UserPointBalance,
+)
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+def make_institution(name="Green Valley High School", city="Pune", state="Maharashtra", type="School"):
+    return Institution.objects.create(name=name, city=city, state=state, type=type)
+
+
+def make_student(username, institution, grade=8, role="school_student"):
+    user = User.objects.create(username=username, role=role)
+    StudentProfile.objects.create(user=user, institution=institution, enrollment_no=username, grade=grade)
+    return user
+
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+# Templates resolve {% static %} without a collectstatic manifest.
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CacheTestCase(TestCase):
+    """Every test starts with an empty cache, so no versions or copies leak between tests."""
+
+    def setUp(self):
+        cache.clear()
+
+
+# -------------------------------
+# user-001: materialized EcoPoint balance
+# -------------------------------
+class PointBalanceTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+
+    def balance(self):
+        return UserPointBalance.points_for(self.student.id)
+
+    def test_balance_follows_ledger_writes(self):
+        first = EcoPoint.objects.create(user=self.student, points=5)
+        EcoPoint.objects.create(user=self.student, points=3)
+        self.assertEqual(self.balance(), 8)
+        first.points = 10
+        first.save()
+        self.assertEqual(self.balance(), 13)
+        first.delete()
+        self.assertEqual(self.balance(), 3)
+
+    def test_moving_a_row_to_another_user_moves_its_points(self):
+        other = make_student("ben", self.student.studentprofile.institution)
+        point = EcoPoint.objects.create(user=self.student, points=4)
+        EcoPoint.objects.create(user=other, points=1)
+        point.user = other
+        point.save()
+        self.assertEqual(self.balance(), 0)
+        self.assertEqual(UserPointBalance.points_for(other.id), 5)
+
+    def test_rebuild_repairs_drift(self):
+        EcoPoint.objects.create(user=self.student, points=7)
+        UserPointBalance.objects.filter(user=self.student).update(points=100)
+        call_command("rebuild_point_balances", "--dry-run", stdout=StringIO())
+        self.assertEqual(self.balance(), 100)
+        call_command("rebuild_point_balances", stdout=StringIO())
+        self.assertEqual(self.balance(), 7)
+
+    def test_rebuild_creates_missing_and_clears_orphaned_balances(self):
+        other = make_student("ben", self.student.studentprofile.institution)
+        EcoPoint.objects.create(user=self.student, points=7)
+        UserPointBalance.objects.filter(user=self.student).delete()
+        UserPointBalance.objects.create(user=other, points=3)  # no ledger rows behind it
+        output = StringIO()
+        call_command("rebuild_point_balances", stdout=output)
+        self.assertIn("Repaired 2 balances", output.getvalue())
+        self.assertEqual((self.balance(), UserPointBalance.points_for(other.id)), (7, 0))
+
+
+# -------------------------------
+# user-002: institution leaderboards
+# -------------------------------
+class LeaderboardTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.students = {name: make_student(name, self.institution) for name in ("asha", "ben", "chen")}
+        for name, points in (("asha", 5), ("ben", 9), ("chen", 5)):
+            UserPointBalance.objects.create(user=self.students[name], points=points)
+
+    def test_top_uses_competition_ranking(self):
+        board = leaderboard.top(self.institution.id)
+        self.assertEqual([(row["rank"], row["user__username"], row["total"]) for row in board],
+                         [(1, "ben", 9), (2, "asha", 5), (2, "chen", 5)])
+        self.assertEqual(leaderboard.rank_of(self.institution.id, self.students["chen"].id), (2, 3))
+
+    def test_other_institutions_are_not_listed(self):
+        make_student("dev", make_institution(name="Other School"))
+        self.assertEqual(len(leaderboard.standings(self.institution.id)), 3)
+
+    def test_record_moves_one_student_in_the_cached_standings(self):
+        leaderboard.standings(self.institution.id)
+        UserPointBalance.objects.filter(user=self.students["asha"]).update(points=20)
+        with self.assertNumQueries(2):
+            leaderboard.record(self.students["asha"].id)
+        self.assertEqual(leaderboard.top(self.institution.id, size=1)[0]["user__username"], "asha")
+        self.assertEqual(leaderboard.rank_of(self.institution.id, self.students["ben"].id), (2, 3))
+
+
+# -------------------------------
+# user-003: daily login reward
+# -------------------------------
+class DailyLoginRewardTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+
+    def test_awarded_once_per_day(self):
+        today = date(2026, 3, 2)
+        self.assertTrue(rewards.award_daily_login(self.student, today))
+        self.assertFalse(rewards.award_daily_login(self.student, today))
+        self.assertTrue(rewards.award_daily_login(self.student, today + timedelta(days=1)))
+        self.assertEqual(EcoPoint.objects.filter(user=self.student, is_daily=True).count(), 2)
+        self.assertEqual(UserPointBalance.points_for(self.student.id), 2 * rewards.DAILY_LOGIN_POINTS)
+
+    def test_students_are_rewarded_on_login_and_teachers_are_not(self):
+        teacher = User.objects.create(username="tara", role="school_teacher")
+        self.client.force_login(self.student)
+        self.client.force_login(self.student)
+        self.client.force_login(teacher)
+        self.assertEqual(UserPointBalance.points_for(self.student.id), rewards.DAILY_LOGIN_POINTS)
+        self.assertFalse(EcoPoint.objects.filter(user=teacher).exists())
+
+
+# -------------------------------
+# user-004: index audit
+# -------------------------------
+class AuditIndexesTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        institution = make_institution()
+        make_student("asha", institution)
+        teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=teacher, institution=institution, teacher_id="T1", designation="Teacher")
+        User.objects.create(username="ngo", role="ngo")
+        Category.objects.create(name="Water")
+
+    def test_every_dashboard_view_is_audited_without_unexpected_scans(self):
+        out = StringIO()
+        call_command("audit_indexes", stdout=out)
+        output = out.getvalue()
+        for view, _, _ in audit_indexes.AUDITED_VIEWS:
+            self.assertRegex(output, rf"\[{view}\] \d+ queries")
+        self.assertTrue(output.splitlines()[-1].startswith("0 of "), output)
+        self.assertNotIn("skipped", output)
+
+
+# -------------------------------
+# user-005: query budgets
+# -------------------------------
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(CacheTestCase):
+    """Each budgeted view, with enough rows that a per-row query would show, stays in budget."""
+
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        topic = GameTopic.objects.create(name="Water")
+        game = Game.objects.create(title="Splash", description="", game_type="quiz", topic=topic)
+        badge = Badge.objects.create(name="Saver", description="", unlock_criteria="points >= 1")
+        self.category = Category.objects.create(name="Water")
+        SubTopic.objects.create(category=self.category, name="Rain")
+        self.students = []
+        for number in range(6):
+            student = make_student(f"student{number}", self.institution, grade=8 + number % 2)
+            UserBadge.objects.create(user=student, badge=badge)
+            for _ in range(2):
+                GameAttempt.objects.create(user=student, game=game, score=5)
+                submission = TaskSubmission.objects.create(user=student, game=game, submission="photo")
+                EcoPoint.objects.create(user=student, submission=submission, points=2)
+            self.students.append(student)
+        self.teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=self.teacher, institution=self.institution, teacher_id="T1", designation="Teacher")
+        self.admin = User.objects.create(username="admin", role="ngo", is_staff=True, is_superuser=True)
+
+    def get(self, user, url):
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertIn(response.status_code, (200, 302))
+        return response
+
+    def test_student_dashboard(self):
+        student = self.students[0]
+        self.get(student, reverse("student_dashboard", args=[student.slug]))
+
+    def test_explore_subtopics(self):
+        self.get(self.students[0], reverse("explore_subtopics", args=[self.category.id]))
+
+    def test_teacher_dashboard(self):
+        self.get(self.teacher, reverse("teacher_dashboard", args=[self.teacher.slug]))
+
+    def test_teacher_students(self):
+        self.get(self.teacher, reverse("teacher_students"))
+
+    def test_teacher_content(self):
+        self.get(self.teacher, reverse("teacher_content"))
+
+    def test_analytics_dashboard(self):
+        self.get(User.objects.create(username="ngo", role="ngo"), reverse("analytics_dashboard"))
+
+    def test_first_login_of_the_day(self):
+        student = self.students[0]
+        student.set_password("Pw-12345678x")
+        student.save()
+        response = self.client.post(reverse("login"), {"username": student.username, "password": "Pw-12345678x",
+                                                       "role": "school_student"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_signup(self):
+        response = self.client.post(reverse("signup"), {
+            "role": "school_student", "username": "newkid", "email": "newkid@example.com",
+            "password1": "Pw-12345678x", "password2": "Pw-12345678x",
+            "institution": str(self.institution.id), "enrollment_no": "N1", "grade": "8",
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_change_lists(self):
+        for view in settings.QUERY_BUDGETS:
+            if view.startswith("admin:"):
+                self.get(self.admin, reverse(view))
+
+    def test_going_over_budget_fails(self):
+        student = self.students[0]
+        with override_settings(QUERY_BUDGETS={"student_dashboard": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get(student, reverse("student_dashboard", args=[student.slug]))
+
+    def test_repeated_query_shapes_are_reported(self):
+        recorder = QueryRecorder()
+        for user_id in range(6):
+            recorder(lambda *args: None, f"SELECT * FROM t WHERE id = {user_id} AND name = 'x{user_id}'", None, False, None)
+        recorder(lambda *args: None, "SELECT * FROM t WHERE id IN (%s, %s, %s)", None, False, None)
+        self.assertEqual(recorder.count, 7)
+        self.assertEqual(recorder.repeated(5), [("SELECT * FROM t WHERE id = ? AND name = ?", 6)])
+        self.assertEqual(sql_shape("SELECT 1 FROM t WHERE id IN (%s, %s)"), "SELECT ? FROM t WHERE id IN (...)")
+
+    def test_headers_report_the_query_count_to_staff_only(self):
+        response = self.get(self.students[0], reverse("student_dashboard", args=[self.students[0].slug]))
+        self.assertFalse(response.has_header("X-DB-Queries"))
+        response = self.get(self.admin, reverse("admin:gamification_ecopoint_changelist"))
+        self.assertGreater(int(response["X-DB-Queries"]), 0)
+        self.assertIn("X-DB-Time-ms", response)
+        with override_settings(DEBUG=True):
+            response = self.get(self.students[0], reverse("student_dashboard", args=[self.students[0].slug]))
+        self.assertIn("X-DB-Queries", response)
+
+
+# -------------------------------
+# user-006: game score ingestion
+# -------------------------------
+class IngestTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+        self.game = Game.objects.create(title="Splash", description="", game_type="quiz",
+                                        topic=GameTopic.objects.create(name="Water"))
+
+    def item(self, **fields):
+        return {"id": str(uuid.uuid4()), "game": self.game.id, "score": 5, **fields}
+
+    def test_non_finite_and_huge_numbers_are_rejected(self):
+        bad = [
+            self.item(score=float("inf")), self.item(score=float("nan")), self.item(score=10 ** 20),
+            self.item(score=MAX_SCORE + 1), self.item(accuracy=float("inf")), self.item(progress=float("nan")),
+            self.item(time_taken=10 ** 12), self.item(time_taken=-1), self.item(score="1e400"),
+        ]
+        attempts, rejected = build_attempts(self.student, bad + [self.item(accuracy=99.5, time_taken=30)])
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual([row["id"] for row in rejected], [item["id"] for item in bad])
+
+    def test_infinity_in_the_posted_json_is_rejected_not_a_server_error(self):
+        self.client.force_login(self.student)
+        body = '{"attempts": [{"id": "%s", "game": %d, "score": Infinity}, {"id": "%s", "game": %d, "score": 1e400}]}' % (
+            uuid.uuid4(), self.game.id, uuid.uuid4(), self.game.id)
+        response = self.client.post(reverse("submit_game_attempts"), body, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["rejected"]), 2)
+
+    def test_attempts_stay_pending_until_they_are_in_the_database(self):
+        self.client.force_login(self.student)
+        item = self.item()
+        post = lambda: self.client.post(reverse("submit_game_attempts"), {"attempts": [item]},  # noqa: E731
+                                        content_type="application/json")
+        try:
+            response = post()
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(json.loads(response.content)["pending"], [item["id"]])
+            self.assertEqual(json.loads(response.content)["saved"], [])
+        finally:
+            attempt_buffer.flush()
+
+        response = post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["saved"], [item["id"]])
+        self.assertEqual(json.loads(response.content)["pending"], [])
+        self.assertEqual(GameAttempt.objects.count(), 1)
+
+    def test_a_row_the_database_cannot_store_does_not_drop_the_batch(self):
+        buffer = AttemptBuffer(batch_size=10, flush_seconds=60, max_pending=100)
+        good = [GameAttempt(user=self.student, game=self.game, client_attempt_id=uuid.uuid4(), score=score)
+                for score in (1, 2)]
+        bad = GameAttempt(user=self.student, game=self.game, client_attempt_id=uuid.uuid4(), score=10 ** 20)
+        buffer.add([good[0], bad, good[1]])
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(sorted(GameAttempt.objects.values_list("score", flat=True)), [1, 2])
+        self.assertEqual(buffer.flush(), 0)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class IngestIntegrityTests(TransactionTestCase):
+    # SQLite checks foreign keys at commit, so this needs real transactions.
+    serialized_rollback = True
+
+    def test_an_attempt_for_a_deleted_game_is_dropped_and_reported(self):
+        cache.clear()
+        student = make_student("asha", make_institution())
+        topic = GameTopic.objects.create(name="Water")
+        kept, deleted = (Game.objects.create(title=title, description="", game_type="quiz", topic=topic)
+                         for title in ("Splash", "Drought"))
+        buffer = AttemptBuffer(batch_size=10, flush_seconds=60, max_pending=100)
+        good = GameAttempt(user=student, game_id=kept.id, client_attempt_id=uuid.uuid4(), score=1)
+        orphan = GameAttempt(user=student, game_id=deleted.id, client_attempt_id=uuid.uuid4(), score=2)
+        buffer.add([good, orphan])
+        deleted.delete()
+
+        with self.assertLogs("gamification.ingest", "WARNING"):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(list(GameAttempt.objects.values_list("client_attempt_id", flat=True)),
+                         [good.client_attempt_id])
+        self.assertEqual(buffer.flush(), 0)
+
+        saved, dropped, unsaved = buffer.status([good, orphan])
+        self.assertEqual(saved, {good.client_attempt_id})
+        self.assertEqual(list(dropped), [orphan.client_attempt_id])
+        self.assertEqual(unsaved, [])
+
+
+# -------------------------------
+# user-007: cached quiz payloads
+# -------------------------------
+class QuizTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+        self.subtopic = SubTopic.objects.create(category=Category.objects.create(name="Water"), name="Rain")
+        for number, difficulty in enumerate(("easy", "easy", "hard")):
+            question = QuizQuestion.objects.create(subtopic=self.subtopic, text=f"Q{number}", difficulty=difficulty)
+            QuizOption.objects.create(question=question, text="yes", is_correct=True)
+            QuizOption.objects.create(question=question, text="no")
+        self.client.force_login(self.student)
+        self.url = reverse("quiz_questions", args=[self.subtopic.id])
+
+    def test_payload_is_built_once_and_served_gzipped(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):  # the version token
+            quiz.get_quiz(self.subtopic.id)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip;q=0").has_header("Content-Encoding"))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_editing_a_question_serves_a_new_version(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizQuestion.objects.filter(subtopic=self.subtopic).first().save()
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_an_edit_made_by_another_process_is_served(self):
+        quiz.get_quiz(self.subtopic.id)
+        # Another process edits a question: the local copy and this process's
+        # cache are untouched, only the shared version moves.
+        QuizQuestion.objects.filter(subtopic=self.subtopic, text="Q0").update(text="Q0 (fixed)")
+        CacheVersion.objects.filter(name=f"quiz:{self.subtopic.id}").update(token=F("token") + 1)
+        texts = [question["text"] for question in quiz.get_quiz(self.subtopic.id)[1]["questions"]]
+        self.assertIn("Q0 (fixed)", texts)
+
+    def test_the_version_is_read_once_per_request(self):
+        quiz.quiz_version(self.subtopic.id)
+        with versions.scope():
+            with self.assertNumQueries(1):
+                self.assertEqual(quiz.quiz_version(self.subtopic.id), quiz.quiz_version(self.subtopic.id))
+
+    def test_count_and_difficulty_pick_a_subset(self):
+        response = self.client.get(self.url, {"count": 1, "difficulty": "easy"})
+        questions = json.loads(response.content)["questions"]
+        self.assertEqual(len(questions), 1)
+        self.assertIn(questions[0]["text"], ("Q0", "Q1"))
+        self.assertEqual(len(json.loads(self.client.get(self.url, {"count": 50}).content)["questions"]), 3)
+
+    def test_a_count_below_one_is_a_bad_request(self):
+        for count in ("-1", "0", "x"):
+            self.assertEqual(self.client.get(self.url, {"count": count}).status_code, 400)
+        with self.assertRaises(ValueError):
+            quiz.sample_questions(quiz.get_quiz(self.subtopic.id)[1], count=-1)
+
+
+# -------------------------------
+# user-008: whole-sheet quiz grading
+# -------------------------------
+class GradingTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+        self.subtopic = SubTopic.objects.create(category=Category.objects.create(name="Water"), name="Rain")
+        self.correct = {}
+        for number, difficulty in enumerate(("easy", "hard")):
+            question = QuizQuestion.objects.create(subtopic=self.subtopic, text=f"Q{number}", difficulty=difficulty)
+            self.correct[question.id] = QuizOption.objects.create(question=question, text="yes", is_correct=True).id
+            QuizOption.objects.create(question=question, text="no")
+        self.client.force_login(self.student)
+        self.url = reverse("grade_quiz", args=[self.subtopic.id])
+
+    def grade(self, **payload):
+        return self.client.post(self.url, json.dumps(payload), content_type="application/json")
+
+    def test_sheet_is_graded_and_recorded_once(self):
+        attempt_id = str(uuid.uuid4())
+        answers = {str(question_id): option_id for question_id, option_id in self.correct.items()}
+        first = json.loads(self.grade(id=attempt_id, answers=answers, time_taken=40).content)
+        self.assertEqual((first["score"], first["correct"], first["accuracy"]), (4, 2, 100.0))
+        retry = json.loads(self.grade(id=attempt_id, answers=answers, time_taken=40).content)
+        self.assertEqual(retry["attempt_id"], first["attempt_id"])
+        self.assertEqual(GameAttempt.objects.filter(user=self.student).count(), 1)
+
+    def test_a_question_cannot_be_answered_twice_under_another_spelling(self):
+        question_id, option_id = next(iter(self.correct.items()))
+        answers = {str(question_id): option_id, f"0{question_id}": option_id, f"00{question_id}": option_id}
+        response = self.grade(answers=answers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("more than once", json.loads(response.content)["error"])
+        self.assertFalse(GameAttempt.objects.exists())
+
+    def test_time_taken_is_bounded(self):
+        answers = {str(question_id): option_id for question_id, option_id in self.correct.items()}
+        for time_taken in (-1, 10 ** 12, "soon"):
+            self.assertEqual(self.grade(answers=answers, time_taken=time_taken).status_code, 400)
+        body = '{"answers": {}, "time_taken": Infinity}'
+        self.assertEqual(self.client.post(self.url, body, content_type="application/json").status_code, 400)
+
+    def test_an_answer_key_corrected_by_another_process_is_used(self):
+        answers = {str(question_id): option_id for question_id, option_id in self.correct.items()}
+        self.assertEqual(json.loads(self.grade(answers=answers).content)["correct"], 2)
+        # Another process marks the other option of the first question correct
+        # instead; only the shared version tells this one about it.
+        question_id = next(iter(self.correct))
+        QuizOption.objects.filter(question_id=question_id).update(is_correct=~Q(id=self.correct[question_id]))
+        CacheVersion.objects.filter(name=f"quiz:{self.subtopic.id}").update(token=F("token") + 1)
+        self.assertEqual(json.loads(self.grade(answers=answers).content)["correct"], 1)
+
+
+# -------------------------------
+# user-009: task moderation queue
+# -------------------------------
+class ModerationTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.game = Game.objects.create(title="Plant a tree", description="", game_type="task",
+                                        topic=GameTopic.objects.create(name="Trees"))
+        self.submissions = [
+            TaskSubmission.objects.create(user=make_student(f"student{number}", self.institution), game=self.game,
+                                          submission="photo")
+            for number in range(3)
+        ]
+        outsider = User.objects.create(username="drifter", role="school_student")
+        TaskSubmission.objects.create(user=outsider, game=self.game, submission="photo")
+        self.teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=self.teacher, institution=self.institution, teacher_id="T1", designation="Teacher")
+
+    def queue(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("moderation_queue"), params)
+
+    def test_pages_walk_the_institutions_queue(self):
+        first = json.loads(self.queue(self.teacher, limit=2).content)
+        second = json.loads(self.queue(self.teacher, limit=2, cursor=first["next_cursor"]).content)
+        seen = [row["id"] for row in first["results"] + second["results"]]
+        self.assertEqual(seen, [submission.id for submission in self.submissions])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_a_teacher_without_an_institution_sees_nothing(self):
+        teacher = User.objects.create(username="newbie", role="school_teacher")
+        self.assertEqual(json.loads(self.queue(teacher).content)["results"], [])
+        self.client.post(reverse("moderation_bulk"), json.dumps({"ids": [s.id for s in self.submissions],
+                                                                 "action": "approve"}),
+                         content_type="application/json")
+        self.assertFalse(TaskSubmission.objects.exclude(status="pending").exists())
+
+    def test_bulk_approval_awards_points_once(self):
+        self.client.force_login(self.teacher)
+        payload = json.dumps({"ids": [submission.id for submission in self.submissions], "action": "approve"})
+        for _ in range(2):
+            response = self.client.post(reverse("moderation_bulk"), payload, content_type="application/json")
+        self.assertEqual(json.loads(response.content), {"updated": 0, "skipped": 3})
+        student = self.submissions[0].user
+        self.assertEqual(UserPointBalance.points_for(student.id), settings.TASK_APPROVAL_POINTS)
+        self.assertEqual(self.queue(self.teacher).json()["results"], [])
+
+    def test_students_are_turned_away(self):
+        self.assertEqual(self.queue(self.submissions[0].user).status_code, 403)
+
+
+# -------------------------------
+# user-010: database-backed background jobs
+# -------------------------------
+@jobs.job("tests.transaction_depth")
+def transaction_depth(seen):
+    seen.append(len(connection.atomic_blocks))
+
+
+@jobs.job("tests.fail")
+def always_fail():
+    raise RuntimeError("boom")
+
+
+class BackgroundJobTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.students = [make_student(name, self.institution) for name in ("asha", "ben")]
+
+    def drain(self):
+        for claimed_job in jobs.claim("test-worker", limit=100):
+            jobs.run_claimed(claimed_job)
+
+    def test_standings_follow_points_without_a_worker_on_a_local_cache(self):
+        leaderboard.standings(self.institution.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            EcoPoint.objects.create(user=self.students[1], points=5)
+        self.assertEqual(leaderboard.top(self.institution.id)[0]["user__username"], "ben")
+        self.assertTrue(BackgroundJob.objects.filter(name="points.changed", status="queued").exists())
+
+    def test_on_a_shared_cache_the_worker_moves_the_standings(self):
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                              "LOCATION": tempfile.mkdtemp()}}
+        with override_settings(CACHES=shared):
+            self.assertTrue(leaderboard.shared_cache())
+            EcoPoint.objects.create(user=self.students[0], points=3)
+            leaderboard.standings(self.institution.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                EcoPoint.objects.create(user=self.students[1], points=5)
+            self.assertEqual(leaderboard.top(self.institution.id)[0]["user__username"], "asha")
+            self.drain()
+            self.assertEqual(leaderboard.top(self.institution.id)[0]["user__username"], "ben")
+
+    def test_jobs_run_outside_a_transaction_of_their_own(self):
+        seen = []
+        jobs.enqueue("tests.transaction_depth", seen=[])
+        claimed_job = jobs.claim("test-worker")[0]
+        claimed_job.payload = {"seen": seen}
+        depth = len(connection.atomic_blocks)
+        self.assertTrue(jobs.run_claimed(claimed_job))
+        self.assertEqual(seen, [depth])
+
+    def test_failures_back_off_and_give_up_after_max_attempts(self):
+        queued = jobs.enqueue("tests.fail", max_attempts=2)
+        self.drain()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ("queued", 1))
+        BackgroundJob.objects.filter(pk=queued.pk).update(run_after=now())
+        self.drain()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "failed")
+        self.assertIn("boom", queued.last_error)
+
+    def test_stale_jobs_are_judged_by_heartbeat_and_attempts(self):
+        old = now() - timedelta(seconds=jobs.JOB_STALE_SECONDS + 60)
+        running = {"name": "tests.fail", "status": "running", "locked_at": old}
+        dead = BackgroundJob.objects.create(heartbeat_at=old, attempts=1, max_attempts=3, **running)
+        exhausted = BackgroundJob.objects.create(heartbeat_at=old, attempts=3, max_attempts=3, **running)
+        long_running = BackgroundJob.objects.create(heartbeat_at=now(), attempts=1, **running)
+        self.assertEqual(jobs.requeue_stale(), (1, 1))
+        statuses = dict(BackgroundJob.objects.values_list("pk", "status"))
+        self.assertEqual([statuses[dead.pk], statuses[exhausted.pk], statuses[long_running.pk]],
+                         ["queued", "failed", "running"])
+
+
+# -------------------------------
+# user-011: badge rules
+# -------------------------------
+class BadgeTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+        self.topic = GameTopic.objects.create(name="Water Conservation")
+        self.game = Game.objects.create(title="Splash", description="", game_type="quiz", topic=self.topic)
+
+    def badge(self, name, criteria):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Badge.objects.create(name=name, description="", unlock_criteria=criteria)
+
+    def drain(self):
+        for claimed_job in jobs.claim("test-worker", limit=100):
+            jobs.run_claimed(claimed_job)
+
+    def owned(self):
+        return set(UserBadge.objects.filter(user=self.student).values_list("badge__name", flat=True))
+
+    def test_criteria_are_parsed(self):
+        self.assertEqual(badges.parse_criteria("streak >= 7 AND attempts in topic Water Conservation > 2"),
+                         [("streak", None, ">=", 7), ("attempts", "Water Conservation", ">", 2)])
+        for text in ("points >= lots", "karma >= 1", "points in topic Water >= 1"):
+            with self.assertRaises(badges.RuleError):
+                badges.parse_criteria(text)
+
+    def test_badges_unlock_from_point_and_attempt_events(self):
+        self.badge("Saver", "points >= 10")
+        self.badge("Splasher", "attempts in topic water conservation >= 2")
+        self.badge("Broken", "karma >= 1")
+        EcoPoint.objects.create(user=self.student, points=6)
+        self.drain()
+        self.assertEqual(self.owned(), set())
+        EcoPoint.objects.create(user=self.student, points=4)
+        for _ in range(2):
+            GameAttempt.objects.create(user=self.student, game=self.game, score=1)
+        self.drain()
+        self.assertEqual(self.owned(), {"Saver", "Splasher"})
+
+    def test_editing_a_badge_recompiles_the_rules(self):
+        badge = self.badge("Saver", "points >= 10")
+        self.assertEqual(badges.compiled_rules()[0][1][0][3], 10)
+        badge.unlock_criteria = "points >= 1"
+        with self.captureOnCommitCallbacks(execute=True):
+            badge.save()
+        self.assertEqual(badges.compiled_rules()[0][1][0][3], 1)
+
+    def test_an_edit_made_by_another_process_is_recompiled(self):
+        self.badge("Saver", "points >= 10")
+        self.assertEqual(badges.compiled_rules()[0][1][0][3], 10)
+        # The admin of a web process saved the badge: this process's cache and
+        # compiled copy are untouched, only the shared version moves.
+        Badge.objects.update(unlock_criteria="points >= 1")
+        CacheVersion.objects.filter(name=badges.VERSION_NAME).update(token=F("token") + 1)
+        self.assertEqual(badges.compiled_rules()[0][1][0][3], 1)
+        EcoPoint.objects.create(user=self.student, points=1)
+        self.drain()
+        self.assertEqual(self.owned(), {"Saver"})
+
+    def test_backfill_awards_existing_data(self):
+        self.badge("Player", "attempts >= 1")
+        GameAttempt.objects.create(user=self.student, game=self.game, score=1)
+        BackgroundJob.objects.all().delete()
+        call_command("backfill_badges", stdout=StringIO())
+        call_command("backfill_badges", stdout=StringIO())
+        self.assertEqual(UserBadge.objects.filter(user=self.student).count(), 1)
+
+
+# -------------------------------
+# user-012: login calendar and streaks
+# -------------------------------
+class LoginCalendarTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student("asha", make_institution())
+
+    def test_streaks_follow_consecutive_days(self):
+        start = date(2026, 3, 1)
+        for offset in (0, 1, 2, 4, 5):
+            self.assertTrue(logins.record_login(self.student.id, start + timedelta(days=offset)))
+        self.assertEqual(logins.streaks(self.student.id, start + timedelta(days=5)), (2, 3))
+        self.assertEqual(logins.streaks(self.student.id, start + timedelta(days=7)), (0, 3))
+        self.assertEqual(logins.active_days_in_month(self.student.id, 2026, 3), 5)
+        self.assertTrue(logins.was_active(self.student.id, start + timedelta(days=4)))
+        self.assertFalse(logins.was_active(self.student.id, start + timedelta(days=3)))
+
+    def test_repeat_logins_read_the_calendar_without_writing(self):
+        day = date(2026, 3, 1)
+        logins.record_login(self.student.id, day)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(logins.record_login(self.student.id, day))
+            self.assertTrue(logins.record_login(self.student.id, day + timedelta(days=1)))
+        statements = [query["sql"].split()[0].upper() for query in queries.captured_queries]
+        self.assertNotIn("INSERT", statements)
+
+    def test_a_new_year_starts_a_new_calendar_row(self):
+        logins.record_login(self.student.id, date(2025, 12, 31))
+        logins.record_login(self.student.id, date(2026, 1, 1))
+        self.assertEqual(logins.streaks(self.student.id, date(2026, 1, 1)), (2, 2))
+        self.assertEqual(sorted(self.student.login_calendars.values_list("year", flat=True)), [2025, 2026])
+
+
+# -------------------------------
+# user-013: analytics rollups
+# -------------------------------
+class RollupTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.student = make_student("asha", self.institution)
+
+    def points(self):
+        return sum(DailyInstitutionRollup.objects.filter(institution=self.institution).values_list("points", flat=True))
+
+    def test_refresh_folds_new_rows_once(self):
+        EcoPoint.objects.create(user=self.student, points=5)
+        GameAttempt.objects.create(user=self.student, game=Game.objects.create(title="Splash", description="",
+                                                                                 game_type="quiz"), score=1)
+        self.assertEqual(rollups.refresh(), {"ecopoint": 1, "gameattempt": 1})
+        self.assertEqual(rollups.refresh(), {})
+        region = DailyRegionRollup.objects.get(state="Maharashtra", city="Pune")
+        self.assertEqual((region.points, region.attempts), (5, 1))
+
+    def test_rows_committed_out_of_id_order_are_folded_later(self):
+        EcoPoint.objects.create(user=self.student, points=1)
+        late_id = EcoPoint.objects.create(user=self.student, points=10).id
+        EcoPoint.objects.create(user=self.student, points=100)
+        # As if the middle row had not committed yet when refresh ran.
+        EcoPoint.objects.filter(id=late_id).delete()
+        rollups.refresh()
+        self.assertEqual(self.points(), 101)
+        self.assertEqual(list(RollupWatermark.objects.get(source="ecopoint").gaps), [str(late_id)])
+        EcoPoint.objects.create(id=late_id, user=self.student, points=10)
+        self.assertEqual(rollups.refresh(), {"ecopoint": 1})
+        self.assertEqual(self.points(), 111)
+        self.assertEqual(RollupWatermark.objects.get(source="ecopoint").gaps, {})
+
+    def test_gaps_that_never_fill_expire_and_rebuild_skips_open_gaps(self):
+        EcoPoint.objects.create(user=self.student, points=1)
+        gap_id = EcoPoint.objects.create(user=self.student, points=10).id
+        EcoPoint.objects.create(user=self.student, points=100)
+        EcoPoint.objects.filter(id=gap_id).delete()
+        rollups.refresh()
+        # The late row commits, then the nightly rebuild runs before the next refresh.
+        EcoPoint.objects.create(id=gap_id, user=self.student, points=10)
+        today = localdate()
+        rollups.rebuild(today, today)
+        self.assertEqual(self.points(), 101)
+        rollups.refresh()
+        self.assertEqual(self.points(), 111)
+
+        # A rolled-back insert: the gap is dropped once it is older than ROLLUP_GAP_SECONDS.
+        RollupWatermark.objects.filter(source="ecopoint").update(gaps={"999": 0})
+        rollups.refresh()
+        self.assertEqual(RollupWatermark.objects.get(source="ecopoint").gaps, {})
+
+    def test_version_lives_in_the_database(self):
+        token = rollups.version()
+        cache.clear()
+        self.assertEqual(rollups.version(), token)
+        EcoPoint.objects.create(user=self.student, points=5)
+        rollups.refresh()
+        self.assertGreater(rollups.version(), token)
+
+    def test_dashboard_etag_follows_the_version(self):
+        self.client.force_login(User.objects.create(username="ngo", role="ngo"))
+        etag = self.client.get(reverse("analytics_dashboard"))["ETag"]
+        cache.clear()
+        self.assertEqual(self.client.get(reverse("analytics_dashboard"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        rollups.touch()
+        self.assertEqual(self.client.get(reverse("analytics_dashboard"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# -------------------------------
+# user-014: teacher dashboard
+# -------------------------------
+class TeacherDashboardTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=self.teacher, institution=self.institution, teacher_id="T1", designation="Teacher")
+        self.student = make_student("asha", self.institution)
+        game = Game.objects.create(title="Plant a tree", description="", game_type="task")
+        TaskSubmission.objects.create(user=self.student, game=game, submission="photo")
+        approved = TaskSubmission.objects.create(user=self.student, game=game, submission="photo", status="approved",
+                                                 verified_at=now())
+        EcoPoint.objects.create(user=self.student, submission=approved, points=10)
+        self.client.force_login(self.teacher)
+
+    def test_home_sends_teachers_to_their_dashboard(self):
+        self.assertRedirects(self.client.get(reverse("home")), reverse("teacher_dashboard", args=[self.teacher.slug]))
+
+    def test_dashboard_shows_real_numbers_and_activity(self):
+        response = self.client.get(reverse("teacher_dashboard", args=[self.teacher.slug]))
+        self.assertEqual((response.context["pending_submissions"], response.context["approved_today"]), (1, 1))
+        activity = response.context["recent_activity"]
+        self.assertEqual([event["type"] for event in activity], ["points", "task", "task"])
+        self.assertEqual(activity[0]["action"], "earned 10 EcoPoints")
+        self.assertContains(response, 'id="recent-activity-data"')
+        self.assertNotContains(response, "Alice Johnson")
+
+    def test_a_teacher_without_an_institution_gets_an_empty_dashboard(self):
+        teacher = User.objects.create(username="newbie", role="school_teacher")
+        self.client.force_login(teacher)
+        response = self.client.get(reverse("teacher_dashboard", args=[teacher.slug]))
+        self.assertEqual(response.context["recent_activity"], [])
+        self.assertEqual(response.context["pending_submissions"], 0)
+
+    def test_activity_older_than_the_window_is_left_out(self):
+        old = now() - timedelta(days=classroom.RECENT_ACTIVITY_DAYS + 1)
+        EcoPoint.objects.update(awarded_at=old)
+        TaskSubmission.objects.update(submitted_at=old)
+        self.assertEqual(classroom.recent_activity(self.institution), [])
+
+    def test_content_comes_from_the_database(self):
+        Game.objects.exclude(game_type="task").delete()
+        Game.objects.update(game_type="real_world_task", difficulty="easy")
+        badge = Badge.objects.create(name="Planter", description="Plant a tree", unlock_criteria="tasks >= 1")
+        UserBadge.objects.create(user=self.student, badge=badge)
+        subtopic = SubTopic.objects.create(category=Category.objects.create(name="Water"), name="Rain")
+        QuizQuestion.objects.create(subtopic=subtopic, text="Q", difficulty="hard")
+
+        data = json.loads(self.client.get(reverse("teacher_content")).content)
+        self.assertEqual([(task["title"], task["pending"], task["approved"]) for task in data["tasks"]],
+                         [("Plant a tree", 1, 1)])
+        self.assertEqual([(badge["name"], badge["earned_by"]) for badge in data["badges"]], [("Planter", 1)])
+        self.assertIn({"id": subtopic.id, "name": "Rain", "category": "Water", "questions": {"hard": 1}}, data["quizzes"])
+        self.assertEqual(data["stats"]["total_eco_points"], 10)
+        page = self.client.get(reverse("teacher_dashboard", args=[self.teacher.slug]))
+        self.assertNotContains(page, "Seedling Starter")
+        self.assertNotContains(page, "trashSorter")
+
+
+# -------------------------------
+# user-015: class performance analytics
+# -------------------------------
+class ClassAnalyticsTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.asha = make_student("asha", self.institution, grade=8)
+        self.ben = make_student("ben", self.institution, grade=9)
+        water, energy = GameTopic.objects.create(name="Water"), GameTopic.objects.create(name="Energy")
+        self.water = Game.objects.create(title="Splash", description="", game_type="quiz", topic=water)
+        self.energy = Game.objects.create(title="Grid", description="", game_type="quiz", topic=energy)
+        # asha: 40 last week, 80 this week; ben: 60 this week only. Energy is the weak topic.
+        self.attempt(self.asha, self.water, 40, days_ago=10)
+        self.attempt(self.asha, self.water, 80, days_ago=1)
+        self.attempt(self.asha, self.energy, 20, days_ago=2, time_taken=None)
+        self.attempt(self.ben, self.water, 60, days_ago=3)
+        self.attempt(self.ben, self.water, 99, days_ago=40)  # outside every window used here
+        self.teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=self.teacher, institution=self.institution, teacher_id="T1", designation="Teacher")
+
+    def attempt(self, user, game, score, days_ago, time_taken=30):
+        attempt = GameAttempt.objects.create(user=user, game=game, score=score, accuracy=score, time_taken=time_taken)
+        GameAttempt.objects.filter(pk=attempt.pk).update(attempt_date=now() - timedelta(days=days_ago, hours=1))
+
+    def test_statistics_for_the_window(self):
+        stats = analytics.class_statistics(self.institution, window=30)
+        self.assertEqual((stats["attempts"], stats["students"]), (4, 2))
+        self.assertEqual(stats["score"]["percentiles"]["50"], 50.0)
+        self.assertEqual(stats["time_taken"]["count"], 3)
+        self.assertEqual(sum(stats["score"]["histogram"]["counts"]), 4)
+        self.assertEqual(stats["topics"]["topics"], ["Energy", "Water"])
+        week = stats["week_over_week"]
+        self.assertEqual(week["score"]["last_week"], 40.0)
+        self.assertEqual(week["students"], {"active_both_weeks": 1, "improved": 1, "median_change": 10.0})
+
+    def test_class_filter_and_cache(self):
+        stats = analytics.class_statistics(self.institution, class_value="9", window=7)
+        self.assertEqual((stats["attempts"], stats["students"]), (1, 1))
+        GameAttempt.objects.all().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(analytics.class_statistics(self.institution, class_value="9", window=7), stats)
+
+    def test_view_checks_role_and_parameters(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(reverse("teacher_analytics"), {"window": 5}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("teacher_analytics"), {"class": "eight"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("teacher_analytics")).json()["attempts"], 4)
+        self.client.force_login(self.asha)
+        self.assertEqual(self.client.get(reverse("teacher_analytics")).status_code, 403)
+
+
+# -------------------------------
+# user-016: catalog cache
+# -------------------------------
+class CatalogTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juniors = Category.objects.create(name="Water", grade_min=1, grade_max=5)
+            self.seniors = Category.objects.create(name="Climate", grade_min=9)
+            self.everyone = Category.objects.create(name="Waste")
+            SubTopic.objects.create(category=self.juniors, name="Rain")
+
+    def names(self, grade=None):
+        return [category["name"] for category in catalog.categories(grade)]
+
+    def test_grade_ranges_filter_the_tree(self):
+        self.assertEqual(self.names(), ["Water", "Climate", "Waste"])
+        self.assertEqual(self.names(3), ["Water", "Waste"])
+        self.assertEqual(self.names(12), ["Climate", "Waste"])
+        self.assertEqual([row["name"] for row in catalog.category(self.juniors.id)["subtopics"]], ["Rain"])
+        self.assertIsNone(catalog.category("nope"))
+
+    def test_warm_tree_costs_one_version_read_per_request(self):
+        catalog.categories()
+        with versions.scope(), self.assertNumQueries(1):
+            self.names(3)
+            catalog.category(self.juniors.id)
+
+    def test_an_edit_made_by_another_process_rebuilds_the_tree(self):
+        self.names()
+        Category.objects.filter(id=self.everyone.id).update(name="Recycling")
+        CacheVersion.objects.filter(name=catalog.VERSION_NAME).update(token=F("token") + 1)
+        self.assertEqual(self.names(), ["Water", "Climate", "Recycling"])
+
+    def test_edits_invalidate_the_tree(self):
+        self.names(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juniors.grade_max = 2
+            self.juniors.save()
+            SubTopic.objects.create(category=self.everyone, name="Compost")
+        self.assertEqual(self.names(3), ["Waste"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seniors.delete()
+        self.assertEqual(self.names(), ["Water", "Waste"])
+        self.assertEqual(len(catalog.category(self.everyone.id)["subtopics"]), 1)
+
+    def test_explore_subtopics_404s_for_unknown_categories(self):
+        self.client.force_login(make_student("asha", make_institution()))
+        self.assertEqual(self.client.get(reverse("explore_subtopics", args=[self.juniors.id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse("explore_subtopics", args=[9999])).status_code, 404)
+
+
+# -------------------------------
+# user-017: grade-aware recommendations
+# -------------------------------
+class RecommendationTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.asha = make_student("asha", make_institution())
+        water, energy = GameTopic.objects.create(name="Water"), GameTopic.objects.create(name="Energy")
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.all().delete()  # the bundled games from the migrations
+            juniors = Category.objects.create(name="Rivers", grade_min=1, grade_max=5)
+            SubTopic.objects.create(category=juniors, name="Rain")
+            self.plastics = SubTopic.objects.create(category=Category.objects.create(name="Waste"), name="Plastics")
+            self.games = {
+                title: Game.objects.create(title=title, description="", game_type="quiz", topic=topic,
+                                           difficulty=difficulty, grade_min=grade_min, grade_max=grade_max)
+                for title, topic, difficulty, grade_min, grade_max in [
+                    ("Puddles", water, "easy", 1, 5),
+                    ("Splash", water, "easy", None, None),
+                    ("Leaks", water, "medium", 6, None),
+                    ("Solar", energy, "easy", None, 10),
+                    ("Grid", energy, "hard", 9, None),
+                ]
+            }
+
+    def ranked(self, grade=8):
+        return {game["title"]: game["reason"] for game in recommendations.for_student(self.asha.id, grade)["games"]}
+
+    def titles(self, grade=8):
+        return list(self.ranked(grade))
+
+    def play(self, title, accuracy):
+        GameAttempt.objects.create(user=self.asha, game=self.games[title], score=accuracy, accuracy=accuracy)
+
+    def test_grade_ranges_filter_candidates(self):
+        self.assertEqual(sorted(self.titles(3)), ["Puddles", "Solar", "Splash"])
+        self.assertEqual(sorted(self.titles(8)), ["Leaks", "Solar", "Splash"])
+        self.assertEqual(sorted(self.titles(None)), sorted(self.games))
+        subtopics = recommendations.for_student(self.asha.id, 3)["subtopics"]
+        self.assertIn("Rain", [subtopic["name"] for subtopic in subtopics])
+        subtopics = recommendations.for_student(self.asha.id, 8)["subtopics"]
+        self.assertIn("Plastics", [subtopic["name"] for subtopic in subtopics])
+        self.assertNotIn("Rain", [subtopic["name"] for subtopic in subtopics])
+
+    def test_weak_topics_come_first_and_played_games_drop_out(self):
+        self.play("Splash", 40)
+        self.assertEqual(recommendations.for_student(self.asha.id, 8)["target_difficulty"], "easy")
+        # The untried easy game fits the target best; the weak topic's medium game follows.
+        self.assertEqual(self.ranked(), {"Solar": "Next step: easy", "Leaks": "Practice a weak topic (40% accuracy)"})
+        self.assertEqual(self.titles(), ["Solar", "Leaks"])
+
+    def test_mastering_a_difficulty_moves_the_target_up(self):
+        self.play("Splash", 90)
+        self.play("Solar", 95)
+        self.assertEqual(recommendations.for_student(self.asha.id, 8)["target_difficulty"], "medium")
+        self.assertEqual(self.ranked(), {"Leaks": "Next step: medium"})
+
+    def test_cached_until_the_next_attempt_or_game_edit(self):
+        self.titles()
+        with self.assertNumQueries(3):  # the attempt counter and the catalog and games versions
+            self.titles()
+        self.play("Splash", 40)
+        self.assertNotIn("Splash", self.titles())
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.create(title="Wells", description="", game_type="quiz", difficulty="easy")
+        self.assertIn("Wells", self.titles())
+
+    def test_a_game_added_by_another_process_is_recommended(self):
+        self.titles()
+        Game.objects.bulk_create([Game(title="Wells", description="", game_type="quiz", difficulty="easy")])
+        CacheVersion.objects.filter(name=recommendations.GAMES_VERSION_NAME).update(token=F("token") + 1)
+        self.assertIn("Wells", self.titles())
+
+
+# -------------------------------
+# user-018: HTTP cache policy and dashboard fragments
+# -------------------------------
+class HttpCacheTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.asha = make_student("asha", make_institution())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name="Water")
+
+    def test_public_home_is_revalidated_with_its_etag(self):
+        response = self.client.get(reverse("home"))
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=300", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+        repeat = self.client.get(reverse("home"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_signed_in_pages_are_never_stored(self):
+        self.client.force_login(self.asha)
+        home = self.client.get(reverse("home"))
+        self.assertEqual(home.status_code, 302)
+        self.assertFalse(home.has_header("ETag"))
+        self.assertIn("no-store", home["Cache-Control"])
+        dashboard = self.client.get(reverse("student_dashboard", args=[self.asha.slug]))
+        self.assertIn("no-store", dashboard["Cache-Control"])
+
+    def test_subtopics_page_revalidates_until_the_catalog_changes(self):
+        self.client.force_login(self.asha)
+        url = reverse("explore_subtopics", args=[self.category.id])
+        response = self.client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("no-store", response["Cache-Control"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            SubTopic.objects.create(category=self.category, name="Rain")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_dashboard_fragments_are_keyed_by_data_version(self):
+        self.client.force_login(self.asha)
+        url = reverse("student_dashboard", args=[self.asha.slug])
+
+        def fragment():
+            return cache.get(make_template_fragment_key("student_categories", [catalog.catalog_version(), 8]))
+
+        self.assertIsNone(fragment())
+        self.client.get(url)
+        self.assertIn("Water", fragment())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Oceans"
+            self.category.save()
+        self.assertIsNone(fragment())
+        self.assertContains(self.client.get(url), "Oceans")
+        self.assertIn("Oceans", fragment())
+
+
+# -------------------------------
+# user-019: hashed, precompressed static files
+# -------------------------------
+STATIC_ROOT = tempfile.mkdtemp(prefix="green-guardian-static-")
+GAME_STORAGES = {**TEST_STORAGES, "staticfiles": {"BACKEND": "gamification.assets.GameStaticFilesStorage"}}
+
+
+@override_settings(STORAGES=GAME_STORAGES, STATIC_ROOT=STATIC_ROOT)
+class StaticPipelineTests(CacheTestCase):
+    GAME = "games/Trash_Catcher_v1/Trash Catcher.js"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(shutil.rmtree, STATIC_ROOT, ignore_errors=True)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def get(self, name, **headers):
+        return self.client.get(settings.STATIC_URL + quote(name), **headers)
+
+    def test_game_folders_are_hashed_as_a_unit(self):
+        script = staticfiles_storage.stored_name(self.GAME)
+        package = staticfiles_storage.stored_name("games/Trash_Catcher_v1/Trash Catcher.pck")
+        self.assertRegex(script, r"^games/Trash_Catcher_v1\.[0-9a-f]{12}/Trash Catcher\.js$")
+        # Same folder, original file names: the game's relative loads keep working.
+        self.assertEqual(os.path.dirname(script), os.path.dirname(package))
+
+    def test_compressible_files_get_gzip_variants(self):
+        script = os.path.join(STATIC_ROOT, staticfiles_storage.stored_name(self.GAME))
+        with open(script, "rb") as original, open(script + ".gz", "rb") as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), original.read())
+        png = os.path.join(STATIC_ROOT, staticfiles_storage.stored_name("games/Trash_Catcher_v1/Trash Catcher.png"))
+        self.assertFalse(os.path.exists(png + ".gz"))
+
+    def test_hashed_names_are_immutable(self):
+        response = self.get(staticfiles_storage.stored_name(self.GAME), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Cache-Control"], f"public, max-age={assets.STATIC_MAX_AGE}, immutable")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        original = self.get(self.GAME)
+        self.assertEqual(original["Cache-Control"], "public, no-cache")
+        self.assertFalse(original.has_header("Content-Encoding"))
+
+    def test_accept_encoding_tokens_and_q_values_are_honoured(self):
+        name = staticfiles_storage.stored_name(self.GAME)
+        for header, encoding in [("gzip;q=0, deflate", None), ("x-gzip", None), ("GZIP ; q=0.5", "gzip"),
+                                 ("*", "gzip"), ("*;q=0", None), ("gzip;q=0, *", None), ("identity", None)]:
+            response = self.get(name, HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response.get("Content-Encoding"), encoding, header)
+
+    def test_godot_exports_get_their_mime_types(self):
+        package = self.get(staticfiles_storage.stored_name("games/Trash_Catcher_v1/Trash Catcher.pck"))
+        self.assertEqual(package["Content-Type"], "application/octet-stream")
+        with open(os.path.join(STATIC_ROOT, "engine.wasm"), "wb") as wasm:
+            wasm.write(b"\0asm")
+        self.assertEqual(self.get("engine.wasm")["Content-Type"], "application/wasm")
+        self.assertEqual(self.get("games/missing.wasm").status_code, 404)
+
+
+# -------------------------------
+# user-020: game registry
+# -------------------------------
+class GameRegistryTests(CacheTestCase):
+    GODOT = "games/Trash_Catcher_v1/Trash Catcher.html"
+
+    def drain(self):
+        for claimed_job in jobs.claim("test-worker", limit=100):
+            jobs.run_claimed(claimed_job)
+
+    def test_migrate_registered_the_bundled_games(self):
+        godot = GameAsset.objects.select_related("game").get(entry=self.GODOT)
+        self.assertEqual(godot.source, "static")
+        self.assertEqual(godot.game.entry_file, self.GODOT)
+        self.assertGreater(godot.size, 200_000)  # the whole export, not just its page
+        self.assertTrue(GameAsset.objects.filter(entry="games/Splash Saver.HTML").exists())
+        self.assertEqual(registry.scan(), {"created": 0, "updated": 0, "removed": 0, "games_created": 0})
+
+    def test_scan_drops_games_that_are_gone(self):
+        GameAsset.objects.create(entry="games/Old.html", source="static", title="Old", content_hash="0")
+        self.assertEqual(registry.scan(uploads=False)["removed"], 1)
+        self.assertFalse(GameAsset.objects.filter(entry="games/Old.html").exists())
+
+    def test_uploaded_builds_are_scanned_in_the_background(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            upload = SimpleUploadedFile("river.pck", b"GDPC" + bytes(64))
+            category = Category.objects.create(name="Water", godot_game_file=upload)
+            self.drain()
+            asset = GameAsset.objects.get(category=category)
+            self.assertEqual((asset.source, asset.title, asset.size), ("upload", "Water", 68))
+            category.delete()
+            self.drain()
+        self.assertFalse(GameAsset.objects.filter(source="upload").exists())
+
+    def test_a_scan_run_by_another_process_is_listed(self):
+        registry.manifest()
+        # `manage.py scan_games` recorded a rebuilt export in its own process.
+        GameAsset.objects.filter(entry=self.GODOT).update(size=1, content_hash="rebuilt")
+        CacheVersion.objects.filter(name=registry.VERSION_NAME).update(token=F("token") + 1)
+        hashes = {game["entry"]: game["hash"] for game in registry.manifest()["games"]}
+        self.assertEqual(hashes[self.GODOT], "rebuilt")
+
+    def test_dashboard_lists_the_manifest_without_touching_disk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registry.scan()
+        titles = [game["title"] for game in registry.manifest()["games"]]
+        self.assertIn(GameAsset.objects.get(entry=self.GODOT).game.title, titles)
+        with versions.scope(), self.assertNumQueries(2):  # the registry and games versions
+            registry.manifest()
+        asha = make_student("asha", make_institution())
+        self.client.force_login(asha)
+        response = self.client.get(reverse("student_dashboard", args=[asha.slug]))
+        for title in titles:
+            self.assertContains(response, title)
+
+
+# -------------------------------
+# user-021: bulk roster import
+# -------------------------------
+class RosterUploadTests(CacheTestCase):
+    ROSTER = b"username,role,password,grade,enrollment_no\nravi,school_student,Secret-pass1,7,E1\n"
+
+    def setUp(self):
+        super().setUp()
+        self.institution = make_institution()
+        self.teacher = User.objects.create(username="tara", role="school_teacher")
+        TeacherProfile.objects.create(user=self.teacher, institution=self.institution, teacher_id="T1", designation="Teacher")
+        self.media, self.private = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.private, ignore_errors=True)
+        directories = override_settings(MEDIA_ROOT=self.media, ROSTER_UPLOAD_DIR=self.private)
+        directories.enable()
+        self.addCleanup(directories.disable)
+
+    def upload(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse("roster_upload"), {"roster": SimpleUploadedFile("class7.csv", self.ROSTER)})
+        self.assertEqual(response.status_code, 202)
+        return BackgroundJob.objects.get(id=response.json()["job"])
+
+    def files(self, root):
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    def test_upload_is_kept_private_and_deleted_after_the_import(self):
+        queued = self.upload()
+        self.assertEqual(self.files(self.media), [])
+        stored = os.path.join(self.private, queued.payload["upload"])
+        self.assertEqual(os.stat(stored).st_mode & 0o777, 0o600)
+        for claimed_job in jobs.claim("test-worker", limit=10):
+            jobs.run_claimed(claimed_job)
+        self.assertTrue(StudentProfile.objects.filter(user__username="ravi", institution=self.institution).exists())
+        self.assertEqual(self.files(self.private), [queued.payload["report"]])
+        report = self.client.get(reverse("roster_report", args=[queued.id]))
+        self.assertIn(b"ravi,created", b"".join(report.streaming_content))
+
+    def test_failed_import_still_deletes_the_upload(self):
+        queued = self.upload()
+        self.institution.delete()
+        for claimed_job in jobs.claim("test-worker", limit=10):
+            jobs.run_claimed(claimed_job)
+        self.assertEqual(self.files(self.private), [])
+        self.assertEqual(BackgroundJob.objects.get(id=queued.id).status, "failed")
+
+    def test_purge_removes_rosters_whose_job_will_not_run(self):
+        queued = self.upload()
+        stored = os.path.join(self.private, queued.payload["upload"])
+        self.assertEqual(roster.purge_uploads(grace=0), 0)  # still queued
+        BackgroundJob.objects.filter(id=queued.id).update(status="failed")
+        self.assertEqual(roster.purge_uploads(), 0)  # within the grace period
+        self.assertEqual(roster.purge_uploads(grace=0), 1)
+        self.assertFalse(os.path.exists(stored))
+
+
+# -------------------------------
+# user-022: institution search
+# -------------------------------
+class InstitutionSearchTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marys = make_institution("St. Mary's Convent School", city="Nagpur")
+            make_institution("Saraswati Vidyalaya", city="Nashik")
+            make_institution("Nagpur Institute of Technology", city="Nagpur", type="College")
+
+    def names(self, query, **filters):
+        return [row["name"] for row in institutions.search(query, **filters)["results"]]
+
+    def test_prefix_typo_and_filters(self):
+        self.assertEqual(self.names("st marys")[0], "St. Mary's Convent School")
+        self.assertIn("Saraswati Vidyalaya", self.names("sarasvati"))
+        self.assertIn("Saraswati Vidyalaya", self.names("vidy"))
+        self.assertEqual(self.names("nagpur", kind="College"), ["Nagpur Institute of Technology"])
+        self.assertEqual(self.names("nagpur", city="Nashik"), [])
+
+    def test_pages(self):
+        first = institutions.search("nagpur", limit=1)
+        second = institutions.search("nagpur", page=2, limit=1)
+        self.assertTrue(first["has_next"])
+        self.assertNotEqual(first["results"], second["results"])
+
+    def test_index_follows_adds_and_edits(self):
+        self.names("mary")
+        with self.captureOnCommitCallbacks(execute=True):
+            make_institution("Marigold Public School", city="Pune")
+        self.assertIn("Marigold Public School", self.names("marigold"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marys.name = "Holy Cross School"
+            self.marys.save()
+        self.assertNotIn("St. Mary's Convent School", self.names("mary"))
+        self.assertEqual(institutions.get(self.marys.id)["name"], "Holy Cross School")
+
+    def test_near_duplicates_are_found(self):
+        self.assertEqual(institutions.find_duplicate("St Marys  convent school", "nagpur", "MAHARASHTRA"), self.marys.id)
+        self.assertIsNone(institutions.find_duplicate("St Marys Convent School", "Pune", "Maharashtra"))
+
+    def test_endpoint_and_signup_page(self):
+        response = self.client.get(reverse("institution_search"), {"q": "saras"})
+        self.assertEqual(response.json()["results"][0]["name"], "Saraswati Vidyalaya")
+        self.assertEqual(self.client.get(reverse("institution_search"), {"page": "two"}).status_code, 400)
+        self.assertNotContains(self.client.get(reverse("signup")), "Saraswati Vidyalaya")
+
+
+# -------------------------------
+# user-023: transactional signup
+# -------------------------------
+class SignupTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institution = make_institution()
+        institutions.get(self.institution.id)  # the search index validation reads, built once per process
+
+    def data(self, username="asha", **extra):
+        return {
+            "role": "school_student", "username": username, "email": f"{username}@example.com",
+            "password1": "Green-Guardian-2024", "password2": "Green-Guardian-2024",
+            "institution": str(self.institution.id), "enrollment_no": "E1", "grade": "8", **extra,
+        }
+
+    def test_user_and_profile_are_created_together(self):
+        with self.assertNumQueries(4):  # the user and profile inserts inside one (test-nested) transaction
+            user = accounts.register(self.data())
+        self.assertEqual(user.studentprofile.institution, self.institution)
+        self.assertTrue(user.check_password("Green-Guardian-2024"))
+
+    def test_taken_username_leaves_nothing_behind(self):
+        accounts.register(self.data())
+        with self.assertRaises(accounts.SignupError) as caught:
+            accounts.register(self.data("Asha".lower(), enrollment_no="E2"))
+        self.assertEqual(caught.exception.errors, {"username": ["Username already taken"]})
+        self.assertEqual((User.objects.count(), StudentProfile.objects.count()), (1, 1))
+
+    def test_invalid_signups_run_no_queries(self):
+        with self.assertNumQueries(0), self.assertRaises(accounts.SignupError) as caught:
+            accounts.register(self.data(password2="something-else", institution="9999"))
+        self.assertEqual(set(caught.exception.errors), {"password2", "institution"})
+
+    def test_other_school_is_created_once(self):
+        other = {"institution": "other", "other_school_city": "Nagpur", "other_school_state": "Maharashtra"}
+        with self.captureOnCommitCallbacks(execute=True):
+            first = accounts.register(self.data("asha", other_school_name="Riverside School", **other))
+        second = accounts.register(self.data("ben", other_school_name="riverside  school.", **other))
+        self.assertEqual(first.studentprofile.institution_id, second.studentprofile.institution_id)
+        self.assertEqual(Institution.objects.filter(city="Nagpur").count(), 1)
+
+    def test_signup_view(self):
+        response = self.client.post(reverse("signup"), self.data())
+        self.assertRedirects(response, reverse("login"), fetch_redirect_response=False)
+        response = self.client.post(reverse("signup"), self.data(enrollment_no="E2"))
+        self.assertContains(response, "Username already taken", status_code=400)
+
+
+# -------------------------------
+# user-024: password hashing
+# -------------------------------
+class PasswordHashingTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.asha = User.objects.create(username="asha", slug="asha", role="school_student",
+                                        password=make_password("Green-Guardian-2024"))
+
+    def fill_hashing_queue(self):
+        """Take every hashing slot, as a login storm would, until the test ends."""
+        taken = 0
+        while passwords._slots.acquire(blocking=False):
+            taken += 1
+        self.addCleanup(lambda: [passwords._slots.release() for _ in range(taken)])
+
+    def login(self, username="asha", password="Green-Guardian-2024", role="school_student"):
+        return authenticate(None, username=username, password=password, role=role)
+
+    def test_role_and_password_are_both_checked(self):
+        self.assertEqual(self.login(), self.asha)
+        self.assertIsNone(self.login(role="school_teacher"))
+        self.assertIsNone(self.login(password="wrong"))
+        self.assertIsNone(self.login(username="nobody"))
+
+    def test_failures_all_spend_a_hash(self):
+        # A failure that skipped the hash would come back before the full queue turned it away.
+        self.fill_hashing_queue()
+        for attempt in [{}, {"role": "school_teacher"}, {"username": "nobody"}, {"password": "wrong"}]:
+            with self.subTest(**attempt), self.assertRaises(passwords.HashingBusy):
+                self.login(**attempt)
+
+    def test_login_view_answers_busy_with_503(self):
+        self.fill_hashing_queue()
+        response = self.client.post(reverse("login"), {
+            "username": "asha", "password": "Green-Guardian-2024", "role": "school_student",
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_hashes_with_other_costs_need_a_rehash(self):
+        self.assertFalse(passwords.needs_rehash(self.asha.password))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertTrue(passwords.needs_rehash(self.asha.password))
+        self.assertEqual(passwords.hashers_for("argon2")[0], passwords.HASHERS["argon2"])
+        with self.assertRaises(ValueError):
+            passwords.hashers_for("md5")
+
+    @skipIf(argon2 is not None, "argon2-cffi is installed")
+    def test_argon2_without_the_package_refuses_to_start(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import django; django.setup()"],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "GreenG.settings", "PASSWORD_HASHING": "argon2"},
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("PASSWORD_HASHING=argon2 needs argon2-cffi", result.stderr)
+
+
+# -------------------------------
+# user-025: login throttling
+# -------------------------------
+class LoginThrottleTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.asha = make_student("asha", make_institution())
+        self.asha.set_password("Green-Guardian-2024")
+        self.asha.save()
+        self.ngo = User.objects.create(username="greenpeace", role="ngo")
+
+    def post(self, username, password="wrong", role="school_student", ip="10.0.0.1"):
+        return self.client.post(reverse("login"), {"username": username, "password": password, "role": role},
+                                REMOTE_ADDR=ip)
+
+    def test_limits_follow_the_accounts_role_not_the_form(self):
+        self.assertEqual(throttle.rates_for("asha")["ip"], (300, 60))
+        self.assertEqual(throttle.rates_for("greenpeace"), throttle.rates("ngo"))
+        self.assertEqual(throttle.rates_for("nobody"), throttle.STRICTEST_RATES)
+        self.assertEqual(throttle.STRICTEST_RATES, {"ip": (30, 60), "username": (10, 300)})
+
+    def test_posting_a_roomier_role_does_not_raise_the_ip_limit(self):
+        for number in range(30):
+            self.assertIsNone(throttle.check("10.0.0.2", f"guess{number}"))
+        self.assertIsNotNone(throttle.check("10.0.0.2", "guess-more"))
+        self.assertEqual(self.post("guess-more", ip="10.0.0.2").status_code, 429)
+        self.assertIsNone(throttle.check("10.0.0.3", "guess0"))  # another address is counted apart
+
+    def test_username_limit_and_reset_on_success(self):
+        for number in range(10):
+            self.assertEqual(self.post("asha", ip=f"10.0.1.{number}").status_code, 200)
+        rejected = self.post("asha", password="Green-Guardian-2024", ip="10.0.2.1")
+        self.assertEqual(rejected.status_code, 429)
+        self.assertGreater(int(rejected["Retry-After"]), 0)
+        throttle.succeeded(self.asha)
+        self.assertEqual(self.post("asha", password="Green-Guardian-2024", ip="10.0.2.1").status_code, 302)
+        self.assertEqual(throttle.stats(1)["totals"]["username"], 1)
+
+    def test_per_process_caches_are_refused(self):
+        throttle.ensure_shared(throttle.cache)
+        with self.assertRaisesMessage(ImproperlyConfigured, "LocMemCache"):
+            throttle.ensure_shared(caches["default"])
+        with override_settings(DEBUG=True):
+            throttle.ensure_shared(caches["default"])
@@ -0,0 +1,152 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import User
+
+
+# -------------------------------
+# Login throttling
+# -------------------------------
+# Every login attempt costs a password hash, so attempts are counted per
+# client IP and per username and the excess is turned away before
+# authenticate() runs. Counts are sliding windows approximated from two
+# fixed-window counters (this window's, plus last window's weighted by how
+# much of it still overlaps), kept in the LOGIN_THROTTLE_CACHE cache with
+# add()/incr(). That cache has to be shared by every worker, or each one
+# allows the full limit: a per-process cache (local memory, dummy) is refused
+# at import unless DEBUG is on. On Redis and Memcached incr() is atomic; on
+# the database cache two concurrent attempts can occasionally count as one.
+#
+# Limits come from the role of the account being logged in to, so students
+# behind one school's address can be given more room per IP than NGO
+# accounts. The role picked on the login form is the attacker's choice and
+# plays no part (looking the account up is one indexed query); unknown
+# usernames get the strictest limits of any role.
+# stats() reports allowed and rejected attempts per minute for monitoring.
+
+DEFAULT_RATES = {"ip": (30, 60), "username": (10, 300)}  # (attempts, window seconds)
+LOGIN_THROTTLE_RATES = getattr(settings, "LOGIN_THROTTLE_RATES", {"default": DEFAULT_RATES})
+STATS_MINUTES = 60
+OUTCOMES = ("allowed", "ip", "username")  # "ip" / "username": rejected by that limit
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+def ensure_shared(backend):
+    """Raise ImproperlyConfigured if ``backend`` only counts within one process (allowed with DEBUG)."""
+    if isinstance(backend, PER_PROCESS_CACHES) and not settings.DEBUG:
+        raise ImproperlyConfigured(
+            f"LOGIN_THROTTLE_CACHE uses {type(backend).__name__}, which each worker keeps to itself; "
+            "point it at a Redis, Memcached or database cache."
+        )
+
+
+cache = caches[getattr(settings, "LOGIN_THROTTLE_CACHE", "default")]
+ensure_shared(cache)
+
+
+def rates(role):
+    """{"ip": (attempts, seconds), "username": (attempts, seconds)} for ``role``."""
+    return {**DEFAULT_RATES, **LOGIN_THROTTLE_RATES.get("default", {}), **LOGIN_THROTTLE_RATES.get(role, {})}
+
+
+def _strictest():
+    every_role = [rates(role) for role in {"default", *LOGIN_THROTTLE_RATES, *(role for role, _ in User.ROLE_CHOICES)}]
+    return {kind: min((limits[kind] for limits in every_role), key=lambda rate: rate[0] / rate[1]) for kind in DEFAULT_RATES}
+
+
+STRICTEST_RATES = _strictest()
+
+
+def rates_for(username):
+    """The limits for logging in as ``username``: its account's role, or the strictest for unknown names."""
+    role = User.objects.filter(username=username).values_list("role", flat=True).first() if username else None
+    return STRICTEST_RATES if role is None else rates(role)
+
+
+def _client(kind, value):
+    if kind == "username":
+        # Any text fits in a cache key once hashed; case does not make a new name.
+        value = hashlib.blake2b((value or "").casefold().encode(), digest_size=12).hexdigest()
+    return f"throttle:login:{kind}:{value}"
+
+
+def _incr(key, timeout, exists=False):
+    # add() creates the counter, incr() bumps it atomically; no get-then-set
+    # race. A counter already seen in get_many() goes straight to incr(): on
+    # the database cache a failed add() costs as many queries as the incr.
+    if not exists and cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:  # expired between the two calls
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def _stats_key(outcome, minute):
+    return f"throttle:login:stats:{outcome}:{minute}"
+
+
+def check(ip, username):
+    """
+    Count a login attempt. None if it may go ahead, else the seconds to wait
+    (the attempt is counted either way, so hammering keeps the limit closed).
+    """
+    now = time.time()
+    limits = rates_for(username)
+    keys = []
+    for kind, value in (("ip", ip), ("username", username)):
+        limit, window = limits[kind]
+        bucket = int(now // window)
+        key = f"{_client(kind, value)}:{window}"
+        keys.append((kind, limit, window, f"{key}:{bucket}", f"{key}:{bucket - 1}"))
+    minute = int(now // 60)
+    # Every counter this attempt may read or bump, in one round trip.
+    known = cache.get_many(
+        [name for *_, current, last in keys for name in (current, last)]
+        + [_stats_key(outcome, minute) for outcome in OUTCOMES]
+    )
+
+    def record(outcome):
+        key = _stats_key(outcome, minute)
+        _incr(key, (STATS_MINUTES + 1) * 60, exists=key in known)
+
+    for kind, limit, window, current, last in keys:
+        elapsed = now % window
+        count = _incr(current, window * 2, exists=current in known) + known.get(last, 0) * (1 - elapsed / window)
+        if count > limit:
+            record(kind)
+            return max(1, int(window - elapsed))
+    record("allowed")
+    return None
+
+
+def succeeded(user):
+    """A correct login: the user's failed attempts no longer count against them."""
+    limit, window = rates(user.role)["username"]
+    bucket = int(time.time() // window)
+    key = f"{_client('username', user.get_username())}:{window}"
+    cache.delete_many([f"{key}:{bucket}", f"{key}:{bucket - 1}"])
+
+
+def stats(minutes=STATS_MINUTES):
+    """Allowed and rejected login attempts over the last ``minutes``, in total and per minute."""
+    minutes = max(1, min(minutes, STATS_MINUTES))
+    now = int(time.time() // 60)
+    wanted = range(now - minutes + 1, now + 1)
+    counts = cache.get_many([_stats_key(outcome, minute) for outcome in OUTCOMES for minute in wanted])
+    per_minute = [
+        {"minute": minute * 60, **{outcome: counts.get(_stats_key(outcome, minute), 0) for outcome in OUTCOMES}}
+        for minute in wanted
+    ]
+    return {
+        "minutes": minutes,
+        "totals": {outcome: sum(row[outcome] for row in per_minute) for outcome in OUTCOMES},
+        "per_minute": per_minute,
+    }
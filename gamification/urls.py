@@ -6,10 +6,25 @@ urlpatterns = [
     path("", views.home, name="home"),    # homepage
     path("dashboard/student/<slug:slug>/", views.student_dashboard, name="student_dashboard"), # Student dashboard
     path("dashboard/teacher/<slug:slug>/", views.teacher_dashboard, name="teacher_dashboard"), # Teacher dashboard
+    path("dashboard/analytics/", views.analytics_dashboard, name="analytics_dashboard"), # NGO / government analytics
     path("category/<int:category_id>/subtopics/", views.explore_subtopics, name="explore_subtopics"), # Explore subtopics
 
     path("login/", views.login_view, name="login"), # login page
+    path("api/login/throttle/", views.login_throttle_stats, name="login_throttle_stats"), # login attempts allowed / rejected per minute
     path("signup/", views.signup_view, name="signup"), # signup page
+    path("api/institutions/", views.institution_search, name="institution_search"), # signup autocomplete
     path("logout/", views.logout_view, name="logout"),
+
+    path("api/games/attempts/", views.submit_game_attempts, name="submit_game_attempts"), # score ingestion for bundled games
+    path("api/quiz/<int:subtopic_id>/", views.quiz_questions, name="quiz_questions"), # cached quiz payload per subtopic
+    path("api/quiz/<int:subtopic_id>/grade/", views.grade_quiz, name="grade_quiz"), # grade a whole answer sheet
+    path("api/moderation/submissions/", views.moderation_queue, name="moderation_queue"), # keyset-paginated task queue
+    path("api/moderation/submissions/bulk/", views.moderation_bulk, name="moderation_bulk"), # bulk approve / reject
+    path("api/teacher/students/", views.teacher_students, name="teacher_students"), # teacher dashboard, one class at a time
+    path("api/teacher/analytics/", views.teacher_analytics, name="teacher_analytics"), # score / accuracy / time distributions per class
+    path("api/teacher/content/", views.teacher_content, name="teacher_content"), # categories, tasks, badges and quizzes with institution numbers
+    path("api/roster/", views.roster_upload, name="roster_upload"), # bulk student / teacher import (CSV or XLSX)
+    path("api/roster/<int:job_id>/", views.roster_status, name="roster_status"),
+    path("api/roster/<int:job_id>/report/", views.roster_report, name="roster_report"), # per-row import report
     # path("<slug:slug>/", views.user_dashboard, name="user_dashboard"),
 ]
\ No newline at end of file
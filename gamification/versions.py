@@ -0,0 +1,73 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import CacheVersion
+
+
+# -------------------------------
+# Shared version tokens
+# -------------------------------
+# The quiz, catalog, registry, recommendation and badge caches keep decoded
+# copies in process memory, keyed by a version token that every edit bumps.
+# The token lives in the database (CacheVersion) rather than the cache, so a
+# web worker sees a scan_games run or an admin edit made by another process,
+# and the job worker sees edits made on the web, whatever cache is configured.
+#
+# Inside a scope (one per request, see signals.py) each token is read at most
+# once; outside one every read goes to the database.
+
+_memo = threading.local()
+
+
+@contextmanager
+def scope():
+    previous = getattr(_memo, "tokens", None)
+    _memo.tokens = {}
+    try:
+        yield
+    finally:
+        _memo.tokens = previous
+
+
+def begin():
+    _memo.tokens = {}
+
+
+def end():
+    _memo.tokens = None
+
+
+def _create(name):
+    try:
+        # A fresh token rather than a counter, so a recreated row can never
+        # point back at an old cached copy.
+        with transaction.atomic():
+            return CacheVersion.objects.create(name=name, token=time.time_ns()).token
+    except IntegrityError:
+        return CacheVersion.objects.get(name=name).token
+
+
+def get(name):
+    tokens = getattr(_memo, "tokens", None)
+    if tokens is not None and name in tokens:
+        return tokens[name]
+    token = CacheVersion.objects.filter(name=name).values_list("token", flat=True).first()
+    if token is None:
+        token = _create(name)
+    if tokens is not None:
+        tokens[name] = token
+    return token
+
+
+def touch(name):
+    tokens = getattr(_memo, "tokens", None)
+    if tokens is not None:
+        tokens.pop(name, None)
+    # Never backwards, even when this host's clock is behind the last writer's.
+    if not CacheVersion.objects.filter(name=name).update(token=Greatest(F("token") + 1, Value(time.time_ns()))):
+        _create(name)
@@ -1,18 +1,42 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta
 
+from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import render, redirect,get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.forms import AuthenticationForm
-from django.http import HttpResponse
-from .models import User, StudentProfile, TeacherProfile, Organization, Institution,StudentProfile, EcoPoint, UserBadge, GameAttempt, TaskSubmission,Category,SubTopic
-from django.utils.timezone import localdate,now
-from django.db.models import Sum
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.timezone import localdate, make_aware
+from django.views.decorators.http import require_GET, require_POST
+from .models import User, StudentProfile, Institution, UserBadge, GameAttempt, TaskSubmission, UserPointBalance, BackgroundJob
+from . import accounts, analytics, assets, catalog, classroom, institutions, leaderboard, logins, moderation, passwords, quiz, recommendations, registry, rollups, roster, throttle
+from .grading import GradingError, grade_and_record
+from .http_cache import cache_policy, template_version, version_time
+from .ingest import attempt_buffer, build_attempts
+from .jobs import enqueue
 
 
 
 
 
+# The public landing page only changes with its template; signed-in users
+# are redirected or get their own dashboard, which is never stored.
+def _home_etag(request):
+    return None if request.user.is_authenticated else template_version("home.HTML")[0]
+
+
+def _home_modified(request):
+    return None if request.user.is_authenticated else template_version("home.HTML")[1]
+
+
+@cache_policy(etag=_home_etag, last_modified=_home_modified, public=True, max_age=300)
 def home(request):
     if request.user.is_authenticated:
         role = request.user.role
@@ -20,12 +44,12 @@ def home(request):
             return redirect("student_dashboard", slug=request.user.slug)
             # return render(request, "dashboards\student_dashboard.html", slug=request.user.slug)
         elif role in ["school_teacher", "college_teacher"]:
-            return render(request, "dashboards/teacher_dashboard.html", {"user": request.user})
+            return redirect("teacher_dashboard", slug=request.user.slug)
         elif role in ["ngo", "government"]:
-            return render(request, "dashboards\ngo_dashboard.html")
+            return redirect("analytics_dashboard")
         else:
-            return render(request, "dashboards\dashboard.html")
-    return render(request, "home.html") 
+            return render(request, "dashboards/dashboard.html")
+    return render(request, "home.HTML")
 
 def login_view(request):
     if request.method == "POST":
@@ -33,10 +57,26 @@ def login_view(request):
         password = request.POST.get("password")
         role = request.POST.get("role")
 
-        # Authenticate
-        user = authenticate(request, username=username, password=password)
+        # Too many attempts from this address or for this username: refuse
+        # before paying for a password hash.
+        wait = throttle.check(request.META.get("REMOTE_ADDR"), username)
+        if wait is not None:
+            messages.error(request, "Too many login attempts, try again later.")
+            response = render(request, "login.html", status=429)
+            response["Retry-After"] = str(wait)
+            return response
 
-        if user is not None and user.role == role:
+        # The backend checks the role too; HashingBusy means the hashing pool is full.
+        try:
+            user = authenticate(request, username=username, password=password, role=role)
+        except passwords.HashingBusy as exc:
+            messages.error(request, str(exc))
+            response = render(request, "login.html", status=503)
+            response["Retry-After"] = "5"
+            return response
+
+        if user is not None:
+            throttle.succeeded(user)
             login(request, user)
             messages.success(request, f"Welcome back, {user.username} ({user.role})!")
             return redirect("home")
@@ -45,6 +85,18 @@ def login_view(request):
 
     return render(request, "login.html")
 
+@require_GET
+def login_throttle_stats(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Admins only"}, status=403)
+    try:
+        minutes = int(request.GET.get("minutes", throttle.STATS_MINUTES))
+    except ValueError:
+        return JsonResponse({"error": "minutes must be a number"}, status=400)
+    return JsonResponse(throttle.stats(minutes))
+
 def logout_view(request):
     logout(request)  
     request.session.flush() 
@@ -52,29 +104,20 @@ def logout_view(request):
     return redirect("home")
 
 
+# Seconds a rendered catalog / games fragment of the student dashboard is kept.
+# The fragments are keyed by the data versions, so this only bounds memory use.
+FRAGMENT_CACHE_TTL = getattr(settings, "FRAGMENT_CACHE_TTL", 60 * 60 * 24)
+
+
 @login_required
+@ensure_csrf_cookie  # the bundled games read it to post scores back
 def student_dashboard(request, slug):
     user = get_object_or_404(User, slug=slug, role__in=["school_student", "college_student"])
     student_profile = StudentProfile.objects.get(user=user)
     institution = student_profile.institution
-    today = localdate()
-    already_rewarded = EcoPoint.objects.filter(
-    user=user,
-    is_daily=True,
-    awarded_at__date=today
-    ).exists()
-    
-    if not already_rewarded:
-        EcoPoint.objects.create(
-            user=user,
-            points=1,
-            is_daily=True,
-            awarded_at=today
-            # 👈 clearly marks it
-        )
-        messages.success(request, "+1 Eco Point for Daily Login!")
+    # The daily login reward is granted by the user_logged_in signal (signals.py),
+    # so viewing the dashboard never writes.
 
-   
     # try:
     #     student_profile = StudentProfile.objects.get(user=user)
     #     institution = student_profile.institution
@@ -82,32 +125,26 @@ def student_dashboard(request, slug):
     #     student_profile = None
     #     institution = None
 
-    total_points = EcoPoint.objects.filter(user=user).aggregate(Sum("points"))["points__sum"] or 0
+    total_points = UserPointBalance.points_for(user.id)
+    today = localdate()
+    login_streak, best_streak = logins.streaks(user.id, today)
     submissions = TaskSubmission.objects.filter(user=user).select_related("game").order_by("-submitted_at")[:5]
 
-    leaderboard = []
+    top_students = []
+    my_rank, participants = None, 0
     if institution:
-        leaderboard = (
-            EcoPoint.objects.filter(user__studentprofile__institution=institution)
-            .values("user__username")
-            .annotate(total=Sum("points"))
-            .order_by("-total")[:10]
-        )
+        top_students = leaderboard.top(institution.id)
+        my_rank, participants = leaderboard.rank_of(institution.id, user.id)
 
-    categories = Category.objects.all()
+    # Served from the in-process catalog (catalog.py); schools only see the
+    # categories whose grade range admits the student's grade.
+    grade = student_profile.grade if user.role == "school_student" else None
+    categories = catalog.categories(grade)
+
+    category_selected = catalog.category(request.GET.get("category"))
+    games = registry.manifest()  # no filesystem access; see registry.py
+    subtopics = category_selected["subtopics"] if category_selected else None
 
-    category_id = request.GET.get("category")
-    if category_id:
-        try:
-            category_selected = Category.objects.get(id=category_id)
-            subtopics = SubTopic.objects.filter(category=category_selected)
-        except Category.DoesNotExist:
-            category_selected = None
-            subtopics = None
-    else:
-        category_selected = None
-        subtopics = None
-        
     return render(request, "dashboards/student_dashboard.html", {
         "user": user,
         "categories": categories,
@@ -118,204 +155,414 @@ def student_dashboard(request, slug):
         "institution": institution,
         "badges": UserBadge.objects.filter(user=user).select_related("badge"),
         "submissions": submissions,
-        "leaderboard": leaderboard,
+        "leaderboard": top_students,
+        "my_rank": my_rank,
+        "participants": participants,
+        "login_streak": login_streak,
+        "best_streak": best_streak,
+        "active_days_this_month": logins.active_days_in_month(user.id, today.year, today.month),
         "category_selected": category_selected,
+        "recommendations": recommendations.for_student(user.id, grade),
+        "games": games["games"],
+        # {% cache %} keys for the catalog and games fragments
+        "grade": grade,
+        "catalog_version": catalog.catalog_version(),
+        "games_version": games["version"],
+        "fragment_ttl": FRAGMENT_CACHE_TTL,
     })
     
+@cache_policy(
+    etag=lambda request, category_id: f"catalog-{catalog.catalog_version()}-{category_id}",
+    last_modified=lambda request, category_id: version_time(catalog.catalog_version()),
+)
 def explore_subtopics(request, category_id):
-    category = get_object_or_404(Category, id=category_id)
-    subtopics = SubTopic.objects.filter(category=category)
+    category = catalog.category(category_id)
+    if category is None:
+        raise Http404("No such category.")
     return render(request, "dashboards/subtopics.html", {
         "category": category,
-        "subtopics": subtopics,
+        "subtopics": category["subtopics"],
     })
     
-# @login_required
-# def student_dashboard(request, slug):
-#     user = get_object_or_404(User, slug=slug, role__in=["school_student", "college_student"])
-
-#     # Ensure profile exists
-#     try:
-#         student_profile = StudentProfile.objects.get(user=user)
-#         institution = student_profile.institution
-#     except StudentProfile.DoesNotExist:
-#         student_profile = None
-#         institution = None
-
-#     total_points = EcoPoint.objects.filter(user=user).aggregate(Sum("points"))["points__sum"] or 0
-#     submissions = TaskSubmission.objects.filter(user=user).select_related("game").order_by("-submitted_at")[:5]
-
-#     leaderboard = []
-#     if institution:
-#         leaderboard = (
-#             EcoPoint.objects.filter(user__studentprofile__institution=institution)
-#             .values("user__username")
-#             .annotate(total=Sum("points"))
-#             .order_by("-total")[:10]
-#         )
-
-#     return render(request, "dashboards/student_dashboard.html", {
-#         "user": user,
-#         "categories": Category.objects.all(),
-#         "subtopics": SubTopic.objects.filter(category=category) if category_selected else None,
-#         "recent_attempts": GameAttempt.objects.filter(user=user).select_related("game").order_by("-attempt_date")[:5],
-#         "total_points": EcoPoint.objects.filter(user=user).aggregate(total=Sum("points"))["total"] or 0,
-#         "student_profile": student_profile,
-#         "institution": institution,
-#         "total_points": total_points,
-#         "badges": UserBadge.objects.filter(user=user).select_related("badge"),
-#         "submissions": submissions,
-#         "leaderboard": leaderboard,
-#     })
+
+# -------------------------------
+# Game score ingestion (static/js/gg-scores.js)
+# -------------------------------
+MAX_ATTEMPTS_PER_POST = 100
+
+
+@require_POST
+def submit_game_attempts(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    items = payload.get("attempts", [payload]) if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JsonResponse({"error": "Expected an attempt object or a list of them"}, status=400)
+    if len(items) > MAX_ATTEMPTS_PER_POST:
+        return JsonResponse({"error": f"At most {MAX_ATTEMPTS_PER_POST} attempts per request"}, status=400)
+
+    attempts, rejected = build_attempts(request.user, items)
+    # Attempts are only acknowledged once they are in the database; until
+    # then the client keeps them and posts them again after retry_after.
+    saved, dropped, unsaved = attempt_buffer.status(attempts)
+    attempt_buffer.add(unsaved)
+    rejected += [{"id": str(client_id), "error": reason} for client_id, reason in dropped.items()]
+    return JsonResponse(
+        {
+            "saved": [str(client_id) for client_id in saved],
+            "pending": [str(attempt.client_attempt_id) for attempt in unsaved],
+            "rejected": rejected,
+            "retry_after": attempt_buffer.flush_seconds + 1,
+        },
+        status=202 if unsaved else 200,
+    )
+
+
+# -------------------------------
+# Quiz delivery
+# -------------------------------
+@require_GET
+def quiz_questions(request, subtopic_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    cached = quiz.get_quiz(subtopic_id)
+    if cached is None:
+        return JsonResponse({"error": "Subtopic not found"}, status=404)
+    version, data, compressed = cached
+
+    difficulty = request.GET.get("difficulty")
+    count = request.GET.get("count")
+    if difficulty or count:
+        try:
+            count = int(count) if count else None
+        except ValueError:
+            return JsonResponse({"error": "count must be a number"}, status=400)
+        if count is not None and count < 1:
+            return JsonResponse({"error": "count must be at least 1"}, status=400)
+        questions = quiz.sample_questions(data, count=count, difficulty=difficulty, seed=request.GET.get("seed"))
+        return JsonResponse({"subtopic": data["subtopic"], "version": data["version"], "questions": questions})
+
+    etag = f'"quiz-{subtopic_id}-{version}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    elif assets.accepts(request.headers.get("Accept-Encoding", ""), "gzip"):
+        response = HttpResponse(compressed, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(compressed), content_type="application/json")
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_POST
+def grade_quiz(request, subtopic_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    try:
+        payload = json.loads(request.body)
+        client_attempt_id = uuid.UUID(payload["id"]) if payload.get("id") else None
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    try:
+        result = grade_and_record(
+            request.user,
+            subtopic_id,
+            payload.get("answers"),
+            time_taken=payload.get("time_taken"),
+            client_attempt_id=client_attempt_id,
+        )
+    except GradingError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(result)
+
+
+# -------------------------------
+# Task moderation queue (teachers / NGOs)
+# -------------------------------
+@require_GET
+def moderation_queue(request):
+    if not moderation.can_moderate(request.user):
+        return JsonResponse({"error": "Moderators only"}, status=403)
+    try:
+        page = moderation.queue_page(
+            request.user,
+            status=request.GET.get("status", "pending"),
+            cursor=request.GET.get("cursor"),
+            limit=int(request.GET.get("limit", 50)),
+        )
+    except ValueError as exc:  # ModerationError or a bad limit
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(page)
+
+
+@require_POST
+def moderation_bulk(request):
+    if not moderation.can_moderate(request.user):
+        return JsonResponse({"error": "Moderators only"}, status=403)
+    try:
+        payload = json.loads(request.body)
+        ids = [int(submission_id) for submission_id in payload.get("ids", [])]
+        updated = moderation.bulk_moderate(request.user, ids, payload.get("action"), payload.get("points"))
+    except (ValueError, TypeError, AttributeError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"updated": updated, "skipped": len(ids) - updated})
+
+
 @login_required
 def teacher_dashboard(request,slug):
-    # You can pass data to the template here if needed
+    # Students are loaded class by class from teacher_students and pending
+    # submissions from the moderation queue; the page only carries the class
+    # list, the headline numbers, the cached leaderboard and the activity feed.
     user = get_object_or_404(User, slug=slug, role__in=["school_teacher", "college_teacher"])
+    institution = classroom.teacher_institution(user)
+    classes = classroom.classes(institution) if institution else []
     context = {
         "user": user,
-        
+        "institution": institution,
+        "classes": classes,
+        "total_students": sum(row["students"] for row in classes),
+        "top_students": leaderboard.top(institution.id) if institution else [],
+        "recent_activity": classroom.recent_activity(institution) if institution else [],
     }
+    counts = classroom.verification_counts(institution) if institution else {"pending": 0, "approved_today": 0}
+    context.update(pending_submissions=counts["pending"], approved_today=counts["approved_today"])
     return render(request, "dashboards/teacher_dashboard.html", context)
 
-def signup_view(request):
-    if request.method == "POST":
-        role = request.POST.get("role")
-        gender = request.POST.get("gender")
-        username = request.POST.get("username")
-        email = request.POST.get("email")
-        contact_no = request.POST.get("contact_no")
-        dob = request.POST.get("dob")
-        first_name = request.POST.get("first_name")
-        last_name = request.POST.get("last_name")
-        address = request.POST.get("address")
-        password1 = request.POST.get("password1")
-        password2 = request.POST.get("password2")
-
-        if password1 != password2:
-            messages.error(request, "Passwords do not match")
-            return render(request, "signup.html")
-
-        if User.objects.filter(username=username).exists():
-            messages.error(request, "Username already taken")
-            return render(request, "signup.html")
-
-        # Create user
-        user = User(
-            username=username,
-            email=email,
-            contact_no=contact_no,
-            dob=dob if dob else None,
-            role=role,
-            first_name=first_name,
-            last_name=last_name,
-            address=address,
+
+# -------------------------------
+# Teacher dashboard data
+# -------------------------------
+@require_GET
+def teacher_students(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if request.user.role not in ["school_teacher", "college_teacher"]:
+        return JsonResponse({"error": "Teachers only"}, status=403)
+    institution = classroom.teacher_institution(request.user)
+    if institution is None:
+        return JsonResponse({"error": "No institution on your teacher profile"}, status=403)
+    try:
+        page = classroom.students_page(
+            institution,
+            class_value=request.GET.get("class"),
+            cursor=request.GET.get("cursor"),
+            limit=int(request.GET.get("limit", classroom.DEFAULT_PAGE_SIZE)),
         )
-        user.set_password(password1)
-        user.save()
+    except ValueError as exc:  # ClassroomError or a bad limit
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(page)
+
+
+@require_GET
+def teacher_analytics(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if request.user.role not in ["school_teacher", "college_teacher"]:
+        return JsonResponse({"error": "Teachers only"}, status=403)
+    institution = classroom.teacher_institution(request.user)
+    if institution is None:
+        return JsonResponse({"error": "No institution on your teacher profile"}, status=403)
+    class_value = request.GET.get("class")
+    try:
+        window = int(request.GET.get("window", 30))
+        if class_value:
+            int(class_value)
+    except ValueError:
+        return JsonResponse({"error": "class and window must be numbers"}, status=400)
+    if window not in analytics.ANALYTICS_WINDOWS:
+        return JsonResponse({"error": f"window must be one of {analytics.ANALYTICS_WINDOWS}"}, status=400)
+    return JsonResponse(analytics.class_statistics(institution, class_value, window))
+
+
+@require_GET
+def teacher_content(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if request.user.role not in ["school_teacher", "college_teacher"]:
+        return JsonResponse({"error": "Teachers only"}, status=403)
+    institution = classroom.teacher_institution(request.user)
+    if institution is None:
+        return JsonResponse({"error": "No institution on your teacher profile"}, status=403)
+    return JsonResponse(classroom.content_overview(institution))
+
+
+# -------------------------------
+# Roster import
+# -------------------------------
+# Teachers upload their students (into their own institution), admins any
+# roster; the import runs as a background job and leaves a per-row report.
+@require_POST
+def roster_upload(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if request.user.is_staff:
+        institution_id, roles = request.POST.get("institution") or None, roster.ROSTER_ROLES
+        if institution_id and not Institution.objects.filter(id=institution_id).exists():
+            return JsonResponse({"error": "Unknown institution"}, status=400)
+    elif request.user.role in ["school_teacher", "college_teacher"]:
+        institution = classroom.teacher_institution(request.user)
+        if institution is None:
+            return JsonResponse({"error": "No institution on your teacher profile"}, status=403)
+        institution_id, roles = institution.id, roster.STUDENT_ROLES
+    else:
+        return JsonResponse({"error": "Teachers and admins only"}, status=403)
+    uploaded = request.FILES.get("roster")
+    if uploaded is None:
+        return JsonResponse({"error": "Attach the roster as 'roster'"}, status=400)
+    try:
+        upload, report = roster.store_upload(uploaded)
+    except roster.RosterError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    queued = enqueue(
+        "roster.import", max_attempts=1, upload=upload, report=report,
+        institution_id=institution_id and int(institution_id), roles=roles, uploaded_by=request.user.id,
+    )
+    return JsonResponse({"job": queued.id, "status": queued.status}, status=202)
+
+
+def _roster_job(request, job_id):
+    queued = BackgroundJob.objects.filter(id=job_id, name="roster.import").first()
+    if queued is None or not (request.user.is_staff or queued.payload.get("uploaded_by") == request.user.id):
+        raise Http404("No such roster import.")
+    return queued
+
+
+@require_GET
+def roster_status(request, job_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    queued = _roster_job(request, job_id)
+    return JsonResponse({
+        "job": queued.id,
+        "status": queued.status,
+        "report": reverse("roster_report", args=[queued.id]) if queued.status == "done" else None,
+        "error": queued.last_error.strip().splitlines()[-1] if queued.status == "failed" and queued.last_error else None,
+    })
 
-        if role in ["school_student", "college_student"]:
-            enrollment_no = request.POST.get("enrollment_no")
-            grade = request.POST.get("grade")
-            stream = request.POST.get("stream")
-            current_year = request.POST.get("current_year")
-            course = request.POST.get("course")
-            field_of_study = request.POST.get("field_of_study")
-            institution_value = request.POST.get("institution")
-
-            if institution_value == "other":
-                inst_name = request.POST.get("other_school_name")
-                inst_state = request.POST.get("other_school_state")
-                inst_city = request.POST.get("other_school_city")
-
-                institution = Institution.objects.create(
-                    name=inst_name,
-                    state=inst_state,
-                    city=inst_city,
-                    type="School" if "school" in request.POST.get("role") else "College"
-                )
-            else:
-                institution = Institution.objects.get(id=institution_value)
-
-          
-
-            StudentProfile.objects.create(
-                user=user,
-                gender=gender,
-                institution=institution,
-                enrollment_no=enrollment_no,
-                grade=grade if grade else None,
-                stream=stream,
-                current_year=current_year if current_year else None,
-                course=course,
-                field_of_study=field_of_study,
-            )
 
-        elif role in ["school_teacher", "college_teacher"]:
-            # institution_name = request.POST.get("institution")
-            teacher_id = request.POST.get("teacher_id")
-            designation = request.POST.get("designation")
-            department = request.POST.get("department")
-            institution_value = request.POST.get("institution")
-
-            if institution_value == "other":
-                inst_name = request.POST.get("other_school_name")
-                inst_state = request.POST.get("other_school_state")
-                inst_city = request.POST.get("other_school_city")
-
-                institution = Institution.objects.create(
-                    name=inst_name,
-                    state=inst_state,
-                    city=inst_city,
-                    type="School" if "school" in request.POST.get("role") else "College"
-                )
-            else:
-                institution = Institution.objects.get(id=institution_value)
-
-          
-
-            TeacherProfile.objects.create(
-                user=user,
-                gender=gender,
-                institution=institution,
-                teacher_id=teacher_id,
-                designation=designation,
-                department=department,
-            )
+@login_required
+@require_GET
+def roster_report(request, job_id):
+    queued = _roster_job(request, job_id)
+    report, storage = queued.payload["report"], roster.upload_storage()
+    if queued.status != "done" or not storage.exists(report):
+        raise Http404("The report is not ready.")
+    return FileResponse(storage.open(report, "rb"), as_attachment=True,
+                        filename=f"roster-{queued.id}-report.csv", content_type="text/csv")
 
-        elif role in ["ngo", "government"]:
-            org_name = request.POST.get("org_name")
-            org_type = request.POST.get("org_type")
-            contact_person = request.POST.get("contact_person")
-            website = request.POST.get("website")
-            state = request.POST.get("state")
-            city = request.POST.get("city")
-
-            Organization.objects.create(
-                name=org_name,
-                type=org_type.capitalize(),  # "NGO" / "Government"
-                contact_person=contact_person,
-                email=email,
-                website=website,
-                address=address,
-                state=state,
-                city=city,
-            )
-        print(user,
-                gender,
-                institution,
-                enrollment_no,
-                grade,
-                stream,
-                current_year,
-                course,
-                field_of_study,)
+
+ANALYTICS_ROLES = ["ngo", "government"]
+
+
+def _can_view_analytics(user):
+    return user.is_staff or user.role in ANALYTICS_ROLES
+
+
+# The rollups only change when refresh_rollups runs or a student's first login
+# of the day is counted; the date is part of the ETag because the windows end today.
+def _rollups_version(request):
+    # Read from the database once per request, for both the ETag and Last-Modified.
+    if not hasattr(request, "_rollups_version"):
+        request._rollups_version = rollups.version()
+    return request._rollups_version
+
+
+def _analytics_etag(request):
+    if not _can_view_analytics(request.user):
+        return None
+    params = request.GET.urlencode()
+    return f"rollups-{_rollups_version(request)}-{localdate().isoformat()}-{request.user.role}-{params}"
+
+
+def _analytics_modified(request):
+    if not _can_view_analytics(request.user):
+        return None
+    midnight = make_aware(datetime.combine(localdate(), datetime.min.time()))
+    return max(version_time(_rollups_version(request)), midnight)
+
+
+@login_required
+@cache_policy(etag=_analytics_etag, last_modified=_analytics_modified)
+def analytics_dashboard(request):
+    """State -> city -> institution drill-down for NGOs and government, read from the daily rollups."""
+    if not _can_view_analytics(request.user):
+        raise PermissionDenied
+    try:
+        window = int(request.GET.get("days", 30))
+    except ValueError:
+        window = 30
+    if window not in rollups.ROLLUP_WINDOWS:
+        window = 30
+    state = request.GET.get("state") or None
+    city = (request.GET.get("city") or None) if state else None
+
+    last = localdate()
+    first = last - timedelta(days=window - 1)
+    template = "dashboards/ngo_dashboard.html" if request.user.role == "ngo" else "dashboards/government_dashboard.html"
+    return render(request, template, {
+        "user": request.user,
+        "state": state,
+        "city": city,
+        "window": window,
+        "windows": rollups.ROLLUP_WINDOWS,
+        "first": first,
+        "last": last,
+        **rollups.summary(first, last, state=state, city=city),
+    })
+
+# Signup's institution autocomplete. Public (signup is anonymous) and the same
+# for everyone, so shared caches may keep a page until the institutions change.
+def _institutions_etag(request):
+    return f"institutions-{institutions.institutions_version()}-{request.GET.urlencode()}"
+
+
+def _institutions_modified(request):
+    return version_time(institutions.institutions_version())
+
+
+@require_GET
+@cache_policy(etag=_institutions_etag, last_modified=_institutions_modified, public=True, max_age=60)
+def institution_search(request):
+    try:
+        page = int(request.GET.get("page", 1))
+        limit = int(request.GET.get("limit", institutions.SEARCH_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "page and limit must be numbers"}, status=400)
+    return JsonResponse(institutions.search(
+        request.GET.get("q", ""),
+        kind=request.GET.get("type") or None,
+        city=request.GET.get("city") or None,
+        state=request.GET.get("state") or None,
+        page=page,
+        limit=limit,
+    ))
+
+
+def signup_view(request):
+    if request.method == "POST":
+        data = request.POST.copy()
+        # The school and college teacher tabs each have a designation input.
+        designations = [value for value in request.POST.getlist("designation") if value]
+        data["designation"] = designations[0] if designations else ""
+        try:
+            accounts.register(data)
+        except accounts.SignupError as exc:
+            for message in exc.messages():
+                messages.error(request, message)
+            return render(request, "signup.HTML", status=400)
         messages.success(request, "Account created! Please log in.")
         return redirect("login")
-    else:
-        institutions = Institution.objects.all()
-        return render(request, "signup.html", {"institutions": institutions})
-
-    return render(request, "signup.html")
+    # Institutions are looked up as the user types (institution_search), so
+    # the page does not grow with them.
+    return render(request, "signup.HTML")
 
 
 @login_required